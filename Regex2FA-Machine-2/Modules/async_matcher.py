@@ -0,0 +1,118 @@
+# async_matcher.py - asyncio façade over the compiler, matcher and renderer
+import asyncio
+import hashlib
+
+from Modules.regex_compiler import COURSE_PATTERN
+from Modules.compile_cache import cached_compile
+from Modules.nfa import test_string_belongs_to_regex
+from Modules.capabilities import check_capabilities
+
+_END_OF_STREAM = object()
+
+
+class AsyncMatcher:
+    """Match strings and streams from inside a running event loop
+
+    Compiling and rendering run in an executor so they never block the loop.
+    Matching a line is cheap, so lines are matched on the loop in batches,
+    yielding control back to the loop between batches.
+    """
+
+    def __init__(self, pattern=COURSE_PATTERN, batch_size=256, max_buffered_lines=4096,
+                 executor=None, encoding="utf-8"):
+        self.pattern = pattern
+        self.batch_size = batch_size
+        self.max_buffered_lines = max_buffered_lines  # Reader pauses when this many lines wait
+        self.executor = executor                      # None means the loop's default executor
+        self.encoding = encoding
+        self.compiled = None
+        self._compile_lock = None
+
+    async def compile(self):
+        """Compile the pattern in the executor (only once) and return it"""
+        if self.compiled is None:
+            if self._compile_lock is None:
+                self._compile_lock = asyncio.Lock()
+            async with self._compile_lock:
+                if self.compiled is None:
+                    loop = asyncio.get_running_loop()
+                    self.compiled = await loop.run_in_executor(self.executor, cached_compile, self.pattern)
+        return self.compiled
+
+    async def match(self, input_string):
+        """True if input_string belongs to the pattern"""
+        compiled = await self.compile()
+        return compiled.matches(input_string)
+
+    async def classify(self, input_string):
+        """Async version of test_string_belongs_to_regex for the course pattern"""
+        return test_string_belongs_to_regex(input_string)
+
+    async def match_many(self, strings):
+        """Match a list of strings, returning a list of booleans"""
+        compiled = await self.compile()
+        results = []
+        for start in range(0, len(strings), self.batch_size):
+            results.extend(map(compiled.matches, strings[start:start + self.batch_size]))
+            await asyncio.sleep(0)  # Let other tasks run between batches
+        return results
+
+    async def match_stream(self, lines):
+        """Yield (line, matched) for every line of an async iterable
+
+        lines may be an asyncio.StreamReader or any async iterable of str or
+        bytes; trailing newlines are stripped. A background task reads ahead
+        into a bounded queue, so a slow consumer pauses the reader instead of
+        buffering the whole stream. Whatever has been read when the matcher
+        is ready forms the next batch, so batches grow under load while a
+        slow stream still gets an answer for every line right away.
+        """
+        compiled = await self.compile()
+        queue = asyncio.Queue(maxsize=self.max_buffered_lines)
+        reader = asyncio.create_task(self._read_lines(lines, queue))
+        try:
+            finished = False
+            while not finished:
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                if batch[-1] is _END_OF_STREAM:
+                    batch.pop()
+                    finished = True
+
+                for line in batch:
+                    yield line, compiled.matches(line)
+                await asyncio.sleep(0)
+
+            await reader  # Re-raise any error from the underlying stream
+        finally:
+            reader.cancel()
+
+    async def _read_lines(self, lines, queue):
+        try:
+            async for line in lines:
+                if isinstance(line, bytes):
+                    line = line.decode(self.encoding)
+                await queue.put(line.rstrip("\r\n"))
+        except Exception:
+            await queue.put(_END_OF_STREAM)  # Wake the consumer so it can re-raise
+            raise
+        await queue.put(_END_OF_STREAM)
+
+    async def render(self, kind="min_dfa", output_dir="automata_images"):
+        """Render the DFA or minimized DFA diagram in the executor, returning the image path"""
+        compiled = await self.compile()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._render, compiled, kind, output_dir)
+
+    @staticmethod
+    def _render(compiled, kind, output_dir):
+        from Modules.image_generator import AutomataImageGenerator
+        if kind not in ("dfa", "min_dfa"):
+            raise ValueError("kind must be 'dfa' or 'min_dfa'")
+        if not check_capabilities()["diagrams"]:
+            raise RuntimeError("Diagram rendering disabled: Graphviz is not installed")
+        compiled.require_dfa()  # CompileBudgetError for patterns matched lazily
+        table = getattr(compiled, kind).to_table(letters=(kind == "min_dfa"))
+        name = f"{kind}_{hashlib.sha1(compiled.pattern.encode('utf-8')).hexdigest()[:12]}"
+        return AutomataImageGenerator(output_dir).generate_dfa_diagram(name, table)
@@ -0,0 +1,58 @@
+# capabilities.py - One-time detection of optional dependencies
+#
+# Matching and the text tables only need the standard library. Table images
+# need Pillow and state diagrams need both the graphviz package and the
+# Graphviz 'dot' executable. Nothing here installs or prompts, so it is safe
+# on offline hosts.
+import importlib.util
+import shutil
+import subprocess
+
+_capabilities = None
+
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def _has_dot():
+    """True if the Graphviz 'dot' executable runs"""
+    if shutil.which("dot") is None:
+        return False
+    try:
+        subprocess.run(["dot", "-V"], capture_output=True, check=True, timeout=10)
+        return True
+    except (subprocess.SubprocessError, OSError):
+        return False
+
+
+def check_capabilities(refresh=False):
+    """Detect optional dependencies once per process and cache the result"""
+    global _capabilities
+    if _capabilities is None or refresh:
+        caps = {
+            "tkinter": _has_module("tkinter"),
+            "pillow": _has_module("PIL"),
+            "graphviz_package": _has_module("graphviz"),
+            "graphviz_dot": _has_dot(),
+        }
+        caps["table_images"] = caps["pillow"]
+        caps["diagrams"] = caps["pillow"] and caps["graphviz_package"] and caps["graphviz_dot"]
+        _capabilities = caps
+    return _capabilities
+
+
+def missing_features(caps=None):
+    """Human readable list of disabled features and how to enable them"""
+    caps = caps or check_capabilities()
+    notes = []
+    if not caps["tkinter"]:
+        notes.append("GUI disabled: tkinter is not available (use --serve or regex2fa_grep.py)")
+    if not caps["pillow"]:
+        notes.append("Table images disabled: install Pillow (pip install Pillow)")
+    if not caps["graphviz_package"]:
+        notes.append("Diagram rendering disabled: install the graphviz package (pip install graphviz)")
+    elif not caps["graphviz_dot"]:
+        notes.append("Diagram rendering disabled: Graphviz 'dot' executable not found "
+                     "(https://graphviz.org/download/)")
+    return notes
@@ -0,0 +1,100 @@
+# compile_cache.py - Process-wide cache of compiled patterns
+import threading
+from collections import OrderedDict
+
+from Modules.regex_compiler import parse_regex, normalize_ast, compile_ast
+
+MAX_ALIASES = 16  # Pattern spellings remembered per entry for the no-parse fast path
+
+
+class CompileCache:
+    """LRU cache of CompiledRegex keyed by normalized AST and bounded by total state count
+
+    Equivalent spellings such as 'a+b', 'b + a' and '(b|a)' share one entry.
+    A pattern string that was seen before skips even the parse step.
+    Patterns whose DFA is over the limits budget are cached as lazy matchers.
+    """
+
+    def __init__(self, max_states=200000, limits=None):
+        self.max_states = max_states
+        self.limits = limits
+        self.total_states = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # normalized AST -> (CompiledRegex, set of pattern strings)
+        self._aliases = {}             # pattern string -> normalized AST
+        self._lock = threading.Lock()
+
+    def get(self, pattern):
+        """Return the compiled automata for pattern, compiling on a miss"""
+        with self._lock:
+            key = self._aliases.get(pattern)
+            if key is not None:
+                return self._hit(key, pattern)
+
+        # Parse outside the lock; RegexSyntaxError and CompileBudgetError propagate
+        key = normalize_ast(parse_regex(pattern))
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key, pattern)
+            self.misses += 1
+
+        compiled = compile_ast(pattern, key, self.limits, fallback=True)
+        with self._lock:
+            if key in self._entries:  # Another thread compiled it meanwhile
+                return self._entries[key][0]
+            self._entries[key] = (compiled, {pattern})
+            self._aliases[pattern] = key
+            self.total_states += compiled.state_count
+            self._evict()
+        return compiled
+
+    def _hit(self, key, pattern):
+        compiled, aliases = self._entries[key]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if pattern not in aliases and len(aliases) < MAX_ALIASES:
+            aliases.add(pattern)
+            self._aliases[pattern] = key
+        return compiled
+
+    def _evict(self):
+        # The newest entry always stays, even if it alone exceeds the budget
+        while self.total_states > self.max_states and len(self._entries) > 1:
+            _, (compiled, aliases) = self._entries.popitem(last=False)
+            for alias in aliases:
+                del self._aliases[alias]
+            self.total_states -= compiled.state_count
+            self.evictions += 1
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "total_states": self.total_states,
+                "max_states": self.max_states,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self.total_states = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# Shared by the GUI, the service and the async façade
+compile_cache = CompileCache()
+
+
+def cached_compile(pattern):
+    """compile_regex through the process-wide cache"""
+    return compile_cache.get(pattern)
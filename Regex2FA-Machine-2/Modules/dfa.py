@@ -1,13 +1,16 @@
 # dfa.py - Updated without diagram output
+from Modules.instrumentation import instrumentation
+from Modules.regex_compiler import table_dead_states
+
 class DFASimulator:
     def __init__(self):
         # DFA tables for all regular expression patterns
-        # Each pattern has: initial state, final states, dead states, and transition table
+        # Each pattern has: initial state, final states, and transition table
+        # (dead states are computed from the transitions below)
         self.dfa_tables = {
             "aba": {  # DFA for pattern "aba"
                 "initial": "q0",      # Starting state
                 "final": {"q3"},      # Accepting state (string accepted if ends here)
-                "dead_states": {"q4"}, # States that lead to rejection
                 "transitions": {      # State transition mapping
                     "q0": {"a": "q1", "b": "q4", "c": "q4"},  # From q0: a→q1, b/c→dead
                     "q1": {"a": "q4", "b": "q2", "c": "q4"},  # From q1: b→q2, a/c→dead
@@ -19,7 +22,6 @@ class DFASimulator:
             "bb": {  # DFA for pattern "bb"
                 "initial": "q0",
                 "final": {"q2"},
-                "dead_states": {"q3"},
                 "transitions": {
                     "q0": {"a": "q3", "b": "q1", "c": "q3"},  # From q0: b→q1, a/c→dead
                     "q1": {"a": "q3", "b": "q2", "c": "q3"},  # From q1: b→q2 (final), a/c→dead
@@ -30,7 +32,6 @@ class DFASimulator:
             "c_only": {  # DFA for pattern "c" (just the letter c)
                 "initial": "q0",
                 "final": {"q1"},
-                "dead_states": {"q2"},
                 "transitions": {
                     "q0": {"a": "q2", "b": "q2", "c": "q1"},  # From q0: c→q1 (final), a/b→dead
                     "q1": {"a": "q2", "b": "q2", "c": "q2"},  # From q1 (final): all→dead
@@ -40,7 +41,6 @@ class DFASimulator:
             "ca": {  # DFA for pattern "ca"
                 "initial": "q0",
                 "final": {"q3"},
-                "dead_states": {"q2"},
                 "transitions": {
                     "q0": {"a": "q2", "b": "q2", "c": "q1"},  # From q0: c→q1, a/b→dead
                     "q1": {"a": "q3", "b": "q2", "c": "q2"},  # From q1: a→q3 (final), b/c→dead
@@ -51,7 +51,6 @@ class DFASimulator:
             "caa": {  # DFA for pattern "caa"
                 "initial": "q0",
                 "final": {"q4"},
-                "dead_states": {"q3"},
                 "transitions": {
                     "q0": {"a": "q3", "b": "q3", "c": "q1"},  # From q0: c→q1, a/b→dead
                     "q1": {"a": "q2", "b": "q3", "c": "q3"},  # From q1: a→q2, b/c→dead
@@ -63,7 +62,6 @@ class DFASimulator:
             "caaa": {  # DFA for pattern "caaa"
                 "initial": "q0",
                 "final": {"q5"},
-                "dead_states": {"q4"},
                 "transitions": {
                     "q0": {"a": "q4", "b": "q4", "c": "q1"},  # From q0: c→q1, a/b→dead
                     "q1": {"a": "q2", "b": "q4", "c": "q4"},  # From q1: a→q2, b/c→dead
@@ -76,7 +74,6 @@ class DFASimulator:
             "c_kleene_star": {  # DFA for pattern "c(aaa+aa+a)*" (Kleene star)
                 "initial": "q0",
                 "final": {"q1"},  # q1 is final because it accepts "c" and can loop on 'a'
-                "dead_states": {"q2"},
                 "transitions": {
                     "q0": {"a": "q2", "b": "q2", "c": "q1"},  # From q0: c→q1 (final), a/b→dead
                     "q1": {"a": "q1", "b": "q2", "c": "q2"},  # From q1: a→q1 (loop for Kleene star), b/c→dead
@@ -84,6 +81,8 @@ class DFASimulator:
                 }
             }
         }
+        for dfa in self.dfa_tables.values():
+            dfa["dead_states"] = table_dead_states(dfa)  # States that lead to rejection
     
     def get_dfa_data(self, pattern):
         """Get DFA data for image generation"""
@@ -93,6 +92,14 @@ class DFASimulator:
     
     def simulate_dfa(self, pattern, input_string):
         """Simulate DFA step by step for given input string"""
+        if not instrumentation.enabled:
+            return self._simulate_dfa(pattern, input_string)
+        with instrumentation.span("simulate_dfa"):
+            steps = self._simulate_dfa(pattern, input_string)
+        instrumentation.count("transitions_taken", sum(1 for line in steps if line.startswith("Step ")))
+        return steps
+
+    def _simulate_dfa(self, pattern, input_string):
         # Check if the requested pattern exists in our DFA tables
         if pattern not in self.dfa_tables:
             return ["Error: Pattern not found"]  # Return error if pattern not found
@@ -0,0 +1,215 @@
+# dfa_binary.py - Compact on-disk format for compiled DFAs, matched straight from mmap
+#
+# Layout (little-endian, every section starts on an 8-byte boundary):
+#   header        see HEADER below
+#   pattern       UTF-8 source pattern (informational)
+#   alphabet      uint32 code point per symbol
+#   symbol class  uint8 equivalence class per alphabet symbol
+#   byte map      256 x uint8: byte/code point < 256 -> class, 0 if not in alphabet
+#   transitions   state_count x class_count of uint16 (uint32 if flag WIDE is set),
+#                 each entry is target state * class_count (see regex_compiler.ClassDFA)
+#   accept        bitmap, bit s set if state s is final
+#   atoms         atom_count x (uint32 start, uint32 end) code point intervals of the
+#                 pattern's SymbolMap, present if flag ATOMS is set (see regex_compiler.SymbolMap)
+import mmap
+import struct
+import sys
+from array import array
+
+from Modules.regex_compiler import ClassDFA, SymbolMap
+
+MAGIC = b"R2FA"
+VERSION = 3
+FLAG_WIDE = 1  # Transition entries are uint32 instead of uint16
+FLAG_ATOMS = 2  # Symbols stand for the atoms of a character class pattern
+
+# magic, version, flags, state_count, class_count, symbol_count, initial,
+# pattern offset, pattern length, alphabet offset, symbol class offset,
+# byte map offset, transitions offset, accept offset, atom count, atoms offset, total size
+HEADER = struct.Struct("<4sHHIIIIIIIIIIIIII")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def dumps(dfa, pattern=""):
+    """Serialize a regex_compiler.DFA to bytes"""
+    alphabet = dfa.alphabet
+    for symbol in alphabet:
+        if len(symbol) != 1:
+            raise ValueError(f"Only single-character symbols can be stored, got {symbol!r}")
+    compressed = ClassDFA(dfa)  # ValueError if the classes do not fit in a byte
+    state_count = compressed.state_count
+    class_count = compressed.class_count
+    wide = state_count * class_count > 0xFFFF
+    entry_code = "I" if wide else "H"
+
+    pattern_bytes = pattern.encode("utf-8")
+    alphabet_array = array("I", (ord(symbol) for symbol in alphabet))
+    symbol_classes = bytes(compressed.symbol_class[symbol] for symbol in alphabet)
+    table = array(entry_code, compressed.table)
+    accept = bytearray((state_count + 7) // 8)
+    for s in dfa.final:
+        accept[s >> 3] |= 1 << (s & 7)
+    flags = FLAG_WIDE if wide else 0
+    atoms = array("I")
+    if dfa.symbol_map is not None:
+        flags |= FLAG_ATOMS
+        for start, end in dfa.symbol_map.atoms():
+            atoms.extend((start, end))
+    if sys.byteorder != "little":
+        for section in (alphabet_array, table, atoms):
+            section.byteswap()
+
+    # Lay the sections out one after another
+    sections = [pattern_bytes, alphabet_array.tobytes(), symbol_classes, compressed.byte_map,
+                table.tobytes(), bytes(accept), atoms.tobytes()]
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offset = _align(offset)
+        offsets.append(offset)
+        offset += len(section)
+    total_size = offset
+
+    buffer = bytearray(total_size)
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, flags, state_count, class_count,
+                     len(alphabet), dfa.initial, offsets[0], len(pattern_bytes), offsets[1],
+                     offsets[2], offsets[3], offsets[4], offsets[5], len(atoms) // 2, offsets[6],
+                     total_size)
+    for section, start in zip(sections, offsets):
+        buffer[start:start + len(section)] = section
+    return bytes(buffer)
+
+
+def save_dfa(dfa, path, pattern=""):
+    """Write a DFA to path in the binary format"""
+    with open(path, "wb") as f:
+        f.write(dumps(dfa, pattern))
+    return path
+
+
+class MappedDFA:
+    """A DFA backed directly by a buffer in the binary format (usually an mmap)
+
+    The transition table and maps are memoryview casts of the buffer, so
+    opening a file does no parsing and worker processes that map the same
+    file share its pages.
+    """
+
+    def __init__(self, buffer, _file=None, _mmap=None):
+        self._file = _file
+        self._mmap = _mmap
+        self._view = memoryview(buffer)
+
+        (magic, version, flags, self.state_count, self.class_count, self.symbol_count, self.initial,
+         pattern_offset, pattern_length, alphabet_offset, symbol_class_offset,
+         byte_map_offset, table_offset, accept_offset, atom_count, atoms_offset,
+         total_size) = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled DFA file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported DFA file version {version}")
+        if len(self._view) < total_size:
+            raise ValueError("Truncated DFA file")
+
+        entry_code = "I" if flags & FLAG_WIDE else "H"
+        entry_size = 4 if flags & FLAG_WIDE else 2
+        view = self._view
+        self._pattern_view = view[pattern_offset:pattern_offset + pattern_length]
+        self._alphabet = self._section(alphabet_offset, self.symbol_count * 4, "I")
+        self._symbol_classes = view[symbol_class_offset:symbol_class_offset + self.symbol_count]
+        self._byte_map = view[byte_map_offset:byte_map_offset + 256]
+        self._table = self._section(table_offset, self.state_count * self.class_count * entry_size, entry_code)
+        self._accept = view[accept_offset:accept_offset + (self.state_count + 7) // 8]
+        self.symbol_map = None
+        if flags & FLAG_ATOMS:
+            bounds = self._section(atoms_offset, atom_count * 8, "I")
+            self.symbol_map = SymbolMap.from_atoms(list(zip(bounds[0::2], bounds[1::2])))
+            if isinstance(bounds, memoryview):
+                bounds.release()
+        self._wide_classes = None  # Code point -> class for symbols >= 256, built on first use
+
+    def _section(self, offset, length, code):
+        view = self._view[offset:offset + length]
+        if sys.byteorder == "little":
+            return view.cast(code)
+        swapped = array(code, view.tobytes())  # Big-endian host: one copy, then byte swap
+        swapped.byteswap()
+        return swapped
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a DFA file read-only"""
+        f = open(path, "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        return cls(mapped, _file=f, _mmap=mapped)
+
+    @property
+    def pattern(self):
+        return bytes(self._pattern_view).decode("utf-8")
+
+    @property
+    def alphabet(self):
+        return [chr(code) for code in self._alphabet]
+
+    def is_final(self, state):
+        return bool(self._accept[state >> 3] >> (state & 7) & 1)
+
+    def matches(self, data):
+        """Whole-input match of a str, or of bytes/bytearray/memoryview as Latin-1 symbols"""
+        table = self._table
+        state = self.initial * self.class_count
+        for symbol_class in self._classify(data):
+            state = table[state + symbol_class]
+        return self.is_final(state // self.class_count)
+
+    def _classify(self, data):
+        """Input as one class byte per symbol"""
+        if isinstance(data, str):
+            try:
+                data = data.encode("latin-1")
+            except UnicodeEncodeError:
+                byte_map = self._byte_map
+                return bytes(byte_map[ord(char)] if char < "\u0100" else self._wide_class(ord(char))
+                             for char in data)
+        elif not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        return data.translate(self._byte_map)
+
+    def _wide_class(self, code):
+        if self.symbol_map is not None:
+            code = self.symbol_map.representative(code)  # An atom can start below 256
+            if code < 256:
+                return self._byte_map[code]
+        if self._wide_classes is None:
+            self._wide_classes = {c: self._symbol_classes[i] for i, c in enumerate(self._alphabet) if c >= 256}
+        return self._wide_classes.get(code, 0)
+
+    def close(self):
+        """Release the views and the mapping"""
+        for name in ("_pattern_view", "_alphabet", "_symbol_classes", "_byte_map", "_table", "_accept"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_dfa(path):
+    """Open a DFA file for matching (see MappedDFA.open)"""
+    return MappedDFA.open(path)
@@ -0,0 +1,213 @@
+# dfa_codegen.py - Compile a DFA into specialized Python source
+#
+# Instead of interpreting a transition table, generate_source() writes a
+# function for one DFA: every state is a branch of a binary search on the
+# state number, every transition an inline comparison, transitions into a
+# dead state a `return False` and the final check a constant expression.
+# A self-loop on a state skips a long run of looping symbols with slice
+# comparisons and str.lstrip, so "c" + "a" * n spends its time in C.
+#
+# The compiled code object is cached on disk under the hash of the DFA
+# (and the bytecode magic number), so later processes skip generating and
+# compiling. Loading marshalled code runs it, so a cache file is only used
+# when it and its directory belong to the current user and nobody else can
+# write to them, and when its header names this interpreter and this DFA.
+# A DFA over character class atoms first translates the input to atom symbols.
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+
+from Modules.instrumentation import instrumentation
+from Modules.regex_compiler import skip_run
+
+CODEGEN_VERSION = 5
+RUN_MIN = 8  # Shorter self-loop runs are stepped through one symbol at a time
+
+
+def _condition(symbols):
+    if len(symbols) == 1:
+        return f"ch == {symbols[0]!r}"
+    return f"ch in {''.join(symbols)!r}"
+
+
+class _SourceWriter:
+    def __init__(self):
+        self.lines = []
+
+    def line(self, depth, text):
+        self.lines.append("    " * depth + text)
+
+
+def _write_state(out, dfa, state, dead, depth):
+    """Transitions of one state, with ch holding the symbol just read and i the next index"""
+    by_target = {}
+    for symbol, target in sorted(dfa.transitions[state].items()):
+        if target not in dead:
+            by_target.setdefault(target, []).append(symbol)
+    if not by_target:
+        out.line(depth, "return False")
+        return
+    # The self-loop first: it is the branch taken again and again on a run
+    branches = sorted(by_target.items(), key=lambda item: item[0] != state)
+    keyword = "if"
+    for target, symbols in branches:
+        out.line(depth, f"{keyword} {_condition(symbols)}:")
+        if target == state:
+            loop = "".join(symbols)
+            if len(loop) == 1:
+                out.line(depth + 1, f"if data.startswith({loop * RUN_MIN!r}, i):")
+            else:
+                out.line(depth + 1, f"if i + {RUN_MIN} <= n and not data[i:i + {RUN_MIN}].lstrip({loop!r}):")
+            out.line(depth + 2, f"i = skip_run(data, i, {loop!r}, n)")
+        else:
+            out.line(depth + 1, f"state = {target}")
+        keyword = "elif"
+    out.line(depth, "else:")
+    out.line(depth + 1, "return False")
+
+
+def _write_dispatch(out, dfa, states, dead, depth):
+    """Binary search on the state number down to one state"""
+    if len(states) == 1:
+        _write_state(out, dfa, states[0], dead, depth)
+        return
+    middle = len(states) // 2
+    out.line(depth, f"if state < {states[middle]}:")
+    _write_dispatch(out, dfa, states[:middle], dead, depth + 1)
+    out.line(depth, "else:")
+    _write_dispatch(out, dfa, states[middle:], dead, depth + 1)
+
+
+def generate_source(dfa, name="generated_match"):
+    """Python source of a function name(data) -> bool for a complete regex_compiler.DFA
+
+    bytes-like input is read as Latin-1 symbols, like LazyDFA.
+    """
+    dead = set(dfa.dead_states)
+    live = [s for s in range(dfa.state_count) if s not in dead]
+    final = sorted(dfa.final)
+    out = _SourceWriter()
+    out.line(0, f"def {name}(data):")
+    out.line(1, "if not isinstance(data, str):")
+    out.line(2, "data = bytes(data).decode('latin-1')")
+    if dfa.symbol_map is not None:
+        out.line(1, "data = translate(data)")
+    if dfa.initial in dead:
+        out.line(1, "return False")
+        return "\n".join(out.lines) + "\n"
+
+    out.line(1, "n = len(data)")
+    out.line(1, "i = 0")
+    out.line(1, f"state = {dfa.initial}")
+    out.line(1, "while i < n:")
+    out.line(2, "ch = data[i]")
+    out.line(2, "i += 1")
+    _write_dispatch(out, dfa, live, dead, 2)
+    if not final:
+        out.line(1, "return False")
+    elif len(final) == 1:
+        out.line(1, f"return state == {final[0]}")
+    else:
+        out.line(1, f"return state in {set(final)!r}")
+    return "\n".join(out.lines) + "\n"
+
+
+def dfa_hash(dfa):
+    """Stable hex digest of everything the generated code depends on"""
+    description = {
+        "version": CODEGEN_VERSION,
+        "alphabet": list(dfa.alphabet),
+        "initial": dfa.initial,
+        "final": sorted(dfa.final),
+        "transitions": [sorted(trans.items()) for trans in dfa.transitions],
+        "atoms": None if dfa.symbol_map is None else dfa.symbol_map.atoms(),
+    }
+    return hashlib.sha256(json.dumps(description, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def default_cache_dir():
+    """$REGEX2FA_CODEGEN_CACHE, else ~/.cache/regex2fa/codegen"""
+    return os.environ.get("REGEX2FA_CODEGEN_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "regex2fa", "codegen")
+
+
+# Functions already loaded in this process, by DFA hash
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}.{sys.implementation.cache_tag}.code")
+
+
+def _cache_header(digest):
+    """Magic number of this interpreter's bytecode, then the DFA hash"""
+    return importlib.util.MAGIC_NUMBER + bytes.fromhex(digest)
+
+
+def _private(st):
+    """True if a file or directory belongs to this user and only they can write to it"""
+    if not hasattr(os, "getuid"):
+        return True  # No POSIX owners (Windows): the per-user profile directory protects it
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def _read_cached(path, digest):
+    try:
+        with open(path, "rb") as f:
+            if not (_private(os.fstat(f.fileno())) and _private(os.stat(os.path.dirname(path)))):
+                return None  # Someone else could have written it
+            header = _cache_header(digest)
+            if f.read(len(header)) != header:
+                return None  # Another interpreter version, or not this DFA
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_cached(path, code, digest):
+    """Atomically store a code object; a read-only cache directory is not an error"""
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")  # Mode 0600
+        with os.fdopen(fd, "wb") as f:
+            f.write(_cache_header(digest))
+            marshal.dump(code, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def compile_dfa(dfa, cache_dir=None, use_disk=True):
+    """Function data -> bool equivalent to dfa.accepts, generated and compiled once per DFA"""
+    digest = dfa_hash(dfa)
+    with _loaded_lock:
+        function = _loaded.get(digest)
+    if function is not None:
+        return function
+
+    path = _cache_path(cache_dir or default_cache_dir(), digest) if use_disk else None
+    code = _read_cached(path, digest) if path else None
+    if code is None:
+        instrumentation.count("codegen_cache_misses")
+        with instrumentation.span("compile.codegen"):
+            source = generate_source(dfa)
+            code = compile(source, f"<dfa {digest[:12]}>", "exec")
+        if path:
+            _write_cached(path, code, digest)
+    else:
+        instrumentation.count("codegen_cache_hits")
+
+    namespace = {"skip_run": skip_run}
+    if dfa.symbol_map is not None:
+        namespace["translate"] = dfa.symbol_map.translate
+    exec(code, namespace)
+    function = namespace["generated_match"]
+    with _loaded_lock:
+        _loaded.setdefault(digest, function)
+    return function
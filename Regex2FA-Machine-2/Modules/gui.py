@@ -1,15 +1,26 @@
 # gui.py - Simplified version without All Images button
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from PIL import Image, ImageTk
-import os
 import sys
 import io
 
 # Import your modules
 from Modules.nfa import test_string_belongs_to_regex
 from Modules.dfa import DFASimulator
-from Modules.image_generator import AutomataImageGenerator
+from Modules.capabilities import check_capabilities, missing_features
+
+class DisabledImageViewer(tk.Label):
+    """Stands in for ZoomableImageViewer when Pillow is not installed"""
+    
+    def __init__(self, master, placeholder=""):
+        super().__init__(master, text="Table images disabled (Pillow not installed)",
+                         font=("Arial", 12))
+    
+    def show_image(self, image_path):
+        pass
+    
+    def clear(self, text=None):
+        pass
 
 class RegexAutomataGUI:
     def __init__(self, root):
@@ -18,10 +29,13 @@ class RegexAutomataGUI:
         self.root.geometry("1400x800")
         
         self.simulator = DFASimulator()
-        self.image_generator = AutomataImageGenerator()
         
-        # Store image references
-        self.image_references = {}
+        # Image features depend on optional packages; text tables always work
+        self.capabilities = check_capabilities()
+        self.image_generator = None
+        if self.capabilities["table_images"]:
+            from Modules.image_generator import AutomataImageGenerator
+            self.image_generator = AutomataImageGenerator()
         
         self.setup_ui()
         
@@ -39,6 +53,11 @@ class RegexAutomataGUI:
                               font=("Arial", 14))
         regex_label.pack(pady=10)
         
+        # Tell the user which optional features are disabled
+        notes = missing_features(self.capabilities)
+        if notes:
+            tk.Label(self.root, text="\n".join(notes), font=("Arial", 10), fg="darkorange").pack()
+        
         # Input section
         input_frame = tk.Frame(self.root)
         input_frame.pack(pady=20)
@@ -96,10 +115,9 @@ class RegexAutomataGUI:
                                                  font=("Courier", 10))
         self.nfa_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Image label for NFA table image
-        self.nfa_image_label = tk.Label(tab, text="NFA Table Image will appear here",
-                                       font=("Arial", 12))
-        self.nfa_image_label.pack(pady=10)
+        # Zoomable viewer for NFA table image
+        self.nfa_image_viewer = self.create_image_viewer(tab, placeholder="NFA Table Image will appear here")
+        self.nfa_image_viewer.pack(pady=10)
     
     def setup_dfa_tab(self, notebook):
         """Setup DFA tab with text table"""
@@ -111,10 +129,9 @@ class RegexAutomataGUI:
                                                  font=("Courier", 10))
         self.dfa_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Image label for DFA table image
-        self.dfa_image_label = tk.Label(tab, text="DFA Table Image will appear here",
-                                       font=("Arial", 12))
-        self.dfa_image_label.pack(pady=10)
+        # Zoomable viewer for DFA table image
+        self.dfa_image_viewer = self.create_image_viewer(tab, placeholder="DFA Table Image will appear here")
+        self.dfa_image_viewer.pack(pady=10)
     
     def setup_min_dfa_tab(self, notebook):
         """Setup Minimized DFA tab with text table"""
@@ -126,10 +143,9 @@ class RegexAutomataGUI:
                                                      font=("Courier", 10))
         self.min_dfa_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Image label for Minimized DFA table image
-        self.min_dfa_image_label = tk.Label(tab, text="Minimized DFA Table Image will appear here",
-                                           font=("Arial", 12))
-        self.min_dfa_image_label.pack(pady=10)
+        # Zoomable viewer for Minimized DFA table image
+        self.min_dfa_image_viewer = self.create_image_viewer(tab, placeholder="Minimized DFA Table Image will appear here")
+        self.min_dfa_image_viewer.pack(pady=10)
     
     def setup_simulation_tab(self, notebook):
         """Setup simulation tab"""
@@ -140,28 +156,16 @@ class RegexAutomataGUI:
                                                  font=("Courier", 10))
         self.sim_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
-    def load_and_display_image(self, image_path, label_widget, max_size=(600, 400)):
-        """Load and display an image in a label widget"""
-        try:
-            if os.path.exists(image_path):
-                # Open and resize image
-                img = Image.open(image_path)
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # Convert to PhotoImage
-                photo = ImageTk.PhotoImage(img)
-                
-                # Store reference to prevent garbage collection
-                self.image_references[image_path] = photo
-                
-                # Update label
-                label_widget.config(image=photo)
-                label_widget.image = photo
-                label_widget.config(text="")  # Clear text
-            else:
-                label_widget.config(text=f"Image not found:\n{image_path}", image='')
-        except Exception as e:
-            label_widget.config(text=f"Error loading image:\n{str(e)}", image='')
+    def create_image_viewer(self, tab, placeholder):
+        """Zoomable viewer for table images, or a notice when Pillow is missing"""
+        if not self.capabilities["pillow"]:
+            return DisabledImageViewer(tab, placeholder)
+        from Modules.image_viewer import ZoomableImageViewer
+        return ZoomableImageViewer(tab, placeholder=placeholder)
+    
+    def load_and_display_image(self, image_path, viewer):
+        """Load and display an image in a zoomable viewer"""
+        viewer.show_image(image_path)
     
     def test_string(self):
         input_string = self.input_var.get().strip()
@@ -186,8 +190,11 @@ class RegexAutomataGUI:
             dfa_data = self.simulator.get_dfa_data(result)
             
             if dfa_data:
-                # Generate all images
-                all_images = self.image_generator.generate_all_images(result, dfa_data)
+                # Generate all images (skipped when the rendering packages are missing)
+                all_images = {}
+                if self.image_generator:
+                    all_images = self.image_generator.generate_all_images(
+                        result, dfa_data, render_diagrams=self.capabilities["diagrams"])
                 
                 # Display text tables
                 self.display_nfa_table_text(result)
@@ -196,13 +203,13 @@ class RegexAutomataGUI:
                 
                 # Display table images
                 if all_images.get("nfa_table"):
-                    self.load_and_display_image(all_images["nfa_table"], self.nfa_image_label)
+                    self.load_and_display_image(all_images["nfa_table"], self.nfa_image_viewer)
                 
                 if all_images.get("dfa_table"):
-                    self.load_and_display_image(all_images["dfa_table"], self.dfa_image_label)
+                    self.load_and_display_image(all_images["dfa_table"], self.dfa_image_viewer)
                 
                 if all_images.get("min_dfa_table"):
-                    self.load_and_display_image(all_images["min_dfa_table"], self.min_dfa_image_label)
+                    self.load_and_display_image(all_images["min_dfa_table"], self.min_dfa_image_viewer)
                 
                 # Run simulation
                 self.run_simulation(result, input_string)
@@ -350,13 +357,10 @@ class RegexAutomataGUI:
         self.min_dfa_text.delete(1.0, tk.END)
         self.sim_text.delete(1.0, tk.END)
         
-        # Clear image labels
-        self.nfa_image_label.config(text="NFA Table Image will appear here", image='')
-        self.dfa_image_label.config(text="DFA Table Image will appear here", image='')
-        self.min_dfa_image_label.config(text="Minimized DFA Table Image will appear here", image='')
-        
-        # Clear image references
-        self.image_references.clear()
+        # Clear image viewers
+        self.nfa_image_viewer.clear()
+        self.dfa_image_viewer.clear()
+        self.min_dfa_image_viewer.clear()
     
     def clear_all(self):
         """Clear all input and displays"""
@@ -0,0 +1,485 @@
+# http_service.py - Headless HTTP/JSON service exposing the automata engine
+#
+# Endpoints (all bodies and responses are JSON unless noted):
+#   GET  /health                      -> {"status": "ok"}
+#   GET  /stats                       -> compile cache statistics
+#   GET  /metrics                     -> stage timings and counters, Prometheus text
+#                                        (empty unless started with --metrics)
+#   POST /compile     {"pattern"}     -> state counts of every stage
+#   POST /match       {"pattern", "string"}   -> {"matched": bool}
+#   POST /match_batch {"pattern", "strings"}  -> {"results": [bool, ...]}
+#   POST /match_set   {"patterns", "string"}  -> {"matched": [pattern index, ...]}
+#   POST /search      {"pattern", "string"}   -> {"matches": [[start, end], ...]}
+#                                               leftmost-longest, non-overlapping
+#   POST /captures    {"pattern", "string", "search"?}
+#                     -> {"span": [start, end] or null, "groups": [[start, end] or null, ...]}
+#                        whole-string match, or leftmost-longest with "search": true
+#   GET  /artifacts?pattern=..&kind=nfa|dfa|min_dfa&format=json|png|diagram
+#        json    -> transition table
+#        png     -> table image (needs Pillow)
+#        diagram -> state diagram image, dfa and min_dfa only (needs Graphviz)
+#
+# Patterns over the compile budgets (see regex_compiler.CompileLimits) get a
+# 422 response with the budget details; patterns whose DFA alone is over
+# budget can still be matched, through a lazily built DFA.
+#
+# Connections are kept alive, but a worker thread only serves a connection
+# while requests are arriving: new and idle connections wait on a selector
+# and go to the pool when their next request starts, so clients that connect
+# and send nothing never tie up the workers.
+import hashlib
+import json
+import os
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from Modules.instrumentation import instrumentation
+
+from Modules.regex_compiler import RegexSyntaxError, CompileBudgetError, DEFAULT_LIMITS, EPSILON
+from Modules.compile_cache import compile_cache
+from Modules.regex_search import get_searcher
+from Modules.regex_set import get_regex_set
+from Modules.pike_vm import get_pike_vm
+from Modules.capabilities import check_capabilities
+
+ARTIFACT_KINDS = ("nfa", "dfa", "min_dfa")
+IDLE_TIMEOUT = 30  # Seconds a parked keep-alive connection may wait for its next request
+
+
+class ServiceError(Exception):
+    """Request error reported to the client with an HTTP status"""
+
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+    def payload(self):
+        return dict(self.details, error=str(self))
+
+
+def budget_error(e):
+    return ServiceError(422, f"Pattern too complex: {e}", e.to_dict())
+
+
+class AutomataService:
+    """Compiles patterns once and answers match/artifact requests from any thread"""
+
+    def __init__(self, output_dir="automata_images", cache=None):
+        self.output_dir = output_dir
+        self.cache = cache or compile_cache  # Shared across requests and services
+        self._lock = threading.Lock()
+        self._image_generator = None
+
+    def get_compiled(self, pattern):
+        """Return the compiled automata for pattern, compiling it on first use"""
+        if not isinstance(pattern, str):
+            raise ServiceError(400, "'pattern' must be a string")
+        try:
+            return self.cache.get(pattern)
+        except RegexSyntaxError as e:
+            raise ServiceError(400, f"Invalid pattern: {e}")
+        except CompileBudgetError as e:
+            raise budget_error(e)
+
+    def compile(self, body):
+        pattern = body.get("pattern")
+        summary = self.get_compiled(pattern).summary()
+        summary["pattern"] = pattern  # An equivalent spelling may have been compiled first
+        return summary
+
+    def match(self, body):
+        compiled = self.get_compiled(body.get("pattern"))
+        input_string = body.get("string")
+        if not isinstance(input_string, str):
+            raise ServiceError(400, "'string' must be a string")
+        return {"pattern": body["pattern"], "string": input_string,
+                "matched": compiled.matches(input_string)}
+
+    def match_batch(self, body):
+        compiled = self.get_compiled(body.get("pattern"))
+        strings = body.get("strings")
+        if not isinstance(strings, list) or not all(isinstance(s, str) for s in strings):
+            raise ServiceError(400, "'strings' must be a list of strings")
+        matches = compiled.matches
+        return {"pattern": body["pattern"], "results": [matches(s) for s in strings]}
+
+    def match_set(self, body):
+        patterns = body.get("patterns")
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            raise ServiceError(400, "'patterns' must be a list of strings")
+        input_string = body.get("string")
+        if not isinstance(input_string, str):
+            raise ServiceError(400, "'string' must be a string")
+        try:
+            regex_set = get_regex_set(tuple(patterns))
+        except RegexSyntaxError as e:
+            raise ServiceError(400, f"Invalid pattern: {e}")
+        except CompileBudgetError as e:
+            raise budget_error(e)
+        return {"string": input_string, "matched": regex_set.matches(input_string)}
+
+    def search(self, body):
+        pattern = body.get("pattern")
+        if not isinstance(pattern, str):
+            raise ServiceError(400, "'pattern' must be a string")
+        input_string = body.get("string")
+        if not isinstance(input_string, str):
+            raise ServiceError(400, "'string' must be a string")
+        try:
+            matches = get_searcher(pattern).findall(input_string)
+        except RegexSyntaxError as e:
+            raise ServiceError(400, f"Invalid pattern: {e}")
+        except CompileBudgetError as e:
+            raise budget_error(e)
+        return {"pattern": pattern, "string": input_string, "matches": [list(m) for m in matches]}
+
+    def captures(self, body):
+        pattern = body.get("pattern")
+        if not isinstance(pattern, str):
+            raise ServiceError(400, "'pattern' must be a string")
+        input_string = body.get("string")
+        if not isinstance(input_string, str):
+            raise ServiceError(400, "'string' must be a string")
+        try:
+            vm = get_pike_vm(pattern)
+        except RegexSyntaxError as e:
+            raise ServiceError(400, f"Invalid pattern: {e}")
+        except CompileBudgetError as e:
+            raise budget_error(e)
+        match = vm.search(input_string) if body.get("search") else vm.fullmatch(input_string)
+        if match is None:
+            return {"pattern": pattern, "string": input_string, "span": None, "groups": None}
+        groups = [None if span[0] < 0 else list(span) for span in match.spans()]
+        return {"pattern": pattern, "string": input_string, "span": list(match.span()), "groups": groups}
+
+    def artifact(self, pattern, kind, fmt):
+        """Return (content_type, bytes) for a rendered artifact of a pattern"""
+        if kind not in ARTIFACT_KINDS:
+            raise ServiceError(400, f"'kind' must be one of {', '.join(ARTIFACT_KINDS)}")
+        compiled = self.get_compiled(pattern)
+        if kind != "nfa":
+            try:
+                compiled.require_dfa()
+            except CompileBudgetError as e:
+                raise budget_error(e)
+        try:
+            automaton = getattr(compiled, kind)
+        except CompileBudgetError as e:
+            raise budget_error(e)  # The NFA alone is over budget; a counting matcher matches it
+        table = automaton.to_table(letters=True) if kind == "min_dfa" else automaton.to_table()
+
+        if fmt == "json":
+            return "application/json", json.dumps(table_to_json(table)).encode("utf-8")
+        if fmt not in ("png", "diagram"):
+            raise ServiceError(400, "'format' must be json, png or diagram")
+
+        if fmt == "diagram" and kind == "nfa":
+            raise ServiceError(400, "Diagrams are only available for dfa and min_dfa")
+        if fmt == "diagram" and not check_capabilities()["diagrams"]:
+            raise ServiceError(503, "Diagram rendering disabled: Graphviz is not installed")
+        if fmt == "diagram":
+            try:
+                DEFAULT_LIMITS.check_diagram(len(table["transitions"]))
+            except CompileBudgetError as e:
+                raise budget_error(e)
+
+        generator = self.get_image_generator()
+        # Rendered files are named by pattern hash so they can be reused
+        name = f"{kind}_{hashlib.sha1(pattern.encode('utf-8')).hexdigest()[:12]}"
+        try:
+            if fmt == "png":
+                headers, rows = table_rows(table, automaton.display_alphabet, with_epsilon=(kind == "nfa"))
+                path = os.path.join(self.output_dir, f"{name}_table.png")
+                if not os.path.exists(path):
+                    path = generator.generate_table_image(f"{kind.upper()} table for '{pattern}'",
+                                                          headers, rows, f"{name}_table.png")
+            else:
+                path = os.path.join(self.output_dir, f"dfa_diagram_{name}.png")
+                if not os.path.exists(path):
+                    path = generator.generate_dfa_diagram(name, table)
+        except Exception as e:
+            # e.g. the Graphviz 'dot' executable is not installed
+            raise ServiceError(503, f"Rendering unavailable: {e}")
+
+        if not path or not os.path.exists(path):
+            raise ServiceError(500, "Rendering failed")
+        with open(path, "rb") as f:
+            return "image/png", f.read()
+
+    def get_image_generator(self):
+        """Image rendering needs Pillow and Graphviz, so it is loaded only on demand"""
+        if self._image_generator is None:
+            try:
+                from Modules.image_generator import AutomataImageGenerator
+            except ImportError as e:
+                raise ServiceError(503, f"Rendering unavailable: {e}")
+            with self._lock:
+                if self._image_generator is None:
+                    self._image_generator = AutomataImageGenerator(self.output_dir)
+        return self._image_generator
+
+
+def table_to_json(table):
+    """Sets are not JSON serializable; turn them into sorted lists"""
+    def convert(value):
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, set):
+            return sorted(value)
+        return value
+    return convert(table)
+
+
+def table_rows(table, alphabet, with_epsilon=False):
+    """Headers and rows for AutomataImageGenerator.generate_table_image"""
+    symbols = list(alphabet) + ([EPSILON] if with_epsilon else [])
+    rows = []
+    for state, trans in table["transitions"].items():
+        label = state + ("*" if state in table["final"] else "")
+        row = [label]
+        for symbol in symbols:
+            target = trans.get(symbol)
+            if target is None:
+                row.append("-")
+            elif isinstance(target, set):
+                row.append("{" + ",".join(sorted(target)) + "}")
+            else:
+                row.append(target)
+        rows.append(row)
+    return ["State"] + symbols, rows
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the AutomataService of the server"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive so clients can reuse connections
+    timeout = 10                   # A request that has started must arrive within this
+    disable_nagle_algorithm = True  # Headers and body are separate writes; don't hold the body back
+
+    POST_ROUTES = {
+        "/compile": AutomataService.compile,
+        "/match": AutomataService.match,
+        "/match_batch": AutomataService.match_batch,
+        "/match_set": AutomataService.match_set,
+        "/search": AutomataService.search,
+        "/captures": AutomataService.captures,
+    }
+
+    def handle(self):
+        """Serve requests while the next one is already here; the server parks the connection after"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.request_ready():
+            self.handle_one_request()
+
+    def request_ready(self):
+        """True if bytes of another request are buffered or waiting on the socket"""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/health":
+                self.send_json(200, {"status": "ok"})
+            elif url.path == "/stats":
+                self.send_json(200, self.server.service.cache.stats())
+            elif url.path == "/metrics":
+                self.send_bytes(200, "text/plain; version=0.0.4",
+                                instrumentation.to_prometheus().encode("utf-8"))
+            elif url.path == "/artifacts":
+                query = parse_qs(url.query)
+                pattern = query.get("pattern", [None])[0]
+                kind = query.get("kind", ["min_dfa"])[0]
+                fmt = query.get("format", ["json"])[0]
+                content_type, data = self.server.service.artifact(pattern, kind, fmt)
+                self.send_bytes(200, content_type, data)
+            else:
+                raise ServiceError(404, f"Unknown endpoint: {url.path}")
+        except ServiceError as e:
+            self.send_json(e.status, e.payload())
+        except Exception as e:
+            self.send_json(500, {"error": f"Internal error: {e}"})
+
+    def do_POST(self):
+        route = self.POST_ROUTES.get(urlparse(self.path).path)
+        try:
+            body = self.read_json()
+            if route is None:
+                raise ServiceError(404, f"Unknown endpoint: {self.path}")
+            self.send_json(200, route(self.server.service, body))
+        except ServiceError as e:
+            self.send_json(e.status, e.payload())
+        except Exception as e:
+            self.send_json(500, {"error": f"Internal error: {e}"})
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            raise ServiceError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Request body must be a JSON object")
+        return body
+
+    def send_json(self, status, payload):
+        self.send_bytes(status, "application/json", json.dumps(payload).encode("utf-8"))
+
+    def send_bytes(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate at high request rates
+
+
+class IdleConnections:
+    """Connections waiting for their next request, watched by one thread
+
+    A connection that becomes readable is handed to the server's pool; one
+    left idle for IDLE_TIMEOUT seconds is closed.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.closed = False
+        # Writing to the wake socket interrupts select() when a connection is parked
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def park(self, request, client_address):
+        with self.lock:
+            if self.closed:
+                self.server.shutdown_request(request)
+                return
+            self.selector.register(request, selectors.EVENT_READ,
+                                   (client_address, time.monotonic() + IDLE_TIMEOUT))
+        self.wake_writer.send(b"\0")
+
+    def run(self):
+        while True:
+            events = self.selector.select(timeout=1)
+            with self.lock:
+                if self.closed:
+                    return
+                ready = []
+                for key, _ in events:
+                    if key.fileobj is self.wake_reader:
+                        try:
+                            self.wake_reader.recv(4096)
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self.selector.unregister(key.fileobj)
+                        ready.append((key.fileobj, key.data[0]))
+                now = time.monotonic()
+                expired = [key.fileobj for key in self.selector.get_map().values()
+                           if key.fileobj is not self.wake_reader and key.data[1] <= now]
+                for request in expired:
+                    self.selector.unregister(request)
+            for request, client_address in ready:
+                self.server.dispatch(request, client_address)
+            for request in expired:
+                self.server.shutdown_request(request)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            parked = [key.fileobj for key in self.selector.get_map().values()
+                      if key.fileobj is not self.wake_reader]
+            for request in parked:
+                self.selector.unregister(request)
+        self.wake_writer.send(b"\0")
+        self.thread.join()
+        for request in parked:
+            self.server.shutdown_request(request)
+        self.selector.close()
+        self.wake_reader.close()
+        self.wake_writer.close()
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles requests on a fixed pool of worker threads
+
+    A worker serves a connection only while it has requests to answer; new
+    and idle keep-alive connections wait in IdleConnections instead.
+    server_close() closes the parked connections and waits for the workers.
+    """
+
+    def __init__(self, address, service, workers=8):
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.idle = IdleConnections(self)
+
+    def process_request(self, request, client_address):
+        self.idle.park(request, client_address)
+
+    def dispatch(self, request, client_address):
+        try:
+            self.pool.submit(self.process_request_thread, request, client_address)
+        except RuntimeError:
+            self.shutdown_request(request)  # The pool is shut down
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            handler = self.finish_request(request, client_address)
+        except ConnectionError:
+            self.shutdown_request(request)  # The client went away mid-request
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+        else:
+            if handler.close_connection:
+                self.shutdown_request(request)
+            else:
+                self.idle.park(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.idle.close()
+        self.pool.shutdown(wait=True)
+
+
+def start_server(host="127.0.0.1", port=0, workers=8, service=None):
+    """Start the service on a background thread; port 0 picks a free port"""
+    server = PooledHTTPServer((host, port), service or AutomataService(), workers)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_server(host="127.0.0.1", port=8080, workers=8):
+    """Serve until interrupted"""
+    server = PooledHTTPServer((host, port), AutomataService(), workers)
+    print(f"Automata service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
@@ -1,9 +1,16 @@
 # image_generator.py
-from graphviz import Digraph
 import os
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
 
+from Modules.instrumentation import timed
+from Modules.regex_compiler import DEFAULT_LIMITS
+
+try:
+    from graphviz import Digraph
+except ImportError:
+    Digraph = None  # State diagrams are disabled; table images still work
+
 class AutomataImageGenerator:
     def __init__(self, output_dir="automata_images"):
         """Initialize image generator with output directory"""
@@ -11,6 +18,7 @@ class AutomataImageGenerator:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
     
+    @timed("render.generate_table_image")
     def generate_table_image(self, title, headers, data, filename):
         """Generate a table image from data"""
         try:
@@ -84,6 +92,7 @@ class AutomataImageGenerator:
             print(f"Error generating table image: {e}")
             return None
     
+    @timed("render.generate_nfa_table_image")
     def generate_nfa_table_image(self, pattern):
         """Generate NFA table image for specific pattern"""
         if pattern == "aba":
@@ -195,6 +204,7 @@ class AutomataImageGenerator:
         filename = f"nfa_table_{pattern}.png"
         return self.generate_table_image(title, headers, data, filename)
     
+    @timed("render.generate_dfa_table_image")
     def generate_dfa_table_image(self, pattern, dfa_data):
         """Generate DFA table image for specific pattern"""
         if pattern == "aba":
@@ -275,6 +285,7 @@ class AutomataImageGenerator:
         filename = f"dfa_table_{pattern}.png"
         return self.generate_table_image(title, headers, data, filename)
     
+    @timed("render.generate_min_dfa_table_image")
     def generate_min_dfa_table_image(self, pattern):
         """Generate Minimized DFA table image for specific pattern"""
         if pattern == "aba":
@@ -353,6 +364,7 @@ class AutomataImageGenerator:
         filename = f"min_dfa_table_{pattern}.png"
         return self.generate_table_image(title, headers, data, filename)
     
+    @timed("render.generate_nfa_diagram")
     def generate_nfa_diagram(self, pattern, nfa_type):
         """Generate NFA diagram for specific pattern"""
         dot = Digraph(comment=f'NFA for {pattern}', format='png')
@@ -485,8 +497,11 @@ class AutomataImageGenerator:
         dot.render(filename.replace('.png', ''), cleanup=True)
         return filename
     
+    @timed("render.generate_dfa_diagram")
     def generate_dfa_diagram(self, pattern, dfa_data):
         """Generate DFA diagram for specific pattern"""
+        # Large graphs can keep 'dot' busy for minutes; raises CompileBudgetError
+        DEFAULT_LIMITS.check_diagram(len(dfa_data["transitions"]))
         dot = Digraph(comment=f'DFA for {pattern}', format='png')
         dot.attr(rankdir='LR')
         
@@ -530,6 +545,7 @@ class AutomataImageGenerator:
         dot.render(filename.replace('.png', ''), cleanup=True)
         return filename
     
+    @timed("render.generate_minimized_dfa_diagram")
     def generate_minimized_dfa_diagram(self, pattern):
         """Generate minimized DFA diagram"""
         dot = Digraph(comment=f'Minimized DFA for {pattern}', format='png')
@@ -646,7 +662,8 @@ class AutomataImageGenerator:
         dot.render(filename.replace('.png', ''), cleanup=True)
         return filename
     
-    def generate_all_images(self, pattern, dfa_data):
+    @timed("render.generate_all_images")
+    def generate_all_images(self, pattern, dfa_data, render_diagrams=True):
         """Generate all types of images for a pattern"""
         images = {}
         
@@ -655,10 +672,15 @@ class AutomataImageGenerator:
         dfa_table = self.generate_dfa_table_image(pattern, dfa_data)
         min_dfa_table = self.generate_min_dfa_table_image(pattern)
         
-        # Generate diagram images
-        nfa_diagram = self.generate_nfa_diagram(pattern, pattern)
-        dfa_diagram = self.generate_dfa_diagram(pattern, dfa_data)
-        min_dfa_diagram = self.generate_minimized_dfa_diagram(pattern)
+        # Generate diagram images (needs the graphviz package and the 'dot' executable)
+        nfa_diagram = dfa_diagram = min_dfa_diagram = None
+        if render_diagrams and Digraph is not None:
+            try:
+                nfa_diagram = self.generate_nfa_diagram(pattern, pattern)
+                dfa_diagram = self.generate_dfa_diagram(pattern, dfa_data)
+                min_dfa_diagram = self.generate_minimized_dfa_diagram(pattern)
+            except Exception as e:
+                print(f"Error generating diagram images: {e}")
         
         # Store all image paths
         images = {
@@ -0,0 +1,383 @@
+# image_viewer.py - Zoomable image viewer backed by a shared decoded-image cache
+#
+# Decoding and every resample run on a worker thread; the Tk thread only
+# draws finished images and, meanwhile, a quick preview of the visible area
+# cut from a level that is already cached. The viewer remembers the size of
+# the decoded image, so the Tk thread never has to decode it again after
+# the cache evicted it.
+# Every cached level counts against the cache budget. A zoom level too big
+# to cache is never built whole: only the visible region is resampled, again
+# after each pan.
+import os
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+
+# Zoom levels of the image pyramid (1.0 = full resolution of the PNG)
+ZOOM_LEVELS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+
+
+class ImageCache:
+    """Bounded LRU cache of decoded images and their zoom levels, keyed by (path, mtime)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes      # Budget for all cached pixels
+        self.total_bytes = 0
+        self._entries = OrderedDict()   # (path, mtime) -> {zoom: PIL image}
+        self._lock = threading.Lock()   # Levels are resampled on a worker thread
+
+    @staticmethod
+    def image_bytes(img):
+        """Approximate decoded size of an image in bytes"""
+        return img.width * img.height * len(img.getbands())
+
+    @staticmethod
+    def get_key(path):
+        """Cache key for a file: a regenerated PNG gets a new mtime and so a new entry"""
+        return (os.path.abspath(path), os.path.getmtime(path))
+
+    def load(self, key):
+        """Return the full resolution image for key, decoding the file on a miss"""
+        with self._lock:
+            levels = self._entries.get(key)
+            if levels is not None:
+                self._entries.move_to_end(key)
+                return levels[1.0]
+
+        with Image.open(key[0]) as f:
+            img = f.copy()  # Decode now and release the file handle
+
+        with self._lock:
+            # Older versions of the same file can never be hit again
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._drop(stale)
+            if key not in self._entries:
+                self._entries[key] = {}
+                self._store(key, 1.0, img)
+            else:
+                img = self._entries[key][1.0]  # Another thread decoded it first
+        return img
+
+    def level_fits(self, size, bands, zoom):
+        """True if an image of size (width, height) at zoom is small enough to be resampled whole and cached
+
+        A level may take a quarter of the budget, so the full resolution
+        image and a few levels of the displayed entry fit together.
+        """
+        return size[0] * zoom * size[1] * zoom * bands <= self.max_bytes // 4
+
+    def get_level(self, key, zoom):
+        """Return the cached image for key at zoom, or None if it is not resampled yet"""
+        with self._lock:
+            levels = self._entries.get(key)
+            if levels is None:
+                return None
+            self._entries.move_to_end(key)
+            return levels.get(zoom)
+
+    def nearest_level(self, key, zoom):
+        """Return (zoom, image) of the cached level closest to zoom"""
+        with self._lock:
+            levels = self._entries.get(key)
+            if not levels:
+                return None, None
+            nearest = min(levels, key=lambda z: abs(z - zoom))
+            return nearest, levels[nearest]
+
+    def build_level(self, key, zoom):
+        """Resample key to zoom from the closest finer cached level and cache it"""
+        level = self.get_level(key, zoom)
+        if level is not None:
+            return level
+
+        base = self.load(key)
+        with self._lock:
+            levels = self._entries.get(key, {})
+            finer = [z for z in levels if z >= zoom]
+            source_zoom = min(finer) if finer else 1.0
+            source = levels.get(source_zoom, base)
+
+        size = (max(1, round(base.width * zoom)), max(1, round(base.height * zoom)))
+        img = source.resize(size, Image.Resampling.LANCZOS)
+
+        with self._lock:
+            if key in self._entries:
+                self._store(key, zoom, img)
+        return img
+
+    def render_region(self, key, zoom, box, resample=Image.Resampling.LANCZOS):
+        """Resample only box = (left, top, right, bottom) of key at zoom, without caching it"""
+        return self._region(key, zoom, box, resample, self.load(key))
+
+    def preview_region(self, key, zoom, box):
+        """render_region() with a cheap filter from cached levels only, or None if key is not cached
+
+        Never decodes, so it is safe to call on the Tk thread.
+        """
+        return self._region(key, zoom, box, Image.Resampling.NEAREST)
+
+    def _region(self, key, zoom, box, resample, base=None):
+        with self._lock:
+            levels = dict(self._entries.get(key, {}))
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        if base is not None:
+            levels.setdefault(1.0, base)  # Evicted again since it was loaded
+        if 1.0 not in levels:
+            return None
+        base = levels[1.0]
+        finer = [z for z in levels if z >= zoom]
+        source = levels[min(finer) if finer else max(levels)]
+        scale = source.width / (base.width * zoom)  # Source pixels per displayed pixel
+        left, top, right, bottom = box
+        return source.resize((max(1, right - left), max(1, bottom - top)), resample,
+                             box=(left * scale, top * scale, right * scale, bottom * scale))
+
+    def clear(self):
+        """Drop every cached image"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _store(self, key, zoom, img):
+        """Add one level to an entry and evict until the cache is within budget
+
+        Least recently used entries go first, then the other resampled
+        levels of this entry, oldest first. The full resolution image of
+        the entry being displayed is always kept; any other level that
+        still does not fit is not cached.
+        """
+        levels = self._entries[key]
+        if zoom in levels:
+            self.total_bytes -= self.image_bytes(levels.pop(zoom))
+        levels[zoom] = img
+        self.total_bytes += self.image_bytes(img)
+        self._entries.move_to_end(key)
+
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+        for other in [z for z in levels if z not in (1.0, zoom)]:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= self.image_bytes(levels.pop(other))
+        if self.total_bytes > self.max_bytes and zoom != 1.0:
+            self.total_bytes -= self.image_bytes(levels.pop(zoom))
+
+    def _drop(self, key):
+        levels = self._entries.pop(key)
+        self.total_bytes -= sum(self.image_bytes(img) for img in levels.values())
+
+
+# One cache shared by every viewer in the process
+shared_image_cache = ImageCache()
+
+
+class ZoomableImageViewer(tk.Frame):
+    """Scrollable canvas that shows an image at the zoom levels of an ImageCache"""
+
+    # Single background worker so resampling never blocks the Tk event loop
+    _executor = ThreadPoolExecutor(max_workers=1)
+
+    def __init__(self, master, placeholder="", fit_size=(600, 400), cache=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.cache = cache or shared_image_cache
+        self.placeholder = placeholder
+        self.fit_size = fit_size
+        self.key = None
+        self.zoom = 1.0
+        self.base_size = (0, 0)  # Size and band count of the decoded image, so render never decodes
+        self.base_bands = 0
+        self.photo = None  # Keep reference to prevent garbage collection
+        self.region = None  # Box drawn when the level is too big to resample whole
+        self.level_size = (0, 0)
+        self._request = 0   # Bumped on every render; stale background results are dropped
+        self._future = None
+        self._pan_pending = False
+
+        # Zoom controls
+        toolbar = tk.Frame(self)
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="−", width=3, command=self.zoom_out).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="+", width=3, command=self.zoom_in).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="Fit", command=self.zoom_fit).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="100%", command=lambda: self.set_zoom(1.0)).pack(side=tk.LEFT, padx=2)
+        self.zoom_label = tk.Label(toolbar, text="", font=("Arial", 10))
+        self.zoom_label.pack(side=tk.LEFT, padx=10)
+
+        # Canvas with scrollbars for panning
+        body = tk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, width=fit_size[0], height=fit_size[1],
+                                bg="white", highlightthickness=0)
+        x_scroll = tk.Scrollbar(body, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        y_scroll = tk.Scrollbar(body, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(xscrollcommand=lambda *view: (x_scroll.set(*view), self._view_changed()),
+                              yscrollcommand=lambda *view: (y_scroll.set(*view), self._view_changed()))
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        y_scroll.grid(row=0, column=1, sticky="ns")
+        x_scroll.grid(row=1, column=0, sticky="ew")
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+
+        # Drag to pan, Ctrl + mouse wheel to zoom (Button-4/5 on X11)
+        self.canvas.bind("<ButtonPress-1>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<B1-Motion>", lambda e: self.canvas.scan_dragto(e.x, e.y, gain=1))
+        self.canvas.bind("<Control-MouseWheel>",
+                         lambda e: self.zoom_in() if e.delta > 0 else self.zoom_out())
+        self.canvas.bind("<Control-Button-4>", lambda e: self.zoom_in())
+        self.canvas.bind("<Control-Button-5>", lambda e: self.zoom_out())
+
+        self.clear()
+
+    def show_image(self, image_path):
+        """Display an image file, fitted to the viewer, once it is decoded in the background"""
+        if not os.path.exists(image_path):
+            self.clear(f"Image not found:\n{image_path}")
+            return
+        try:
+            key = self.cache.get_key(image_path)
+        except OSError as e:
+            self.clear(f"Error loading image:\n{str(e)}")
+            return
+        self.clear("Loading...")
+        self._request += 1
+        self._submit(self.cache.load, key)(lambda base: self._loaded(key, base))
+
+    def _loaded(self, key, base):
+        self.key = key  # Zoom controls stay inactive until the image is decoded
+        self.base_size = base.size
+        self.base_bands = len(base.getbands())
+        self.zoom = self.fit_zoom()
+        self.render()
+
+    def clear(self, text=None):
+        """Remove the image and show a text message instead"""
+        self.key = None
+        self.photo = None
+        self.region = None
+        self._request += 1
+        self.canvas.delete("all")
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.canvas.create_text(self.fit_size[0] // 2, self.fit_size[1] // 2,
+                                text=text if text is not None else self.placeholder,
+                                font=("Arial", 12), justify=tk.CENTER)
+        self.zoom_label.config(text="")
+
+    def fit_zoom(self):
+        """Largest zoom level (at most 100%) at which the whole image fits the viewer"""
+        width, height = self.base_size
+        fitting = [z for z in ZOOM_LEVELS
+                   if z <= 1.0 and width * z <= self.fit_size[0] and height * z <= self.fit_size[1]]
+        return max(fitting) if fitting else ZOOM_LEVELS[0]
+
+    def set_zoom(self, zoom):
+        if self.key is None or zoom == self.zoom:
+            return
+        self.zoom = zoom
+        self.render()
+
+    def zoom_in(self):
+        larger = [z for z in ZOOM_LEVELS if z > self.zoom]
+        if larger:
+            self.set_zoom(larger[0])
+
+    def zoom_out(self):
+        smaller = [z for z in ZOOM_LEVELS if z < self.zoom]
+        if smaller:
+            self.set_zoom(smaller[-1])
+
+    def zoom_fit(self):
+        if self.key is not None:
+            self.set_zoom(self.fit_zoom())
+
+    def render(self):
+        """Draw the current zoom level, resampling it in the background if needed"""
+        key, zoom = self.key, self.zoom
+        width, height = max(1, round(self.base_size[0] * zoom)), max(1, round(self.base_size[1] * zoom))
+        self.level_size = (width, height)
+
+        # Keep the visible region in place across zoom changes
+        x_view = self.canvas.xview()[0]
+        y_view = self.canvas.yview()[0]
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        self.canvas.xview_moveto(x_view)
+        self.canvas.yview_moveto(y_view)
+        self.zoom_label.config(text=f"{int(zoom * 100)}%")
+        self._request += 1
+
+        level = self.cache.get_level(key, zoom)
+        if level is not None:
+            self.region = None
+            self._draw(level, 0, 0)
+            return
+
+        # Show the visible area of the nearest cached level right away, stretched with a cheap filter;
+        # if the cache evicted the image meanwhile, the worker decodes it again first
+        box = self.visible_box(width, height)
+        preview = self.cache.preview_region(key, zoom, box)
+        if preview is not None:
+            self._draw(preview, box[0], box[1])
+        if self.cache.level_fits(self.base_size, self.base_bands, zoom):
+            self.region = None
+            self._submit(self.cache.build_level, key, zoom)(lambda img: self._draw(img, 0, 0))
+        else:
+            # Too big to build whole: resample what is visible, again after every pan
+            self.region = box
+            self._submit(self.cache.render_region, key, zoom, box)(
+                lambda img: self._draw(img, box[0], box[1]))
+
+    def visible_box(self, width, height):
+        """(left, top, right, bottom) of the canvas area on screen, within width x height"""
+        view_width = self.canvas.winfo_width() if self.canvas.winfo_width() > 1 else self.fit_size[0]
+        view_height = self.canvas.winfo_height() if self.canvas.winfo_height() > 1 else self.fit_size[1]
+        left = min(max(0, int(self.canvas.canvasx(0))), width - 1)
+        top = min(max(0, int(self.canvas.canvasy(0))), height - 1)
+        return left, top, min(width, left + view_width), min(height, top + view_height)
+
+    def _view_changed(self):
+        """After a pan, resample the newly visible region of a level drawn region by region"""
+        if self.region is None or self._pan_pending:
+            return
+        self._pan_pending = True
+        self.after(50, self._pan)
+
+    def _pan(self):
+        self._pan_pending = False
+        if self.region is not None and self.key is not None:
+            if self.visible_box(*self.level_size) != self.region:
+                self.render()
+
+    def _submit(self, function, *args):
+        """Run function(*args) on the worker; the returned callback setter runs on the Tk thread
+
+        The result is dropped if the viewer rendered or loaded something
+        else in the meantime.
+        """
+        request = self._request
+        if self._future is not None:
+            self._future.cancel()  # A queued resample nobody will look at
+        self._future = future = self._executor.submit(function, *args)
+
+        def then(callback):
+            self.after(30, self._poll, future, request, callback)
+        return then
+
+    def _poll(self, future, request, callback):
+        """Hand the finished background result to callback"""
+        if not future.done():
+            self.after(30, self._poll, future, request, callback)
+            return
+        if future.cancelled() or request != self._request:
+            return  # User zoomed again or loaded another image meanwhile
+        try:
+            callback(future.result())
+        except Exception as e:
+            self.clear(f"Error loading image:\n{str(e)}")
+
+    def _draw(self, img, x, y):
+        self.photo = ImageTk.PhotoImage(img)
+        self.canvas.delete("all")
+        self.canvas.create_image(x, y, anchor="nw", image=self.photo)
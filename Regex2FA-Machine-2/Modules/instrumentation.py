@@ -0,0 +1,156 @@
+# instrumentation.py - Lightweight timing spans and counters for the pipeline
+#
+# Disabled by default: span() then returns a shared do-nothing context manager
+# and count() returns after one flag check, so instrumented code pays almost
+# nothing. Enable it with enable(), then read snapshot() or write the data
+# with write_json() / write_prometheus().
+#
+# Spans:    compile.parse, compile.thompson, compile.reduce, compile.subset, compile.followpos,
+#           compile.minimize, compile.codegen, render.<generate_* method>, simulate_dfa, match
+# Counters: nfa_states_created, dfa_states_created, min_dfa_states_created,
+#           epsilon_closure_cache_hits, epsilon_closure_cache_misses,
+#           codegen_cache_hits, codegen_cache_misses, reduced_nfa_states,
+#           lazy_fallbacks, counting_fallbacks, search_pike_fallbacks,
+#           transitions_taken, match_calls
+import functools
+import json
+import threading
+import time
+
+
+class _NullSpan:
+    """Context manager used while instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    """Collects span durations and counters while enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.on_span = None  # Optional callback(name, seconds) for every finished span
+        self._spans = {}     # name -> [count, total seconds, max seconds]
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self, on_span=None):
+        self.on_span = on_span
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def span(self, name):
+        """Context manager timing a block under name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def count(self, name, amount=1):
+        """Add amount to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_span(self, name, seconds):
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                self._spans[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+        if self.on_span is not None:
+            self.on_span(name, seconds)
+
+    def snapshot(self):
+        """Copy of everything recorded so far"""
+        with self._lock:
+            return {
+                "spans": {name: {"count": c, "total_seconds": total, "max_seconds": longest}
+                          for name, (c, total, longest) in self._spans.items()},
+                "counters": dict(self._counters)
+            }
+
+    def to_prometheus(self):
+        """Snapshot in the Prometheus text exposition format"""
+        data = self.snapshot()
+        lines = [
+            "# HELP regex2fa_span_seconds_total Time spent in each pipeline stage",
+            "# TYPE regex2fa_span_seconds_total counter",
+        ]
+        for name, span in sorted(data["spans"].items()):
+            lines.append(f'regex2fa_span_seconds_total{{span="{name}"}} {span["total_seconds"]:.9f}')
+        lines += ["# HELP regex2fa_span_calls_total Number of times each stage ran",
+                  "# TYPE regex2fa_span_calls_total counter"]
+        for name, span in sorted(data["spans"].items()):
+            lines.append(f'regex2fa_span_calls_total{{span="{name}"}} {span["count"]}')
+        lines += ["# HELP regex2fa_span_seconds_max Longest single run of each stage",
+                  "# TYPE regex2fa_span_seconds_max gauge"]
+        for name, span in sorted(data["spans"].items()):
+            lines.append(f'regex2fa_span_seconds_max{{span="{name}"}} {span["max_seconds"]:.9f}')
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"# TYPE regex2fa_{name}_total counter")
+            lines.append(f"regex2fa_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def write_prometheus(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_prometheus())
+
+    def write(self, path):
+        """Write Prometheus text for *.prom / *.txt paths, JSON otherwise"""
+        if path.endswith((".prom", ".txt")):
+            self.write_prometheus(path)
+        else:
+            self.write_json(path)
+
+
+# Process-wide recorder used by every module
+instrumentation = Instrumentation()
+
+
+def timed(name):
+    """Decorator recording a span around every call of a function"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            with _Span(instrumentation, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,41 +1,30 @@
-import re
+from Modules.regex_compiler import COURSE_PATTERN, compile_regex
+
+# The course pattern is compiled once; its minimized DFA decides membership
+# in a single left-to-right pass, so the time is linear in the input length
+COURSE_REGEX = compile_regex(COURSE_PATTERN, simplify=True)
+
+# Accepted strings with their own NFA/DFA display; every other accepted
+# string is c followed by four or more a's
+STRING_LABELS = {
+    "aba": "aba",
+    "bb": "bb",
+    "c": "c_only",
+    "ca": "ca",
+    "caa": "caa",
+    "caaa": "caaa",
+}
 
 def test_string_belongs_to_regex(input_string):
     """Test if the input string belongs to the regular expression aba + bb + c(aaa+aa+a)*"""
     
-    # Pattern for aba - matches exactly "aba"
-    aba_pattern = r'^aba$'
-    
-    
-    # Pattern for bb - matches exactly "bb" 
-    bb_pattern = r'^bb$'
-    
-    # Pattern for c followed by any number of 'a's (0, 1, 2, or 3 in sequence, repeated)
-    # ^c - starts with 'c'
-    # (a{1,3})* - zero or more occurrences of 'a' repeated 1, 2, or 3 times
-    # $ - end of string
-    c_pattern = r'^c(a{1,3})*$'
-    
-    # Test all patterns in order of specificity
-    if re.match(aba_pattern, input_string):
-        return "aba"  # String matches 'aba' pattern
-    elif re.match(bb_pattern, input_string):
-        return "bb"   # String matches 'bb' pattern
-    elif re.match(c_pattern, input_string):
-        # Determine which specific c pattern the string belongs to
-        if input_string == "c":
-            return "c_only"      # Just 'c' with no 'a's
-        elif input_string == "ca":
-            return "ca"          # 'c' followed by one 'a'
-        elif input_string == "caa":
-            return "caa"         # 'c' followed by two 'a's
-        elif input_string == "caaa":
-            return "caaa"        # 'c' followed by three 'a's
-        else:
-            # For caaaa, caaaaa, etc. - strings that use the Kleene star repetition
-            return "c_kleene_star"
-    else:
+    # Accept or reject using the compiled DFA
+    if not COURSE_REGEX.matches(input_string):
         return None  # String doesn't match any pattern
+    
+    # Determine which specific sub-pattern the string belongs to
+    # For caaaa, caaaaa, etc. - strings that use the Kleene star repetition
+    return STRING_LABELS.get(input_string, "c_kleene_star")
 
 def display_aba_nfa():
     """Display NFA for aba using Thompson Construction"""
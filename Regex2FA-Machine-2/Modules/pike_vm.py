@@ -0,0 +1,293 @@
+# pike_vm.py - Capture groups in linear time with a Pike VM over a Thompson program
+#
+# The pattern, parsed with its groups, is compiled into a small program:
+#   CHAR c      consume symbol c
+#   SPLIT x y   continue at x and at y (x has priority)
+#   JMP x       continue at x
+#   SAVE i      record the current position in capture slot i
+#   MATCH       a match ends here
+# The VM runs every thread of the program in lock step over the input, one
+# symbol at a time. Thread lists are sparse sets indexed by program counter,
+# so each instruction holds at most one thread per step: O(len(input) *
+# len(program)) time whatever the pattern, with no backtracking.
+#
+# When paths tie, alternatives prefer the earlier branch and repetitions
+# prefer another iteration, as in backtracking engines; a group inside a
+# repetition reports its last iteration. Unlike re, a star never adds an
+# empty iteration, so "(b?)*" on "b" reports group 1 as (0, 1), not (1, 1).
+# search() returns the leftmost-longest match like regex_search. finditer()
+# translates the input once and resumes the VM where each match ended, so
+# a scan for many matches stays linear rather than restarting per match.
+# Character classes become unions of atom symbols (see SymbolMap), and the
+# input is translated to those symbols before the VM runs.
+import functools
+
+from Modules.regex_compiler import (DEFAULT_LIMITS, CompileBudgetError, parse_regex,
+                                    utf8_ast, nfa_state_estimate, class_symbol_map)
+from Modules.prefilter import Prefilter
+
+CHAR, SPLIT, JMP, SAVE, MATCH = range(5)
+
+
+class ProgramBuilder:
+    """Compile an AST with group nodes into a list of (opcode, x, y) instructions"""
+
+    def __init__(self):
+        self.code = []
+
+    def emit(self, op, x=None, y=None):
+        self.code.append([op, x, y])
+        return len(self.code) - 1
+
+    def build(self, node):
+        self.emit(SAVE, 0)  # Group 0 is the whole match
+        self.node(node)
+        self.emit(SAVE, 1)
+        self.emit(MATCH)
+        return [tuple(instruction) for instruction in self.code]
+
+    def node(self, node):
+        code = self.code
+        kind = node[0]
+
+        if kind == "eps":
+            return
+
+        if kind == "lit":
+            self.emit(CHAR, node[1])
+        elif kind == "cat":
+            for child in node[1]:
+                self.node(child)
+        elif kind == "alt":
+            jumps = []
+            for child in node[1][:-1]:
+                split = self.emit(SPLIT)
+                code[split][1] = len(code)
+                self.node(child)
+                jumps.append(self.emit(JMP))
+                code[split][2] = len(code)
+            self.node(node[1][-1])
+            for jump in jumps:
+                code[jump][1] = len(code)
+        elif kind == "star":
+            self.star(node[1])
+        elif kind == "repeat":
+            child, low, high = node[1], node[2], node[3]
+            for _ in range(low):
+                self.node(child)
+            if high is None:
+                self.star(child)
+            else:
+                # Optional copies: each may skip straight to the end
+                splits = []
+                for _ in range(high - low):
+                    split = self.emit(SPLIT)
+                    code[split][1] = len(code)
+                    splits.append(split)
+                    self.node(child)
+                for split in splits:
+                    code[split][2] = len(code)
+        elif kind == "group":
+            self.emit(SAVE, 2 * node[1])
+            self.node(node[2])
+            self.emit(SAVE, 2 * node[1] + 1)
+        else:
+            raise ValueError(f"Unknown AST node: {kind}")
+
+    def star(self, child):
+        loop = self.emit(SPLIT)
+        self.code[loop][1] = len(self.code)
+        self.node(child)
+        self.emit(JMP, loop)
+        self.code[loop][2] = len(self.code)
+
+
+class Match:
+    """A match with its group spans; offsets are characters for str and bytes for bytes input"""
+
+    def __init__(self, data, slots):
+        self.data = data
+        self.slots = slots
+
+    def span(self, group=0):
+        """(start, end) of a group, (-1, -1) if it did not take part in the match"""
+        return self.slots[2 * group], self.slots[2 * group + 1]
+
+    def start(self, group=0):
+        return self.span(group)[0]
+
+    def end(self, group=0):
+        return self.span(group)[1]
+
+    def group(self, group=0):
+        """Text of a group, or None if it did not take part in the match"""
+        start, end = self.span(group)
+        return None if start < 0 or end < 0 else self.data[start:end]
+
+    def groups(self):
+        return tuple(self.group(i) for i in range(1, len(self.slots) // 2))
+
+    def spans(self):
+        """Spans of groups 1..n"""
+        return [self.span(i) for i in range(1, len(self.slots) // 2)]
+
+    def __repr__(self):
+        return f"<Match span={self.span()} match={self.group()!r}>"
+
+
+class PikeVM:
+    """Full-input and leftmost-longest matching with capture groups
+
+    Raises RegexSyntaxError for bad patterns and CompileBudgetError when
+    the program would be larger than limits.max_nfa_states.
+    """
+
+    def __init__(self, pattern, limits=None):
+        self.pattern = pattern
+        limits = limits or DEFAULT_LIMITS
+        self.ast = parse_regex(pattern, capture=True)
+        plain = parse_regex(pattern)
+        self._text_map = class_symbol_map([self.ast])
+        if limits.max_nfa_states is not None:
+            estimate = nfa_state_estimate(plain if self._text_map is None else self._text_map.rewrite(plain))
+            if estimate > limits.max_nfa_states:
+                raise CompileBudgetError("max_nfa_states", limits.max_nfa_states, estimate, "pike")
+        self.group_count = _count_groups(self.ast)
+        self._text_program = ProgramBuilder().build(_rewrite(self._text_map, self.ast))
+        self._byte_program = None
+        self._byte_map = None
+        self._text_prefilter = Prefilter(plain)
+        self._byte_prefilter = Prefilter(plain, binary=True)
+
+    def _prepare(self, data):
+        """(program, prefilter, symbols) for str or UTF-8 bytes-like input"""
+        if isinstance(data, str):
+            return self._text_program, self._text_prefilter, _translate(self._text_map, data)
+        if self._byte_program is None:
+            byte_ast = utf8_ast(self.ast)
+            self._byte_map = class_symbol_map([byte_ast])
+            self._byte_program = ProgramBuilder().build(_rewrite(self._byte_map, byte_ast))
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        # Byte-level programs use Latin-1 characters as byte symbols (see utf8_ast)
+        return self._byte_program, self._byte_prefilter, _translate(self._byte_map, data.decode("latin-1"))
+
+    def fullmatch(self, data):
+        """Match of the whole input, or None"""
+        program, prefilter, symbols = self._prepare(data)
+        if not prefilter.may_match(data):
+            return None
+        slots = self._execute(program, symbols, 0, anchored=True)
+        return None if slots is None else Match(data, slots)
+
+    def search(self, data, pos=0):
+        """Leftmost-longest match starting at or after pos, or None"""
+        program, prefilter, symbols = self._prepare(data)
+        if not prefilter.may_contain(data, pos):
+            return None
+        slots = self._execute(program, symbols, pos, anchored=False)
+        return None if slots is None else Match(data, slots)
+
+    def finditer(self, data, pos=0):
+        """Yield every non-overlapping leftmost-longest match
+
+        The input is translated and prefiltered once; each match then
+        resumes the VM where the previous one ended.
+        """
+        program, prefilter, symbols = self._prepare(data)
+        if not prefilter.may_contain(data, pos):
+            return
+        while pos <= len(symbols):
+            slots = self._execute(program, symbols, pos, anchored=False)
+            if slots is None:
+                return
+            yield Match(data, slots)
+            start, end = slots[0], slots[1]
+            pos = end if end > start else end + 1  # Step past an empty match
+
+    def _execute(self, code, symbols, pos, anchored):
+        """Capture slots of the winning thread, or None"""
+        size = len(code)
+        empty = (-1,) * (2 * self.group_count + 2)
+        length = len(symbols)
+        # Current and next thread lists, each a sparse set of program counters
+        current, current_dense, current_sparse = [], [], [0] * size
+        following, following_dense, following_sparse = [], [], [0] * size
+
+        def add(threads, dense, sparse, pc, slots, position):
+            """Follow JMP/SPLIT/SAVE from pc in priority order; keep CHAR and MATCH threads"""
+            stack = [(pc, slots)]
+            while stack:
+                pc, slots = stack.pop()
+                index = sparse[pc]
+                if index < len(dense) and dense[index] == pc:
+                    continue
+                sparse[pc] = len(dense)
+                dense.append(pc)
+                op, x, y = code[pc]
+                if op == JMP:
+                    stack.append((x, slots))
+                elif op == SPLIT:
+                    stack.append((y, slots))
+                    stack.append((x, slots))
+                elif op == SAVE:
+                    stack.append((pc + 1, slots[:x] + (position,) + slots[x + 1:]))
+                else:
+                    threads.append((pc, slots))
+
+        best = None
+        position = pos
+        add(current, current_dense, current_sparse, 0, empty, pos)
+        while True:
+            if not anchored and best is None and position > pos:
+                # A new lowest-priority thread for a match starting here
+                add(current, current_dense, current_sparse, 0, empty, position)
+            if not current and (anchored or best is not None):
+                break
+
+            symbol = symbols[position] if position < length else None
+            for pc, slots in current:
+                op, x, _ = code[pc]
+                if op == MATCH:
+                    if anchored:
+                        if position == length:
+                            return slots  # Highest-priority thread to reach the end
+                    elif best is None or slots[0] < best[0] or (slots[0] == best[0] and slots[1] > best[1]):
+                        best = slots
+                elif x == symbol and (best is None or slots[0] <= best[0]):
+                    add(following, following_dense, following_sparse, pc + 1, slots, position + 1)
+
+            if position >= length:
+                break
+            current, following = following, current
+            current_dense, following_dense = following_dense, current_dense
+            current_sparse, following_sparse = following_sparse, current_sparse
+            following.clear()
+            following_dense.clear()
+            position += 1
+        return best
+
+
+def _rewrite(symbol_map, node):
+    return node if symbol_map is None else symbol_map.rewrite(node)
+
+
+def _translate(symbol_map, text):
+    return text if symbol_map is None else symbol_map.translate(text)
+
+
+def _count_groups(node):
+    kind = node[0]
+    if kind == "group":
+        return max(node[1], _count_groups(node[2]))
+    if kind in ("cat", "alt"):
+        return max((_count_groups(child) for child in node[1]), default=0)
+    if kind in ("star", "repeat"):
+        return _count_groups(node[1])
+    return 0
+
+
+@functools.lru_cache(maxsize=128)
+def get_pike_vm(pattern):
+    """Shared PikeVM for a pattern with the default limits"""
+    return PikeVM(pattern)
@@ -0,0 +1,200 @@
+# prefilter.py - Cheap checks that reject most non-matching input before the DFA runs
+#
+# From the AST of a pattern the compiler extracts:
+#   exact     every string the pattern matches, when that is a small finite set
+#   literals  strings one of which occurs in every match ("aba + bb + c(a)*"
+#             gives aba, bb and c)
+#   first     the symbols a match can start with, unless it can be empty
+# bytes.find(literal) and `line[0] in first` run at C speed, so
+# lines without any required literal never reach the Python-level DFA loop.
+# A character class counts as the set of its characters when it has at
+# most MAX_EXACT of them, and as "anything" otherwise.
+from Modules.regex_compiler import class_size
+
+MAX_EXACT = 64     # Largest finite language kept as an exact set
+MAX_LITERALS = 8   # More alternatives than this make `in` checks slower than the DFA
+
+
+def _product(left, right):
+    """Concatenations of every pair, or None if there are too many"""
+    if left is None or right is None or len(left) * len(right) > MAX_EXACT:
+        return None
+    return frozenset(a + b for a in left for b in right)
+
+
+def _useful(strings):
+    """Literal set worth checking: no empty string and not too many alternatives"""
+    if strings is None or "" in strings:
+        return None
+    # A string containing a shorter member is redundant: finding the member suffices
+    strings = frozenset(s for s in strings
+                        if not any(other != s and other in s for other in strings))
+    return strings if len(strings) <= MAX_LITERALS else None
+
+
+def _better(a, b):
+    """The more selective of two literal sets (longest shortest member, then fewest members)"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    score = lambda strings: (min(map(len, strings)), -len(strings))
+    return b if score(b) > score(a) else a
+
+
+def _class_chars(intervals):
+    """Characters of a class, or None if there are more than MAX_EXACT"""
+    if class_size(intervals) > MAX_EXACT:
+        return None
+    return frozenset(chr(code) for low, high in intervals for code in range(low, high + 1))
+
+
+def literal_info(node):
+    """(exact, required) for an AST
+
+    exact is the set of every string node matches, or None if it is
+    infinite or larger than MAX_EXACT. required is a set of strings one of
+    which occurs in every match, or None if nothing is required.
+    """
+    kind = node[0]
+
+    if kind == "eps":
+        return frozenset([""]), None
+
+    if kind == "lit":
+        return frozenset([node[1]]), frozenset([node[1]])
+
+    if kind == "class":
+        chars = _class_chars(node[1])
+        return chars, chars
+
+    if kind == "alt":
+        infos = [literal_info(child) for child in node[1]]
+        exact = frozenset()
+        required = frozenset()
+        for child_exact, child_required in infos:
+            exact = None if exact is None or child_exact is None else exact | child_exact
+            required = None if required is None or child_required is None else required | child_required
+        if exact is not None and len(exact) > MAX_EXACT:
+            exact = None
+        return exact, _better(_useful(exact), _useful(required))
+
+    if kind == "cat":
+        exact = frozenset([""])
+        required = None
+        run = frozenset([""])  # Product of the current run of finite children
+        for child in node[1]:
+            child_exact, child_required = literal_info(child)
+            exact = _product(exact, child_exact)
+            required = _better(required, _useful(child_required))
+            run = _product(run, child_exact)
+            if run is None:
+                run = frozenset([""])
+            required = _better(required, _useful(run))
+        return exact, _better(required, _useful(exact))
+
+    if kind == "star":
+        return None, None
+
+    if kind == "repeat":
+        child_exact, child_required = literal_info(node[1])
+        low, high = node[2], node[3]
+        # The low required copies: their product, else whatever one copy requires
+        exact = frozenset([""])
+        for _ in range(low):
+            exact = _product(exact, child_exact)
+        required = _better(_useful(exact), _useful(child_required)) if low else None
+        if high is None:
+            return None, required
+        power = exact
+        for _ in range(high - low):
+            power = _product(power, child_exact)
+            exact = None if exact is None or power is None else exact | power
+            if exact is None or len(exact) > MAX_EXACT:
+                return None, required  # Stop before a{1,100000} builds every a^k
+        return exact, required
+
+    raise ValueError(f"Unknown AST node: {kind}")
+
+
+def _union(a, b):
+    return None if a is None or b is None else a | b
+
+
+def first_symbols(node):
+    """(symbols a match can start with, whether node matches the empty string)
+
+    The symbols are None when a match can start with too many of them to list.
+    """
+    kind = node[0]
+    if kind == "eps":
+        return set(), True
+    if kind == "lit":
+        return {node[1]}, False
+    if kind == "class":
+        chars = _class_chars(node[1])
+        return None if chars is None else set(chars), False
+    if kind == "alt":
+        first, nullable = set(), False
+        for child in node[1]:
+            child_first, child_nullable = first_symbols(child)
+            first = _union(first, child_first)
+            nullable = nullable or child_nullable
+        return first, nullable
+    if kind == "cat":
+        first = set()
+        for child in node[1]:
+            child_first, child_nullable = first_symbols(child)
+            first = _union(first, child_first)
+            if not child_nullable:
+                return first, False
+        return first, True
+    if kind == "star":
+        return first_symbols(node[1])[0], True
+    if kind == "repeat":
+        first, nullable = first_symbols(node[1])
+        return first, nullable or node[2] == 0
+    raise ValueError(f"Unknown AST node: {kind}")
+
+
+class Prefilter:
+    """Necessary conditions for a match, checked with C-speed builtins
+
+    With binary=True every set is encoded to UTF-8, for bytes input.
+    may_match() is for whole-input matching and may_contain() for
+    searching; both only ever answer False when no match is possible.
+    """
+
+    def __init__(self, ast, binary=False):
+        exact, required = literal_info(ast)
+        first, nullable = first_symbols(ast)
+        if binary:
+            encode = lambda s: s.encode("utf-8", "surrogateescape")
+            exact = None if exact is None else frozenset(map(encode, exact))
+            required = None if required is None else frozenset(map(encode, required))
+            first = None if first is None else {encode(symbol)[0] for symbol in first}
+        self.binary = binary
+        self.exact = exact
+        self.literals = tuple(sorted(required or (), key=len))
+        self.first = None if nullable or first is None else frozenset(first)
+
+    @property
+    def active(self):
+        """True if any check can reject input"""
+        return bool(self.literals) or self.first is not None
+
+    def may_contain(self, data, start=0):
+        """False if no match can occur anywhere in data[start:]"""
+        if not self.literals or not isinstance(data, (str, bytes, bytearray)):
+            return True
+        for literal in self.literals:
+            if data.find(literal, start) >= 0:
+                return True
+        return False
+
+    def may_match(self, data):
+        """False if data as a whole cannot match"""
+        if self.first is not None and isinstance(data, (str, bytes, bytearray)):
+            if not data or data[0] not in self.first:
+                return False
+        return self.may_contain(data)
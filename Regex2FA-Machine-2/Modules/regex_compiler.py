@@ -0,0 +1,2236 @@
+# regex_compiler.py - Compile any regular expression through the full pipeline
+# RE -> NFA (Thompson Construction) -> DFA (Subset Construction) -> Minimized DFA
+#
+# Syntax follows the course notation used in the GUI:
+#   aba + bb + c(aaa + aa + a)*
+# '+' or '|' is union, juxtaposition is concatenation, '*' is Kleene star,
+# '?' is optional, {m}, {m,} and {m,n} are bounded repetition, [a-z0-9] and
+# [^...] are character classes, '.' is any character but a newline, 'ε' is
+# the empty string and '\' escapes a special character. Whitespace is ignored
+# unless escaped or inside a class, so "foo\ bar" and "foo[ ]bar" match "foo bar".
+import bisect
+import threading
+import time
+
+from Modules.instrumentation import instrumentation
+
+EPSILON = "ε"
+SPECIAL_CHARS = set("+|*?(){}[].\\")
+MAX_CODE_POINT = 0x10FFFF
+# '.' matches every character except a newline (and, like [^...], no lone surrogate)
+DOT_INTERVALS = ((0, ord("\n") - 1), (ord("\n") + 1, 0xD7FF), (0xE000, MAX_CODE_POINT))
+
+# The regular expression of the course project
+COURSE_PATTERN = "aba + bb + c(aaa + aa + a)*"
+
+
+class RegexSyntaxError(ValueError):
+    """Raised when a pattern cannot be parsed"""
+
+
+class CompileBudgetError(RuntimeError):
+    """Raised when a pattern needs more than a CompileLimits budget allows"""
+
+    def __init__(self, budget, limit, actual, stage):
+        super().__init__(f"{budget} exceeded during {stage}: {actual} > {limit}")
+        self.budget = budget
+        self.limit = limit
+        self.actual = actual
+        self.stage = stage
+
+    def to_dict(self):
+        """Structured form for logs and service responses"""
+        return {"budget": self.budget, "limit": self.limit,
+                "actual": self.actual, "stage": self.stage}
+
+
+# ================================================
+# PARSER (pattern -> abstract syntax tree)
+# ================================================
+# AST nodes are plain tuples so they can be compared and hashed:
+#   ("eps",)                  empty string
+#   ("lit", "a")              single symbol
+#   ("class", ((lo, hi), ...)) character class: sorted, disjoint code point intervals
+#   ("cat", (n1, n2, ...))    concatenation
+#   ("alt", (n1, n2, ...))    union
+#   ("star", n)               Kleene star
+#   ("repeat", n, min, max)   bounded repetition, max is None for {m,}
+#   ("group", i, n)           capture group i (1-based), only with capture=True
+
+EPS = ("eps",)
+
+
+def _tokenize(pattern):
+    """(index, char) pairs without layout whitespace, e.g. "aba + bb"
+
+    An escaped space and whitespace inside [...] are kept as characters.
+    """
+    tokens = []
+    escaped = False
+    in_class = False
+    for i, ch in enumerate(pattern):
+        if escaped or in_class or not ch.isspace():
+            tokens.append((i, ch))
+        if not escaped:
+            if ch == "[":
+                in_class = True
+            elif ch == "]":
+                in_class = False
+        escaped = not escaped and ch == "\\"
+    return tokens
+
+
+class RegexParser:
+    """Recursive descent parser for the course regex notation"""
+
+    def __init__(self, pattern, capture=False):
+        self.pattern = pattern
+        self.tokens = _tokenize(pattern)
+        self.pos = 0
+        self.capture = capture  # Wrap parenthesized sub-expressions in group nodes
+        self.group_count = 0
+
+    def parse(self):
+        if not self.tokens:
+            return EPS
+        node = self.parse_union()
+        if self.pos < len(self.tokens):
+            index, ch = self.tokens[self.pos]
+            raise RegexSyntaxError(f"Unexpected '{ch}' at position {index + 1}")
+        return node
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][1]
+        return None
+
+    def advance(self):
+        ch = self.tokens[self.pos][1]
+        self.pos += 1
+        return ch
+
+    def error(self, message):
+        if self.pos < len(self.tokens):
+            index = self.tokens[self.pos][0] + 1
+        else:
+            index = len(self.pattern) + 1
+        return RegexSyntaxError(f"{message} at position {index}")
+
+    def parse_union(self):
+        branches = [self.parse_concat()]
+        while self.peek() in ("+", "|"):
+            self.advance()
+            branches.append(self.parse_concat())
+        return branches[0] if len(branches) == 1 else ("alt", tuple(branches))
+
+    def parse_concat(self):
+        items = []
+        while self.peek() is not None and self.peek() not in ("+", "|", ")"):
+            items.append(self.parse_repeat())
+        if not items:
+            return EPS
+        return items[0] if len(items) == 1 else ("cat", tuple(items))
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        while self.peek() in ("*", "?", "{"):
+            ch = self.advance()
+            if ch == "*":
+                node = ("star", node)
+            elif ch == "?":
+                node = ("repeat", node, 0, 1)
+            else:
+                low, high = self.parse_bounds()
+                node = ("repeat", node, low, high)
+        return node
+
+    def parse_bounds(self):
+        """Parse the inside of {m}, {m,} or {m,n}; the '{' is already consumed"""
+        low = self.parse_number()
+        high = low
+        if self.peek() == ",":
+            self.advance()
+            high = None if self.peek() == "}" else self.parse_number()
+        if self.peek() != "}":
+            raise self.error("Expected '}'")
+        self.advance()
+        if high is not None and high < low:
+            raise self.error(f"Invalid repetition {{{low},{high}}}")
+        return low, high
+
+    def parse_number(self):
+        digits = ""
+        while self.peek() is not None and self.peek().isdigit():
+            digits += self.advance()
+        if not digits:
+            raise self.error("Expected a number")
+        return int(digits)
+
+    def parse_atom(self):
+        ch = self.peek()
+        if ch is None:
+            raise self.error("Unexpected end of pattern")
+        if ch == "(":
+            self.advance()
+            self.group_count += 1
+            index = self.group_count  # Groups are numbered by their opening parenthesis
+            node = self.parse_union()
+            if self.peek() != ")":
+                raise self.error("Missing ')'")
+            self.advance()
+            return ("group", index, node) if self.capture else node
+        if ch == "\\":
+            self.advance()
+            if self.peek() is None:
+                raise self.error("Dangling escape")
+            return ("lit", self.advance())
+        if ch == "[":
+            return self.parse_class()
+        if ch == ".":
+            self.advance()
+            return ("class", DOT_INTERVALS)
+        if ch in SPECIAL_CHARS:
+            raise self.error(f"Unexpected '{ch}'")
+        self.advance()
+        if ch == EPSILON:
+            return EPS
+        return ("lit", ch)
+
+
+    def parse_class(self):
+        """Parse [...] or [^...] into a class node, or a literal if it holds one character"""
+        self.advance()
+        negated = self.peek() == "^"
+        if negated:
+            self.advance()
+        intervals = []
+        while self.peek() != "]":
+            low = self.parse_class_char()
+            high = low
+            # A '-' right before the closing ']' is an ordinary character
+            if self.peek() == "-" and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1][1] != "]":
+                self.advance()
+                high = self.parse_class_char()
+                if high < low:
+                    raise self.error(f"Invalid range {chr(low)}-{chr(high)}")
+            intervals.append((low, high))
+        if not intervals:
+            raise self.error("Empty character class")
+        self.advance()
+        intervals = merge_intervals(intervals)
+        if negated:
+            intervals = negate_intervals(intervals)
+            if not intervals:
+                raise self.error("Character class matches nothing")
+        if len(intervals) == 1 and intervals[0][0] == intervals[0][1]:
+            return ("lit", chr(intervals[0][0]))
+        return ("class", intervals)
+
+    def parse_class_char(self):
+        ch = self.peek()
+        if ch is None:
+            raise self.error("Missing ']'")
+        self.advance()
+        if ch == "\\":
+            if self.peek() is None:
+                raise self.error("Dangling escape")
+            ch = self.advance()
+        elif ch == EPSILON:
+            raise self.error("'ε' cannot appear in a character class")
+        return ord(ch)
+
+
+def parse_regex(pattern, capture=False):
+    """Parse a pattern into an AST; capture=True keeps group nodes (see pike_vm)"""
+    with instrumentation.span("compile.parse"):
+        return RegexParser(pattern, capture).parse()
+
+
+def normalize_ast(node):
+    """Rewrite an AST into a canonical form with the same language
+
+    Nested unions and concatenations are flattened, union branches are
+    de-duplicated and sorted (so 'a+b' and 'b+a' are equal), ε is dropped
+    from concatenations and (x*)* becomes x*.
+    """
+    kind = node[0]
+
+    if kind == "cat":
+        items = []
+        for child in map(normalize_ast, node[1]):
+            if child[0] == "cat":
+                items.extend(child[1])
+            elif child != EPS:
+                items.append(child)
+        if not items:
+            return EPS
+        return items[0] if len(items) == 1 else ("cat", tuple(items))
+
+    if kind == "alt":
+        branches = set()
+        for child in map(normalize_ast, node[1]):
+            if child[0] == "alt":
+                branches.update(child[1])
+            else:
+                branches.add(child)
+        branches = sorted(branches, key=repr)
+        return branches[0] if len(branches) == 1 else ("alt", tuple(branches))
+
+    if kind == "star":
+        child = normalize_ast(node[1])
+        if child == EPS or child[0] == "star":
+            return child
+        return ("star", child)
+
+    if kind == "repeat":
+        child = normalize_ast(node[1])
+        if child == EPS:
+            return EPS
+        return ("repeat", child, node[2], node[3])
+
+    return node
+
+
+def nullable(node):
+    """True if the language of an AST contains the empty string"""
+    kind = node[0]
+    if kind in ("eps", "star"):
+        return True
+    if kind == "cat":
+        return all(map(nullable, node[1]))
+    if kind == "alt":
+        return any(map(nullable, node[1]))
+    if kind == "repeat":
+        return node[2] == 0 or nullable(node[1])
+    if kind == "group":
+        return nullable(node[2])
+    return False
+
+
+def _power(node):
+    """(base, low, high) with node = base{low,high}"""
+    if node[0] == "star":
+        return node[1], 0, None
+    if node[0] == "repeat":
+        return node[1], node[2], node[3]
+    return node, 1, 1
+
+
+def _repeat(base, low, high):
+    """Smallest AST for base{low,high}"""
+    if base == EPS or high == 0:
+        return EPS
+    if low == high == 1:
+        return base
+    if high is None and low == 0:
+        return base if base[0] == "star" else ("star", base)
+    if high == 1 and nullable(base):
+        return base
+    return ("repeat", base, low, high)
+
+
+def _cat(items):
+    """Concatenation of simplified items: flattened, without ε, adjacent repetitions of one base merged
+
+    x{a,b} x{c,d} is x{a+c,b+d}. A plain x next to a repetition of x is
+    kept, since x{1,} builds no fewer states than x x*, and so are runs
+    such as 'aa', which keeps literal strings literal.
+    """
+    merged = []
+    for item in items:
+        for child in (item[1] if item[0] == "cat" else (item,)):
+            if child == EPS:
+                continue
+            if merged and child[0] in ("star", "repeat"):
+                base, low, high = _power(child)
+                last_base, last_low, last_high = _power(merged[-1])
+                if base == last_base and (low, high) != (1, 1) and (last_low, last_high) != (1, 1):
+                    total = None if high is None or last_high is None else high + last_high
+                    merged[-1] = _repeat(base, low + last_low, total)
+                    continue
+            merged.append(child)
+    if not merged:
+        return EPS
+    return merged[0] if len(merged) == 1 else ("cat", tuple(merged))
+
+
+def _items(node):
+    return node[1] if node[0] == "cat" else (node,)
+
+
+def _factor(branches, end):
+    """Union of branches with common first (end=0) or last (end=-1) items pulled out"""
+    groups = {}
+    for branch in branches:
+        groups.setdefault(_items(branch)[end], []).append(branch)
+    factored = []
+    for edge, members in groups.items():
+        if len(members) == 1:
+            factored.append(members[0])
+            continue
+        rests = [_cat(_items(m)[1:] if end == 0 else _items(m)[:-1]) for m in members]
+        rest = _alt(rests)
+        factored.append(_cat((edge, rest)) if end == 0 else _cat((rest, edge)))
+    return factored
+
+
+def _alt(branches):
+    """Union of simplified branches: ε becomes '?', common prefixes and suffixes are factored"""
+    unique = set()
+    for branch in branches:
+        unique.update(branch[1] if branch[0] == "alt" else (branch,))
+    optional = EPS in unique
+    unique.discard(EPS)
+    if not unique:
+        return EPS
+    branches = sorted(unique, key=repr)
+    if len(branches) > 1:
+        branches = _factor(branches, 0)
+    if len(branches) > 1:
+        branches = sorted(set(_factor(branches, -1)), key=repr)
+    node = branches[0] if len(branches) == 1 else ("alt", tuple(branches))
+    if optional and not nullable(node):
+        return _repeat(node, 0, 1)
+    return node
+
+
+def _star(child):
+    """Simplified (child)*
+
+    Inside a star, x{0,n}, x{1,n} and x* are all worth x, and a branch
+    that is a concatenation of powers of other branches is redundant:
+    (aaa + aa + a)* is a*.
+    """
+    branches = set()
+    pending = [simplify_ast(branch) for branch in (child[1] if child[0] == "alt" else (child,))]
+    while pending:
+        branch = pending.pop()
+        base, low, _ = _power(branch)
+        if low <= 1 and base != branch:
+            pending.append(base)
+        elif branch[0] == "alt":
+            pending.extend(branch[1])
+        elif branch != EPS:
+            branches.add(branch)
+    for branch in sorted(branches, key=repr):
+        others = branches - {branch}
+        if others and all(_power(item)[0] in others for item in _items(branch)):
+            branches = others
+    if not branches:
+        return EPS
+    return _repeat(_alt(branches), 0, None)
+
+
+def simplify_ast(node):
+    """Smaller AST with the same language, for matching rather than display
+
+    Builds on normalize_ast: common prefixes and suffixes of unions are
+    factored out (aaa + aa + a is a(a(a)?)?), redundant branches under a
+    star are dropped (c(aaa + aa + a)* is ca*), ε in a union becomes '?',
+    adjacent repetitions of one sub-expression are merged (x?x? is x{0,2}) and
+    nested repetitions are folded where that is exact. Group nodes are
+    left untouched.
+    """
+    kind = node[0]
+    if kind == "cat":
+        return _cat([simplify_ast(child) for child in node[1]])
+    if kind == "alt":
+        return _alt([simplify_ast(child) for child in node[1]])
+    if kind == "star":
+        return _star(node[1])
+    if kind == "repeat":
+        child, low, high = simplify_ast(node[1]), node[2], node[3]
+        if high == 0:
+            return EPS  # Before folding, which reads an unbounded inner high as unbounded overall
+        if child[0] == "star":
+            return child
+        inner_base, inner_low, inner_high = _power(child)
+        if child[0] == "repeat" and inner_low <= 1:
+            # k copies of x{0,b} or x{1,b} cover k*low..k*b without gaps
+            total = None if high is None or inner_high is None else high * inner_high
+            return _repeat(inner_base, low * inner_low, total)
+        return _repeat(child, low, high)
+    return node
+
+
+def ast_alphabet(node):
+    """Set of symbols used by an AST"""
+    kind = node[0]
+    if kind == "lit":
+        return {node[1]}
+    if kind in ("cat", "alt"):
+        symbols = set()
+        for child in node[1]:
+            symbols |= ast_alphabet(child)
+        return symbols
+    if kind in ("star", "repeat"):
+        return ast_alphabet(node[1])
+    return set()
+
+
+def utf8_ast(node):
+    """Lower an AST over characters to one over UTF-8 bytes
+
+    Each byte becomes a literal of the Latin-1 character with the same
+    code, so the byte-level automaton is built by the usual pipeline and
+    bytes input can be matched through the Latin-1 byte map unchanged.
+    Lone surrogates from surrogateescape decoding stand for the raw byte.
+    """
+    kind = node[0]
+    if kind == "lit":
+        encoded = node[1].encode("utf-8", "surrogateescape")
+        if len(encoded) == 1:
+            return ("lit", chr(encoded[0]))
+        return ("cat", tuple(("lit", chr(byte)) for byte in encoded))
+    if kind == "class":
+        return utf8_class_ast(node[1])
+    if kind in ("cat", "alt"):
+        return (kind, tuple(utf8_ast(child) for child in node[1]))
+    if kind == "star":
+        return ("star", utf8_ast(node[1]))
+    if kind == "repeat":
+        return ("repeat", utf8_ast(node[1]), node[2], node[3])
+    if kind == "group":
+        return ("group", node[1], utf8_ast(node[2]))
+    return node
+
+
+def reverse_ast(node):
+    """AST for the reversed language: every concatenation is read backwards"""
+    kind = node[0]
+    if kind == "cat":
+        return ("cat", tuple(reverse_ast(child) for child in reversed(node[1])))
+    if kind == "alt":
+        return ("alt", tuple(reverse_ast(child) for child in node[1]))
+    if kind == "star":
+        return ("star", reverse_ast(node[1]))
+    if kind == "repeat":
+        return ("repeat", reverse_ast(node[1]), node[2], node[3])
+    return node
+
+
+# ================================================
+# CHARACTER CLASSES (interval sets -> disjoint atoms)
+# ================================================
+# A class is a set of code point intervals. The automata never see them:
+# the literals and classes of a pattern cut the code points into disjoint
+# intervals ("atoms"), each class becomes the union of the atoms inside it,
+# and an atom is written as its lowest character. [a-z0-9]+ is built over
+# two symbols, 'a' for a-z and '0' for 0-9, and '.' over one or two,
+# however many characters they stand for. A SymbolMap carried by the
+# automata maps every input character to the symbol of its atom.
+
+def merge_intervals(intervals):
+    """Sorted, disjoint and non-adjacent tuple of (low, high) intervals"""
+    merged = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return tuple(merged)
+
+
+def negate_intervals(intervals):
+    """Code points outside merged intervals, except surrogates
+
+    Lone surrogates are not characters: in bytes input they stand for
+    undecodable bytes (see utf8_ast), which [^x] should not match one by one.
+    """
+    result = []
+    start = 0
+    for low, high in merge_intervals(intervals + (_SURROGATES,)):
+        if low > start:
+            result.append((start, low - 1))
+        start = high + 1
+    if start <= MAX_CODE_POINT:
+        result.append((start, MAX_CODE_POINT))
+    return tuple(result)
+
+
+def class_size(intervals):
+    return sum(high - low + 1 for low, high in intervals)
+
+
+# Largest code point of each UTF-8 sequence length
+_UTF8_MAX = (0x7F, 0x7FF, 0xFFFF, MAX_CODE_POINT)
+_SURROGATES = (0xD800, 0xDFFF)
+_ESCAPED_BYTES = (0xDC80, 0xDCFF)  # surrogateescape stand-ins for raw bytes 0x80-0xFF
+
+
+def utf8_sequences(low, high):
+    """Byte-range sequences whose UTF-8 strings are exactly the code points low..high
+
+    Each sequence is a tuple of (low byte, high byte) pairs, as in the
+    UTF-8 range splitting of RE2 and Rust's regex-syntax: ranges are cut
+    at encoded-length boundaries, then wherever a continuation byte would
+    not span its full 0x80-0xBF range.
+    """
+    sequences = []
+    stack = [(low, high)]
+    while stack:
+        low, high = stack.pop()
+        if low > high:
+            continue
+        if low <= _SURROGATES[1] and high >= _SURROGATES[0]:
+            # Surrogates have no UTF-8 encoding
+            stack.append((max(low, _SURROGATES[1] + 1), high))
+            stack.append((low, _SURROGATES[0] - 1))
+            continue
+        split = next((m for m in _UTF8_MAX if low <= m < high), None)
+        if split is not None:
+            stack.append((split + 1, high))
+            stack.append((low, split))
+            continue
+        if high <= 0x7F:
+            sequences.append(((low, high),))
+            continue
+        for i in range(1, 4):
+            mask = (1 << (6 * i)) - 1
+            if low & ~mask != high & ~mask:
+                if low & mask:
+                    stack.append(((low | mask) + 1, high))
+                    stack.append((low, low | mask))
+                    break
+                if high & mask != mask:
+                    stack.append((high & ~mask, high))
+                    stack.append((low, (high & ~mask) - 1))
+                    break
+        else:
+            first = chr(low).encode("utf-8")
+            last = chr(high).encode("utf-8")
+            sequences.append(tuple(zip(first, last)))
+    return sequences
+
+
+def utf8_class_ast(intervals):
+    """AST over Latin-1 byte symbols (see utf8_ast) for the UTF-8 encodings of a class"""
+    branches = []
+    for low, high in intervals:
+        # Lone surrogates from surrogateescape decoding stand for the raw byte
+        escaped_low, escaped_high = max(low, _ESCAPED_BYTES[0]), min(high, _ESCAPED_BYTES[1])
+        if escaped_low <= escaped_high:
+            branches.append(_byte_range(escaped_low - 0xDC00, escaped_high - 0xDC00))
+        for sequence in utf8_sequences(low, high):
+            items = tuple(_byte_range(first, last) for first, last in sequence)
+            branches.append(items[0] if len(items) == 1 else ("cat", items))
+    return branches[0] if len(branches) == 1 else ("alt", tuple(branches))
+
+
+def _byte_range(low, high):
+    return ("lit", chr(low)) if low == high else ("class", ((low, high),))
+
+
+def _show_code_point(code):
+    char = chr(code)
+    return char if char.isprintable() and not char.isspace() else f"\\u{code:04x}"
+
+
+class SymbolMap:
+    """The atoms of one or more ASTs and the map from characters to their symbols
+
+    An atom is a maximal interval of code points that every literal and
+    class of the ASTs either contains whole or not at all; its symbol is
+    its lowest character. Characters outside every atom map to themselves,
+    which is never a symbol, so they still reject.
+    """
+
+    def __init__(self, asts):
+        intervals = []
+        for ast in asts:
+            _collect_intervals(ast, intervals)
+        covered = merge_intervals(intervals)
+        cuts = set()
+        for low, high in intervals:
+            cuts.add(low)
+            cuts.add(high + 1)
+        cuts = sorted(cuts)
+        self.starts = []
+        self.ends = []
+        for low, next_low in zip(cuts, cuts[1:]):
+            # Atoms are the pieces between cuts that some interval covers
+            i = bisect.bisect_right(covered, (low, MAX_CODE_POINT + 1)) - 1
+            if i >= 0 and covered[i][1] >= low:
+                self.starts.append(low)
+                self.ends.append(next_low - 1)
+        self.max_code = self.ends[-1] if self.ends else -1
+        self._text_table = _SymbolTable(self)
+        self._byte_table = None
+
+    @classmethod
+    def from_atoms(cls, atoms):
+        """SymbolMap with the given sorted (start, end) atoms, as saved by atoms()"""
+        symbol_map = cls.__new__(cls)
+        symbol_map.starts = [start for start, _ in atoms]
+        symbol_map.ends = [end for _, end in atoms]
+        symbol_map.max_code = symbol_map.ends[-1] if symbol_map.ends else -1
+        symbol_map._text_table = _SymbolTable(symbol_map)
+        symbol_map._byte_table = None
+        return symbol_map
+
+    def atoms(self):
+        return list(zip(self.starts, self.ends))
+
+    def representative(self, code):
+        """Code point of the symbol for code, or code itself if no atom holds it"""
+        i = bisect.bisect_right(self.starts, code) - 1
+        return self.starts[i] if i >= 0 and code <= self.ends[i] else code
+
+    def rewrite(self, node):
+        """The AST with every class replaced by the union of its atom symbols"""
+        kind = node[0]
+        if kind == "class":
+            branches = []
+            for low, high in node[1]:
+                first = bisect.bisect_left(self.starts, low)
+                last = bisect.bisect_right(self.starts, high)
+                branches.extend(("lit", chr(start)) for start in self.starts[first:last])
+            return branches[0] if len(branches) == 1 else ("alt", tuple(branches))
+        if kind in ("cat", "alt"):
+            return (kind, tuple(self.rewrite(child) for child in node[1]))
+        if kind == "star":
+            return ("star", self.rewrite(node[1]))
+        if kind == "repeat":
+            return ("repeat", self.rewrite(node[1]), node[2], node[3])
+        if kind == "group":
+            return ("group", node[1], self.rewrite(node[2]))
+        return node
+
+    def label(self, symbol):
+        """Display name of a symbol: the character, or the range its atom covers"""
+        if len(symbol) != 1:
+            return symbol
+        i = bisect.bisect_left(self.starts, ord(symbol))
+        if i == len(self.starts) or self.starts[i] != ord(symbol) or self.ends[i] == self.starts[i]:
+            return symbol
+        return f"{_show_code_point(self.starts[i])}-{_show_code_point(self.ends[i])}"
+
+    @property
+    def byte_table(self):
+        """256-byte table for bytes.translate, for maps whose atoms are all below 256"""
+        if self._byte_table is None:
+            self._byte_table = bytes(self.representative(b) if self.representative(b) < 256 else b
+                                     for b in range(256))
+        return self._byte_table
+
+    def translate(self, data):
+        """str with every character replaced by its symbol, or bytes for bytes-like input"""
+        if isinstance(data, str):
+            return data.translate(self._text_table)
+        return bytes(data).translate(self.byte_table)
+
+
+class _SymbolTable(dict):
+    """str.translate table that looks each character up once"""
+
+    def __init__(self, symbol_map):
+        super().__init__()
+        self.symbol_map = symbol_map
+
+    def __missing__(self, code):
+        self[code] = symbol = self.symbol_map.representative(code)
+        return symbol
+
+
+def _collect_intervals(node, intervals):
+    kind = node[0]
+    if kind == "lit":
+        intervals.append((ord(node[1]), ord(node[1])))
+    elif kind == "class":
+        intervals.extend(node[1])
+    elif kind in ("cat", "alt"):
+        for child in node[1]:
+            _collect_intervals(child, intervals)
+    elif kind in ("star", "repeat"):
+        _collect_intervals(node[1], intervals)
+    elif kind == "group":
+        _collect_intervals(node[2], intervals)
+
+
+def has_classes(node):
+    kind = node[0]
+    if kind == "class":
+        return True
+    if kind in ("cat", "alt"):
+        return any(has_classes(child) for child in node[1])
+    if kind in ("star", "repeat"):
+        return has_classes(node[1])
+    if kind == "group":
+        return has_classes(node[2])
+    return False
+
+
+def class_symbol_map(asts):
+    """SymbolMap for ASTs with classes, or None if they only use literals"""
+    if not any(has_classes(ast) for ast in asts):
+        return None
+    return SymbolMap(asts)
+
+
+# ================================================
+# AUTOMATA
+# ================================================
+
+def _display_alphabet(automaton):
+    """Alphabet as table headers: atom symbols are shown as the range they stand for"""
+    if automaton.symbol_map is None:
+        return list(automaton.alphabet)
+    return [automaton.symbol_map.label(symbol) for symbol in automaton.alphabet]
+
+
+def state_name(index, letters=False):
+    """Display name of a state: q0, q1, ... or A, B, ..., Z, AA, AB, ..."""
+    if not letters:
+        return f"q{index}"
+    name = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        name = chr(ord("A") + rem) + name
+    return name
+
+
+class NFA:
+    """ε-NFA with integer states: transitions[state] = {symbol: set of targets}
+
+    symbol_map is the SymbolMap of a pattern with character classes, whose
+    symbols then stand for whole atoms; None when every symbol is itself.
+    """
+
+    def __init__(self, alphabet=(), symbol_map=None):
+        self.alphabet = sorted(alphabet)
+        self.symbol_map = symbol_map
+        self.transitions = []
+        self.initial = None
+        self.final = set()
+
+    @property
+    def display_alphabet(self):
+        return _display_alphabet(self)
+
+    @property
+    def state_count(self):
+        return len(self.transitions)
+
+    def add_state(self):
+        self.transitions.append({})
+        return len(self.transitions) - 1
+
+    def add_transition(self, source, symbol, target):
+        self.transitions[source].setdefault(symbol, set()).add(target)
+
+    def epsilon_closure(self, states):
+        """All states reachable from states using only ε-transitions"""
+        closure = set(states)
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            for target in self.transitions[state].get(EPSILON, ()):
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return frozenset(closure)
+
+    def move(self, states, symbol):
+        """States reachable from states on one symbol"""
+        targets = set()
+        for state in states:
+            targets |= self.transitions[state].get(symbol, set())
+        return targets
+
+    def to_table(self):
+        """NFA in the same dict layout the display modules use"""
+        label = self.symbol_map.label if self.symbol_map is not None else str
+        return {
+            "initial": state_name(self.initial),
+            "final": {state_name(s) for s in self.final},
+            "transitions": {
+                state_name(s): {label(symbol): {state_name(t) for t in targets}
+                                for symbol, targets in trans.items()}
+                for s, trans in enumerate(self.transitions)
+            }
+        }
+
+
+class DFA:
+    """Complete DFA with integer states: transitions[state] = {symbol: target}
+
+    With a symbol_map (see NFA), input is mapped to atom symbols first.
+    """
+
+    def __init__(self, alphabet=(), symbol_map=None):
+        self.alphabet = sorted(alphabet)
+        self.symbol_map = symbol_map
+        self.transitions = []
+        self.initial = 0
+        self.final = set()
+        self.dead_states = set()
+
+    @property
+    def state_count(self):
+        return len(self.transitions)
+
+    @property
+    def display_alphabet(self):
+        return _display_alphabet(self)
+
+    def add_state(self):
+        self.transitions.append({})
+        return len(self.transitions) - 1
+
+    def accepts(self, input_string):
+        """Run the DFA over input_string; symbols outside the alphabet reject"""
+        if self.symbol_map is not None:
+            input_string = self.symbol_map.translate(input_string)
+        transitions = self.transitions
+        state = self.initial
+        for char in input_string:
+            state = transitions[state].get(char)
+            if state is None:
+                return False
+        return state in self.final
+
+    def accepts_counted(self, input_string):
+        """accepts() that also returns the number of transitions taken"""
+        if self.symbol_map is not None:
+            input_string = self.symbol_map.translate(input_string)
+        transitions = self.transitions
+        state = self.initial
+        steps = 0
+        for char in input_string:
+            state = transitions[state].get(char)
+            if state is None:
+                return False, steps
+            steps += 1
+        return state in self.final, steps
+
+    def to_table(self, letters=False):
+        """DFA in the same dict layout as DFASimulator.dfa_tables"""
+        name = lambda s: state_name(s, letters)
+        label = self.symbol_map.label if self.symbol_map is not None else str
+        return {
+            "initial": name(self.initial),
+            "final": {name(s) for s in self.final},
+            "dead_states": {name(s) for s in self.dead_states},
+            "transitions": {
+                name(s): {label(symbol): name(t) for symbol, t in trans.items()}
+                for s, trans in enumerate(self.transitions)
+            }
+        }
+
+
+# ================================================
+# RESOURCE BUDGETS
+# ================================================
+
+class CompileLimits:
+    """Budgets for compiling and rendering one pattern; None disables a budget"""
+
+    def __init__(self, max_nfa_states=100000, max_dfa_states=20000,
+                 max_compile_ms=2000, max_diagram_nodes=150):
+        self.max_nfa_states = max_nfa_states
+        self.max_dfa_states = max_dfa_states
+        self.max_compile_ms = max_compile_ms
+        self.max_diagram_nodes = max_diagram_nodes
+
+    def deadline(self):
+        """perf_counter() value at which compiling must stop, or None"""
+        if self.max_compile_ms is None:
+            return None
+        return time.perf_counter() + self.max_compile_ms / 1000
+
+    def check_deadline(self, deadline, stage):
+        now = time.perf_counter()
+        if deadline is not None and now > deadline:
+            elapsed = round(self.max_compile_ms + (now - deadline) * 1000, 1)
+            raise CompileBudgetError("max_compile_ms", self.max_compile_ms, elapsed, stage)
+
+    def check_diagram(self, node_count):
+        """Refuse diagrams that would take Graphviz too long to lay out"""
+        if self.max_diagram_nodes is not None and node_count > self.max_diagram_nodes:
+            raise CompileBudgetError("max_diagram_nodes", self.max_diagram_nodes, node_count, "render")
+
+
+# Used whenever no limits are passed explicitly
+DEFAULT_LIMITS = CompileLimits()
+UNLIMITED = CompileLimits(None, None, None, None)
+
+# Subsets a LazyDFA keeps cached when no DFA state budget applies
+LAZY_CACHE_STATES = 10000
+
+
+def nfa_state_estimate(node):
+    """Number of states the Thompson Construction creates for an AST, without building it
+
+    A class counts as a union of one literal per interval; its atoms may be more.
+    """
+    kind = node[0]
+    if kind in ("eps", "lit"):
+        return 2
+    if kind == "class":
+        return 2 + 2 * len(node[1]) if len(node[1]) > 1 else 2
+    if kind == "cat":
+        return sum(nfa_state_estimate(child) for child in node[1])
+    if kind == "alt":
+        return 2 + sum(nfa_state_estimate(child) for child in node[1])
+    if kind == "star":
+        return 2 + nfa_state_estimate(node[1])
+    if kind == "repeat":
+        child, low, high = node[1], node[2], node[3]
+        size = nfa_state_estimate(child)
+        if high is None:
+            return 1 + low * size + 2 + size
+        return 2 + high * size
+    raise ValueError(f"Unknown AST node: {kind}")
+
+
+# ================================================
+# DEAD STATE ANALYSIS
+# ================================================
+
+def coaccessible_states(successors, final):
+    """States from which a final state can be reached; successors[s] lists the targets of s"""
+    predecessors = [[] for _ in successors]
+    for state, targets in enumerate(successors):
+        for target in targets:
+            predecessors[target].append(state)
+    live = set(final)
+    stack = list(live)
+    while stack:
+        for source in predecessors[stack.pop()]:
+            if source not in live:
+                live.add(source)
+                stack.append(source)
+    return live
+
+
+def find_dead_states(dfa):
+    """States of a DFA that can never reach a final state"""
+    live = coaccessible_states([set(trans.values()) for trans in dfa.transitions], dfa.final)
+    return {s for s in range(dfa.state_count) if s not in live}
+
+
+def table_dead_states(table):
+    """find_dead_states for a DFA in the display dict layout"""
+    names = list(table["transitions"])
+    index = {name: i for i, name in enumerate(names)}
+    successors = [{index[t] for t in table["transitions"][name].values()} for name in names]
+    live = coaccessible_states(successors, {index[name] for name in table["final"]})
+    return {name for i, name in enumerate(names) if i not in live}
+
+
+# ================================================
+# THOMPSON CONSTRUCTION (AST -> NFA)
+# ================================================
+
+class ThompsonBuilder:
+    """Build an ε-NFA from an AST; every sub-expression gets its own start and accept state"""
+
+    def __init__(self, alphabet):
+        self.nfa = NFA(alphabet)
+
+    def build(self, node):
+        start, accept = self.fragment(node)
+        self.nfa.initial = start
+        self.nfa.final = {accept}
+        return self.nfa
+
+    def fragment(self, node):
+        """Return (start, accept) of the sub-automaton for node"""
+        nfa = self.nfa
+        kind = node[0]
+
+        if kind in ("eps", "lit"):
+            start, accept = nfa.add_state(), nfa.add_state()
+            nfa.add_transition(start, EPSILON if kind == "eps" else node[1], accept)
+            return start, accept
+
+        if kind == "cat":
+            start, accept = self.fragment(node[1][0])
+            for child in node[1][1:]:
+                child_start, child_accept = self.fragment(child)
+                nfa.add_transition(accept, EPSILON, child_start)
+                accept = child_accept
+            return start, accept
+
+        if kind == "alt":
+            start, accept = nfa.add_state(), nfa.add_state()
+            for child in node[1]:
+                child_start, child_accept = self.fragment(child)
+                nfa.add_transition(start, EPSILON, child_start)
+                nfa.add_transition(child_accept, EPSILON, accept)
+            return start, accept
+
+        if kind == "star":
+            start, accept = nfa.add_state(), nfa.add_state()
+            inner_start, inner_accept = self.fragment(node[1])
+            nfa.add_transition(start, EPSILON, inner_start)
+            nfa.add_transition(start, EPSILON, accept)
+            nfa.add_transition(inner_accept, EPSILON, inner_start)
+            nfa.add_transition(inner_accept, EPSILON, accept)
+            return start, accept
+
+        if kind == "repeat":
+            return self.repeat_fragment(node[1], node[2], node[3])
+
+        raise ValueError(f"Unknown AST node: {kind}")
+
+    def repeat_fragment(self, child, low, high):
+        """x{m,n} is unrolled into m required copies followed by n-m optional copies"""
+        nfa = self.nfa
+        start = nfa.add_state()
+        accept = start
+
+        for _ in range(low):
+            child_start, child_accept = self.fragment(child)
+            nfa.add_transition(accept, EPSILON, child_start)
+            accept = child_accept
+
+        if high is None:
+            star_start, star_accept = self.fragment(("star", child))
+            nfa.add_transition(accept, EPSILON, star_start)
+            return start, star_accept
+
+        end = nfa.add_state()
+        for _ in range(high - low):
+            child_start, child_accept = self.fragment(child)
+            nfa.add_transition(accept, EPSILON, child_start)
+            nfa.add_transition(accept, EPSILON, end)  # Skip the remaining optional copies
+            accept = child_accept
+        nfa.add_transition(accept, EPSILON, end)
+        return start, end
+
+
+def build_nfa(ast, limits=None):
+    """Thompson Construction of an ε-NFA for an AST; classes become atom symbols (see SymbolMap)"""
+    symbol_map = class_symbol_map([ast])
+    if symbol_map is not None:
+        ast = symbol_map.rewrite(ast)
+    if limits is not None and limits.max_nfa_states is not None:
+        # Checked up front: x{1000}{1000} must fail before allocating anything
+        estimate = nfa_state_estimate(ast)
+        if estimate > limits.max_nfa_states:
+            raise CompileBudgetError("max_nfa_states", limits.max_nfa_states, estimate, "thompson")
+    with instrumentation.span("compile.thompson"):
+        nfa = ThompsonBuilder(ast_alphabet(ast)).build(ast)
+    nfa.symbol_map = symbol_map
+    instrumentation.count("nfa_states_created", nfa.state_count)
+    return nfa
+
+
+# ================================================
+# NFA REDUCTION (ε-elimination, pruning, bisimulation)
+# ================================================
+
+# ε-elimination can square the number of transitions (x{0,n}); beyond this
+# factor of the original count reduce_nfa keeps the Thompson NFA
+REDUCE_MAX_GROWTH = 4
+BISIMULATION_MAX_ROUNDS = 64  # Long chains refine one state per round; give up instead
+BISIMULATION_MAX_WORK = 50000  # Bound on rounds * states, so large NFAs give up sooner
+
+
+def remove_epsilons(nfa, max_transitions=None):
+    """Equivalent NFA without ε-transitions, or None past max_transitions
+
+    A state gets every symbol transition of its ε-closure and is final if
+    the closure holds a final state. Only the initial state and states
+    entered by a symbol are kept, which also drops unreachable states.
+    """
+    result = NFA(nfa.alphabet, nfa.symbol_map)
+    transitions = 0
+    ids = {nfa.initial: result.add_state()}
+    worklist = [nfa.initial]
+    while worklist:
+        state = worklist.pop()
+        source = ids[state]
+        closure = nfa.epsilon_closure({state})
+        if closure & nfa.final:
+            result.final.add(source)
+        for member in closure:
+            for symbol, targets in nfa.transitions[member].items():
+                if symbol == EPSILON:
+                    continue
+                transitions += len(targets)
+                for target in targets:
+                    if target not in ids:
+                        ids[target] = result.add_state()
+                        worklist.append(target)
+                    result.add_transition(source, symbol, ids[target])
+            if max_transitions is not None and transitions > max_transitions:
+                return None
+    result.initial = ids[nfa.initial]
+    return result
+
+
+def _quotient(nfa, block, keep=None):
+    """NFA with one state per block id; states not in keep are dropped"""
+    result = NFA(nfa.alphabet, nfa.symbol_map)
+    ids = {}
+
+    def state_of(s):
+        if block[s] not in ids:
+            ids[block[s]] = result.add_state()
+        return ids[block[s]]
+
+    result.initial = state_of(nfa.initial)
+    for s, trans in enumerate(nfa.transitions):
+        if keep is not None and s not in keep:
+            continue
+        source = state_of(s)
+        for symbol, targets in trans.items():
+            for target in targets:
+                if keep is None or target in keep:
+                    result.add_transition(source, symbol, state_of(target))
+        if s in nfa.final:
+            result.final.add(source)
+    return result
+
+
+def prune_nfa(nfa):
+    """Drop states from which no final state can be reached (the initial state stays)"""
+    successors = [set().union(*trans.values()) for trans in nfa.transitions]
+    keep = coaccessible_states(successors, nfa.final) | {nfa.initial}
+    if len(keep) == nfa.state_count:
+        return nfa
+    return _quotient(nfa, list(range(nfa.state_count)), keep)
+
+
+def merge_bisimilar(nfa, backward=False):
+    """Merge states that are forward (or backward) bisimilar
+
+    Forward: same finality and, for every symbol, successors in the same
+    blocks, so the states accept the same futures. Backward: both or
+    neither initial and predecessors in the same blocks, so the same
+    words reach them. Blocks are refined until stable, as in Moore's
+    minimization; past BISIMULATION_MAX_ROUNDS rounds (fewer for large
+    NFAs, see BISIMULATION_MAX_WORK) the NFA is returned unmerged, since a
+    partial refinement is not a bisimulation.
+    """
+    count = nfa.state_count
+    edges = [[] for _ in range(count)]  # (symbol, neighbour) pairs in the chosen direction
+    for s, trans in enumerate(nfa.transitions):
+        for symbol, targets in trans.items():
+            for target in targets:
+                if backward:
+                    edges[target].append((symbol, s))
+                else:
+                    edges[s].append((symbol, target))
+    if backward:
+        block = [int(s == nfa.initial) for s in range(count)]
+    else:
+        block = [int(s in nfa.final) for s in range(count)]
+
+    block_count = len(set(block))
+    for _ in range(min(BISIMULATION_MAX_ROUNDS, max(1, BISIMULATION_MAX_WORK // count))):
+        signatures = {}
+        refined = [signatures.setdefault(
+            (block[s], frozenset((symbol, block[t]) for symbol, t in edges[s])), len(signatures))
+            for s in range(count)]
+        block = refined
+        if len(signatures) == block_count:
+            break
+        block_count = len(signatures)
+    else:
+        return nfa
+    if block_count == count:
+        return nfa
+    return _quotient(nfa, block)
+
+
+def reduce_nfa(nfa):
+    """ε-free NFA with the same language and usually far fewer states
+
+    Removes ε-transitions, prunes states that are unreachable or cannot
+    reach a final state, then merges forward and backward bisimilar
+    states. Subset construction and LazyDFA then work on the smaller
+    automaton and never compute a non-trivial ε-closure. If removing ε
+    would multiply the transitions by more than REDUCE_MAX_GROWTH, nfa
+    is returned as it is.
+    """
+    with instrumentation.span("compile.reduce"):
+        original = sum(len(targets) for trans in nfa.transitions for targets in trans.values())
+        reduced = remove_epsilons(nfa, REDUCE_MAX_GROWTH * original + nfa.state_count)
+        if reduced is None:
+            return nfa
+        reduced = prune_nfa(reduced)
+        reduced = merge_bisimilar(reduced)
+        reduced = merge_bisimilar(reduced, backward=True)
+    instrumentation.count("reduced_nfa_states", reduced.state_count)
+    return reduced
+
+
+# ================================================
+# SUBSET CONSTRUCTION (NFA -> DFA)
+# ================================================
+
+def subset_construction(nfa, limits=None, deadline=None, unanchored=False):
+    """Convert an ε-NFA into a complete DFA; the empty subset becomes the dead state
+
+    With unanchored=True every subset also contains the start closure, so
+    the DFA recognizes every input that ends with a match (Σ* r).
+    """
+    limits = limits or UNLIMITED
+    max_states = limits.max_dfa_states
+    with instrumentation.span("compile.subset"):
+        dfa = DFA(nfa.alphabet, nfa.symbol_map)
+        start = nfa.epsilon_closure({nfa.initial})
+        subsets = {start: dfa.add_state()}
+        worklist = [start]
+        # Many subsets move to the same NFA states; close each moved set only once
+        closures = {}
+        closure_hits = 0
+
+        while worklist:
+            limits.check_deadline(deadline, "subset")
+            subset = worklist.pop()
+            state = subsets[subset]
+            if subset & nfa.final:
+                dfa.final.add(state)
+
+            for symbol in dfa.alphabet:
+                moved = frozenset(nfa.move(subset, symbol))
+                target = closures.get(moved)
+                if target is None:
+                    target = nfa.epsilon_closure(moved)
+                    if unanchored:
+                        target = target | start
+                    closures[moved] = target
+                else:
+                    closure_hits += 1
+                if target not in subsets:
+                    subsets[target] = dfa.add_state()
+                    worklist.append(target)
+                    if max_states is not None and dfa.state_count > max_states:
+                        raise CompileBudgetError("max_dfa_states", max_states, dfa.state_count, "subset")
+                dfa.transitions[state][symbol] = subsets[target]
+
+        # Not only the empty subset: any subset that can no longer reach a final state
+        dfa.dead_states = find_dead_states(dfa)
+
+    instrumentation.count("dfa_states_created", dfa.state_count)
+    instrumentation.count("epsilon_closure_cache_hits", closure_hits)
+    instrumentation.count("epsilon_closure_cache_misses", len(closures))
+    return dfa
+
+
+# ================================================
+# DIRECT CONSTRUCTION (AST -> DFA, no ε-NFA)
+# ================================================
+
+class PositionBuilder:
+    """Number the symbol occurrences of an AST and compute followpos (Aho, Sethi, Ullman)
+
+    Every literal gets a position; follow[p] holds the positions that can
+    come right after position p in some string of the language.
+    """
+
+    def __init__(self):
+        self.symbols = []  # position -> symbol, None for the end marker
+        self.follow = []
+
+    def add_position(self, symbol):
+        self.symbols.append(symbol)
+        self.follow.append(set())
+        return len(self.symbols) - 1
+
+    def visit(self, node):
+        """Return (nullable, firstpos, lastpos) of node, adding its followpos pairs"""
+        kind = node[0]
+
+        if kind == "eps":
+            return True, frozenset(), frozenset()
+
+        if kind == "lit":
+            position = frozenset([self.add_position(node[1])])
+            return False, position, position
+
+        if kind == "cat":
+            nullable, first, last = True, frozenset(), frozenset()
+            for child in node[1]:
+                child_nullable, child_first, child_last = self.visit(child)
+                for position in last:
+                    self.follow[position] |= child_first
+                if nullable:
+                    first = first | child_first
+                last = last | child_last if child_nullable else child_last
+                nullable = nullable and child_nullable
+            return nullable, first, last
+
+        if kind == "alt":
+            nullable, first, last = False, frozenset(), frozenset()
+            for child in node[1]:
+                child_nullable, child_first, child_last = self.visit(child)
+                nullable = nullable or child_nullable
+                first = first | child_first
+                last = last | child_last
+            return nullable, first, last
+
+        if kind == "star":
+            _, first, last = self.visit(node[1])
+            for position in last:
+                self.follow[position] |= first
+            return True, first, last
+
+        if kind == "repeat":
+            # Every copy needs its own positions: x{2,4} is visited as x x x? x?
+            child, low, high = node[1], node[2], node[3]
+            if high is None:
+                copies = (child,) * low + (("star", child),)
+            else:
+                copies = (child,) * low + (("alt", (child, EPS)),) * (high - low)
+            return self.visit(("cat", copies))
+
+        raise ValueError(f"Unknown AST node: {kind}")
+
+
+def followpos_dfa(ast, limits=None, deadline=None, unanchored=False):
+    """Build a complete DFA straight from an AST with followpos position sets
+
+    DFA states are sets of positions, so no ε-NFA is built and no
+    ε-closure is ever computed. The language, and therefore the minimized
+    DFA, is the same as through build_nfa and subset_construction.
+    """
+    limits = limits or UNLIMITED
+    symbol_map = class_symbol_map([ast])
+    if symbol_map is not None:
+        ast = symbol_map.rewrite(ast)
+    if limits.max_nfa_states is not None:
+        # Positions are fewer than Thompson states; the same estimate bounds both
+        estimate = nfa_state_estimate(ast)
+        if estimate > limits.max_nfa_states:
+            raise CompileBudgetError("max_nfa_states", limits.max_nfa_states, estimate, "followpos")
+    max_states = limits.max_dfa_states
+    with instrumentation.span("compile.followpos"):
+        builder = PositionBuilder()
+        nullable, first, last = builder.visit(ast)
+        end = builder.add_position(None)  # The end marker: a state holding it is final
+        for position in last:
+            builder.follow[position].add(end)
+        start = first | {end} if nullable else first
+        symbols = builder.symbols
+        follow = builder.follow
+
+        dfa = DFA(ast_alphabet(ast), symbol_map)
+        subsets = {start: dfa.add_state()}
+        worklist = [start]
+        while worklist:
+            limits.check_deadline(deadline, "followpos")
+            subset = worklist.pop()
+            state = subsets[subset]
+            if end in subset:
+                dfa.final.add(state)
+
+            moves = {}
+            for position in subset:
+                symbol = symbols[position]
+                if symbol is not None:
+                    moves.setdefault(symbol, set()).update(follow[position])
+            for symbol in dfa.alphabet:
+                target = frozenset(moves.get(symbol, ()))
+                if unanchored:
+                    target = target | start
+                if target not in subsets:
+                    subsets[target] = dfa.add_state()
+                    worklist.append(target)
+                    if max_states is not None and dfa.state_count > max_states:
+                        raise CompileBudgetError("max_dfa_states", max_states, dfa.state_count, "followpos")
+                dfa.transitions[state][symbol] = subsets[target]
+
+        dfa.dead_states = find_dead_states(dfa)
+
+    instrumentation.count("dfa_states_created", dfa.state_count)
+    return dfa
+
+
+# ================================================
+# MINIMIZATION (DFA -> Minimized DFA)
+# ================================================
+
+def minimize_dfa(dfa, limits=None, deadline=None):
+    """Merge equivalent states by partition refinement, renumbering from the initial state"""
+    with instrumentation.span("compile.minimize"):
+        minimized = _minimize(dfa, limits or UNLIMITED, deadline)
+    instrumentation.count("min_dfa_states_created", minimized.state_count)
+    return minimized
+
+
+def _minimize(dfa, limits, deadline):
+    alphabet = dfa.alphabet
+    transitions = dfa.transitions
+    block_of = [1 if s in dfa.final else 0 for s in range(dfa.state_count)]
+    block_count = len(set(block_of))
+
+    # Split blocks until no two states in a block disagree on a successor block
+    while True:
+        limits.check_deadline(deadline, "minimize")
+        signatures = {}
+        new_block_of = []
+        for s in range(dfa.state_count):
+            signature = (block_of[s],) + tuple(block_of[transitions[s][a]] for a in alphabet)
+            new_block_of.append(signatures.setdefault(signature, len(signatures)))
+        block_of = new_block_of
+        if len(signatures) == block_count:
+            break
+        block_count = len(signatures)
+
+    # Number the blocks in breadth-first order so the initial state is A
+    minimized = DFA(alphabet, dfa.symbol_map)
+    number = {block_of[dfa.initial]: minimized.add_state()}
+    representative = {block_of[dfa.initial]: dfa.initial}
+    queue = [dfa.initial]
+    for s in queue:
+        for symbol in alphabet:
+            t = transitions[s][symbol]
+            if block_of[t] not in number:
+                number[block_of[t]] = minimized.add_state()
+                representative[block_of[t]] = t
+                queue.append(t)
+
+    for block, state in number.items():
+        source = representative[block]
+        minimized.transitions[state] = {a: number[block_of[transitions[source][a]]] for a in alphabet}
+        if source in dfa.final:
+            minimized.final.add(state)
+        if source in dfa.dead_states:
+            minimized.dead_states.add(state)
+
+    minimized.initial = 0
+    return minimized
+
+
+# ================================================
+# ALPHABET COMPRESSION (DFA -> class-indexed table)
+# ================================================
+
+MAX_SYMBOL_CLASSES = 256  # Class ids must fit in one byte
+CLASSIFY_CHUNK = 1 << 20   # Large byte buffers are translated this many bytes at a time
+EARLY_EXIT_BLOCK = 64      # Symbols scanned before the first dead/accept-sink check
+RUN_CHECK_BLOCK = 64       # Symbols stepped one by one between checks for a self-loop run
+
+
+def skip_run(data, i, symbols, n):
+    """Index of the first item of data[i:n] not in symbols, found at C speed
+
+    data and symbols are both str or both bytes. A run of one symbol is
+    compared a slice at a time (memcmp), other runs are lstrip()ped; the
+    slices double in size, so a run of length k costs O(log k) calls.
+    """
+    step = 64
+    run = symbols * step if len(symbols) == 1 else None
+    while i < n:
+        chunk = data[i:min(i + step, n)]
+        if chunk == run:
+            i += step
+        else:
+            rest = len(chunk.lstrip(symbols))
+            if rest:
+                return i + len(chunk) - rest
+            i += len(chunk)
+        if step < CLASSIFY_CHUNK:
+            step *= 2
+            run = symbols * step if run is not None else None
+    return n
+
+
+class ClassDFA:
+    """A DFA whose symbols are grouped into equivalence classes
+
+    Symbols that lead to the same state from every state share a class;
+    class 0 holds every symbol outside the alphabet and leads to a
+    rejecting sink, or to the state given as outside. The transition table is one flat list indexed by
+    state * class_count + class, with targets stored already multiplied
+    by class_count, so each input symbol costs a single list lookup.
+    Input is turned into class bytes in C with str.encode and
+    bytes.translate through the 256-entry byte_map. With character
+    classes, the byte map sends each character straight to the class of
+    its atom, so the SymbolMap costs nothing per symbol below U+0100.
+
+    Scanning stops early in a dead state (no final state reachable) or in
+    an accept sink (a final state that every possible input byte keeps
+    final). The state is checked after blocks of growing size rather than
+    after every symbol, which keeps the inner loop a single lookup.
+    A state with a self-loop (loops maps it to its looping classes) is
+    checked every RUN_CHECK_BLOCK symbols, and a run of looping classes
+    is then skipped with skip_run instead of stepped through.
+    """
+
+    def __init__(self, dfa, outside=None):
+        state_count = dfa.state_count
+        if outside is None:
+            outside = min(dfa.dead_states) if dfa.dead_states else state_count
+            if outside == state_count:
+                state_count += 1  # Add a rejecting sink for symbols outside the alphabet
+        rows = [dfa.transitions[s] for s in range(dfa.state_count)] + [{}] * (state_count - dfa.state_count)
+
+        columns = {(outside,) * state_count: 0}
+        self.symbol_class = {}
+        for symbol in dfa.alphabet:
+            column = tuple(row.get(symbol, outside) for row in rows)
+            self.symbol_class[symbol] = columns.setdefault(column, len(columns))
+        if len(columns) > MAX_SYMBOL_CLASSES:
+            raise ValueError(f"{len(columns)} symbol classes do not fit in a byte map")
+
+        width = len(columns)
+        self.alphabet = dfa.alphabet
+        self.symbol_map = dfa.symbol_map
+        self.class_count = width
+        self.state_count = state_count
+        self.initial = dfa.initial * width
+        self.final = frozenset(s * width for s in dfa.final)
+        self.table = [target * width for s in range(state_count) for target in
+                      (column[s] for column in columns)]
+
+        byte_map = bytearray(MAX_SYMBOL_CLASSES)
+        if self.symbol_map is None:
+            for symbol, symbol_class in self.symbol_class.items():
+                if ord(symbol) < 256:
+                    byte_map[ord(symbol)] = symbol_class
+        else:
+            for code in range(256):
+                byte_map[code] = self.symbol_class.get(chr(self.symbol_map.representative(code)), 0)
+        self.byte_map = bytes(byte_map)
+        # Characters above U+00FF can be in the alphabet through a class atom
+        self.wide = self.symbol_map is not None and self.symbol_map.max_code > 0xFF
+
+        # Early exit states, as table offsets like every other state here
+        columns = list(columns)
+        successors = [{column[s] for column in columns} for s in range(state_count)]
+        live = coaccessible_states(successors, dfa.final)
+        self.dead = frozenset(s * width for s in range(state_count) if s not in live)
+        # Largest set of final states closed under every class a byte can map to
+        # (every class at all when wide characters have classes of their own)
+        byte_columns = columns if self.wide else [columns[c] for c in set(self.byte_map)]
+        sinks = set(dfa.final)
+        changed = True
+        while changed:
+            stay = {s for s in sinks if all(column[s] in sinks for column in byte_columns)}
+            changed = stay != sinks
+            sinks = stay
+        self.accept_sinks = frozenset(s * width for s in sinks)
+        self.stop_states = self.dead | self.accept_sinks
+        self.loops = {}
+        for s in range(state_count):
+            offset = s * width
+            looping = bytes(c for c in range(width) if self.table[offset + c] == offset)
+            if looping and offset not in self.stop_states:
+                self.loops[offset] = looping
+
+    def classify(self, data):
+        """Class byte of every symbol of a str, or of bytes-like input read as Latin-1"""
+        if isinstance(data, str):
+            try:
+                data = data.encode("latin-1")
+            except UnicodeEncodeError:
+                get = self.symbol_class.get
+                if self.symbol_map is not None:
+                    data = self.symbol_map.translate(data)
+                return bytes(get(char, 0) for char in data)
+        elif not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        return data.translate(self.byte_map)
+
+    def class_blocks(self, data, start=0):
+        """Class bytes of str or bytes-like input from start on, in blocks of growing size
+
+        Blocks start at EARLY_EXIT_BLOCK symbols and grow fourfold up to
+        CLASSIFY_CHUNK, so a scan that stops early has classified little
+        more than it read, and a large mmap is never copied as a whole.
+        """
+        byte_map = self.byte_map
+        is_text = isinstance(data, str)
+        if not is_text and not isinstance(data, (bytes, bytearray)):
+            data = memoryview(data).cast("B")
+        block = EARLY_EXIT_BLOCK
+        while start < len(data):
+            piece = data[start:start + block]
+            if is_text:
+                try:
+                    yield piece.encode("latin-1").translate(byte_map)
+                except UnicodeEncodeError:
+                    yield self.classify(piece)
+            else:
+                yield bytes(piece).translate(byte_map)
+            start += block
+            block = min(block * 4, CLASSIFY_CHUNK)
+
+    def accepts(self, data):
+        # Short strings skip the block machinery; call overhead dominates there
+        if isinstance(data, str) and len(data) <= EARLY_EXIT_BLOCK:
+            try:
+                classes = data.encode("latin-1").translate(self.byte_map)
+            except UnicodeEncodeError:
+                classes = self.classify(data)
+            table = self.table
+            state = self.initial
+            for symbol_class in classes:
+                state = table[state + symbol_class]
+            return state in self.final
+        return self.accepts_counted(data)[0]
+
+    def accepts_counted(self, data):
+        """Return (accepted, symbols scanned), stopping early in a dead state or accept sink"""
+        table = self.table
+        dead = self.dead
+        stop_states = self.stop_states
+        loops = self.loops
+        state = self.initial
+        scanned = 0
+        for classes in self.class_blocks(data):
+            if loops:
+                state = self.scan_block(classes, state)
+            else:
+                for symbol_class in classes:
+                    state = table[state + symbol_class]
+            scanned += len(classes)
+            if state in stop_states:
+                if state in dead:
+                    return False, scanned
+                # Accept sinks hold for every byte; a str may still contain a
+                # character above U+00FF that is outside the alphabet
+                rest = data[scanned:] if isinstance(data, str) and not self.wide else ""
+                if not rest or max(rest) < "\u0100":
+                    return True, scanned
+                stop_states = dead
+        return state in self.final, scanned
+
+    def scan_block(self, classes, state):
+        """State after a block of class bytes, skipping runs on self-loop states
+
+        Stops early, still in a dead state, once one is entered.
+        """
+        table = self.table
+        loops = self.loops
+        dead = self.dead
+        position = 0
+        size = len(classes)
+        while position < size:
+            looping = loops.get(state)
+            if looping is not None:
+                position = skip_run(classes, position, looping, size)
+            for symbol_class in classes[position:position + RUN_CHECK_BLOCK]:
+                state = table[state + symbol_class]
+            position += RUN_CHECK_BLOCK
+            if state in dead:
+                break
+        return state
+
+
+def compress_alphabet(dfa):
+    """ClassDFA for dfa, or None if its classes do not fit in a byte map"""
+    try:
+        return ClassDFA(dfa)
+    except ValueError:
+        return None
+
+
+# ================================================
+# LAZY DFA (fallback when the full DFA is over budget)
+# ================================================
+
+class LazyDFA:
+    """Subset construction on demand, only for the subsets an input actually reaches
+
+    At most max_states subsets are cached. When the cache is full it is
+    flushed and refilled from the current subset, so memory stays bounded
+    no matter how large the full DFA would be.
+    """
+
+    def __init__(self, nfa, max_states=LAZY_CACHE_STATES):
+        self.nfa = nfa
+        self.symbol_map = nfa.symbol_map
+        self.alphabet = nfa.alphabet
+        self._symbols = frozenset(nfa.alphabet)
+        self.max_states = max_states
+        self.flushes = 0
+        self._live = frozenset(coaccessible_states(
+            [set().union(*trans.values()) for trans in nfa.transitions], nfa.final))
+        self._start = nfa.epsilon_closure({nfa.initial})
+        self._lock = threading.Lock()  # Matching mutates the cache
+        self._reset()
+
+    @property
+    def state_count(self):
+        return len(self._subsets)
+
+    def _reset(self):
+        self._ids = {}
+        self._subsets = []
+        self._transitions = []
+        self._final = []
+        self._dead = []
+        self._add(self._start)
+
+    def _add(self, subset):
+        state = len(self._subsets)
+        self._ids[subset] = state
+        self._subsets.append(subset)
+        self._transitions.append({})
+        self._final.append(bool(subset & self.nfa.final))
+        self._dead.append(not subset & self._live)
+        return state
+
+    def _successor(self, subset, symbol):
+        return self.nfa.epsilon_closure(self.nfa.move(subset, symbol))
+
+    def _step(self, state, symbol):
+        """Target of a transition that is not cached yet"""
+        subset = self._subsets[state]
+        target = self._successor(subset, symbol)
+        target_state = self._ids.get(target)
+        if target_state is None:
+            if len(self._subsets) >= self.max_states:
+                self.flushes += 1
+                self._reset()
+                state = self._ids.get(subset)
+                if state is None:
+                    state = self._add(subset)
+            target_state = self._add(target)
+        self._transitions[state][symbol] = target_state
+        return target_state
+
+    def accepts_counted(self, input_string):
+        """Return (accepted, transitions taken); symbols outside the alphabet reject"""
+        if self.symbol_map is not None:
+            input_string = self.symbol_map.translate(input_string)
+        if not isinstance(input_string, str):
+            # Byte-level automata use Latin-1 characters as byte symbols (see utf8_ast)
+            input_string = bytes(input_string).decode("latin-1")
+        symbols = self._symbols
+        with self._lock:
+            state = self._ids[self._start]
+            steps = 0
+            for char in input_string:
+                if char not in symbols:
+                    return False, steps
+                target = self._transitions[state].get(char)
+                state = self._step(state, char) if target is None else target
+                steps += 1
+                if self._dead[state]:
+                    return False, steps
+            return self._final[state], steps
+
+    def accepts(self, input_string):
+        return self.accepts_counted(input_string)[0]
+
+
+# ================================================
+# COUNTING AUTOMATON (bounded repetition without unrolling)
+# ================================================
+# x{m,n} with a large n is not copied n times. Its body gets one set of
+# positions, as in followpos, and every active position carries a
+# bit-vector of the iteration counts that reach it: bit k-1 is set when
+# some path is in iteration k. Going round the repetition shifts the
+# vector left, leaving it requires a bit for m or more, and entering it
+# starts at iteration 1. A vector is kept as (bits, offset), a Python int
+# whose lowest set bit stands for count offset+1, so a shift is an
+# addition and x{1,100000} costs the same per symbol as x{1,20}.
+
+COUNTER_MIN_REPEAT = 16  # Smaller repetitions are unrolled as usual
+
+KEEP, SHIFT, RESET = range(3)  # Edge operations on the count vector
+
+
+def _counted(node):
+    """True if node is a repetition that gets a counter"""
+    if node[0] != "repeat":
+        return False
+    size = node[2] if node[3] is None else node[3]
+    return size > COUNTER_MIN_REPEAT and not _has_counter(node[1])
+
+
+def _has_counter(node):
+    kind = node[0]
+    if kind in ("cat", "alt"):
+        return any(_has_counter(child) for child in node[1])
+    if kind == "star":
+        return _has_counter(node[1])
+    if kind == "repeat":
+        return _counted(node) or _has_counter(node[1])
+    return False
+
+
+def counting_size(node):
+    """Positions CountingBuilder creates for an AST, without building it"""
+    kind = node[0]
+    if kind == "eps":
+        return 0
+    if kind == "lit":
+        return 1
+    if kind == "class":
+        return len(node[1])
+    if kind in ("cat", "alt"):
+        return sum(counting_size(child) for child in node[1])
+    if kind == "star":
+        return counting_size(node[1])
+    if _counted(node):
+        return counting_size(node[1])
+    return (node[2] + (node[3] - node[2] if node[3] is not None else 1)) * counting_size(node[1])
+
+
+class CountingBuilder:
+    """Positions and edges of an AST, with counters for the large repetitions
+
+    Innermost large repetitions get counters; repetitions around them are
+    unrolled, so every position belongs to at most one counter. An edge is
+    (target, operation, argument): KEEP passes the count vector on, SHIFT
+    starts the next iteration of the counter in argument, and RESET starts
+    a fresh vector, if argument is not None only when the source vector
+    has a bit at or above argument (a count that may leave the counter).
+    """
+
+    def __init__(self):
+        self.symbols = []   # position -> symbol, None for the start position
+        self.counter = []   # position -> counter index or None
+        self.edges = []
+        self.counters = []  # counter index -> (width, saturating)
+        self.exits = []     # counter index -> lowest bit of a count that may leave
+        self.context = None  # Counter around the node being visited
+        self.start = self.add_position(None)
+
+    def add_position(self, symbol):
+        self.symbols.append(symbol)
+        self.counter.append(self.context)
+        self.edges.append([])
+        return len(self.symbols) - 1
+
+    def exit_bit(self, position):
+        """Lowest bit that lets a vector leave the counter of position, or None if it has none"""
+        counter = self.counter[position]
+        return None if counter is None else self.exits[counter]
+
+    def link(self, sources, targets):
+        for source in sources:
+            leaving = self.counter[source] != self.context
+            for target in targets:
+                if not leaving and self.counter[target] == self.context:
+                    self.edges[source].append((target, KEEP, None))
+                else:
+                    self.edges[source].append((target, RESET, self.exit_bit(source) if leaving else None))
+
+    def visit(self, node):
+        """Return (nullable, firstpos, lastpos) of node, adding its edges"""
+        kind = node[0]
+
+        if kind == "eps":
+            return True, frozenset(), frozenset()
+
+        if kind == "lit":
+            position = frozenset([self.add_position(node[1])])
+            return False, position, position
+
+        if kind == "cat":
+            nullable, first, last = True, frozenset(), frozenset()
+            for child in node[1]:
+                child_nullable, child_first, child_last = self.visit(child)
+                self.link(last, child_first)
+                if nullable:
+                    first = first | child_first
+                last = last | child_last if child_nullable else child_last
+                nullable = nullable and child_nullable
+            return nullable, first, last
+
+        if kind == "alt":
+            nullable, first, last = False, frozenset(), frozenset()
+            for child in node[1]:
+                child_nullable, child_first, child_last = self.visit(child)
+                nullable = nullable or child_nullable
+                first = first | child_first
+                last = last | child_last
+            return nullable, first, last
+
+        if kind == "star":
+            _, first, last = self.visit(node[1])
+            self.link(last, first)
+            return True, first, last
+
+        if kind == "repeat":
+            child, low, high = node[1], node[2], node[3]
+            if not _counted(node):
+                if high is None:
+                    copies = (child,) * low + (("star", child),)
+                else:
+                    copies = (child,) * low + (("alt", (child, EPS)),) * (high - low)
+                return self.visit(("cat", copies))
+
+            outer = self.context
+            self.context = counter = len(self.counters)
+            self.counters.append(None)
+            self.exits.append(None)
+            nullable, first, last = self.visit(child)
+            if nullable:
+                low = 0  # Empty iterations make up any missing count
+            if high is None:
+                # Counts from low up are alike: the top bit stands for all of them
+                self.counters[counter] = (max(low, 1), True)
+            else:
+                self.counters[counter] = (high, False)
+            self.exits[counter] = max(low, 1) - 1
+            for source in last:
+                for target in first:
+                    self.edges[source].append((target, SHIFT, counter))
+            self.context = outer
+            return nullable or low == 0, first, last
+
+        raise ValueError(f"Unknown AST node: {kind}")
+
+
+def _union_vectors(a, b):
+    """Union of two (bits, offset) count vectors, with the lowest set bit at the offset"""
+    if a[1] > b[1]:
+        a, b = b, a
+    return a[0] | (b[0] << (b[1] - a[1])), a[1]
+
+
+class CountingMatcher(LazyDFA):
+    """Whole-input matching of an AST with counters, cached like a LazyDFA
+
+    A cached state is a configuration: the active positions with their
+    count vectors, as a sorted tuple of (position, bits, offset). Patterns
+    such as [...]{1,255} reach few distinct configurations, so after
+    warming up they match at DFA speed; patterns with many only cost a
+    cache flush now and then.
+    """
+
+    def __init__(self, ast, max_states=LAZY_CACHE_STATES):
+        self.symbol_map = class_symbol_map([ast])
+        if self.symbol_map is not None:
+            ast = self.symbol_map.rewrite(ast)
+        builder = CountingBuilder()
+        nullable, first, last = builder.visit(ast)
+        builder.link([builder.start], first)
+        self.position_count = len(builder.symbols)
+
+        # accept[p]: None if a match cannot end at p, else the lowest bit that lets it
+        accept = [None] * self.position_count
+        for position in last:
+            accept[position] = builder.exit_bit(position) or 0
+        if nullable:
+            accept[builder.start] = 0
+        # Positions from which the end cannot be reached are dropped
+        live = coaccessible_states([{edge[0] for edge in edges} for edges in builder.edges],
+                                   {p for p in range(self.position_count) if accept[p] is not None})
+        self._accept = accept
+        self._counters = builder.counters
+        self._moves = []  # position -> symbol -> edges
+        for edges in builder.edges:
+            moves = {}
+            for edge in edges:
+                if edge[0] in live:
+                    moves.setdefault(builder.symbols[edge[0]], []).append(edge)
+            self._moves.append(moves)
+
+        self.alphabet = sorted(ast_alphabet(ast))
+        self._symbols = frozenset(self.alphabet)
+        self.max_states = max_states
+        self.flushes = 0
+        self._start = ((builder.start, 1, 0),)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _add(self, configuration):
+        state = len(self._subsets)
+        self._ids[configuration] = state
+        self._subsets.append(configuration)
+        self._transitions.append({})
+        accept = self._accept
+        self._final.append(any(accept[p] is not None and offset + bits.bit_length() > accept[p]
+                               for p, bits, offset in configuration))
+        self._dead.append(not configuration)
+        return state
+
+    def _successor(self, configuration, symbol):
+        counters = self._counters
+        target = {}
+        for position, bits, offset in configuration:
+            for next_position, operation, argument in self._moves[position].get(symbol, ()):
+                if operation == KEEP:
+                    vector = (bits, offset)
+                elif operation == SHIFT:
+                    width, saturating = counters[argument]
+                    top = width - offset - 1  # Bit of count width, the largest kept
+                    vector = (bits, offset + 1)
+                    if bits >> top:
+                        # The top count went past width: keep it at width or drop it
+                        kept = bits & ((1 << top) - 1)
+                        if saturating:
+                            vector = (kept | 1 << (top - 1), offset + 1) if top else (1, offset)
+                        elif kept:
+                            vector = (kept, offset + 1)
+                        else:
+                            continue
+                elif argument is None or offset + bits.bit_length() > argument:
+                    vector = (1, 0)
+                else:
+                    continue
+                previous = target.get(next_position)
+                if previous is not None:
+                    vector = _union_vectors(previous, vector)
+                target[next_position] = vector
+        return tuple(sorted((p, bits, offset) for p, (bits, offset) in target.items()))
+
+
+# ================================================
+# COMPILED PATTERN
+# ================================================
+
+class CompiledRegex:
+    """A pattern together with every automaton of the pipeline
+
+    When the DFA went over budget and the pattern was compiled with
+    fallback=True, dfa and min_dfa are None and matching uses a LazyDFA,
+    or a CountingMatcher for patterns with large repetitions; nfa then
+    raises budget_error if the Thompson NFA itself was over budget.
+    A pattern compiled with construction="followpos" builds its NFA only
+    when something asks for it. nfa is always the Thompson NFA, also with
+    construction="reduced".
+
+    matches() takes str, or UTF-8 encoded bytes, bytearray, memoryview or
+    mmap. Bytes are matched by a byte-level automaton without decoding.
+    """
+
+    def __init__(self, pattern, ast, nfa, dfa, min_dfa, lazy=None, budget_error=None):
+        self.pattern = pattern
+        self.ast = ast
+        self._nfa = nfa
+        self.dfa = dfa
+        self.min_dfa = min_dfa
+        self.lazy = lazy
+        self.budget_error = budget_error  # Why the DFA tables were not built
+        if min_dfa is not None:
+            self.matcher = compress_alphabet(min_dfa) or min_dfa
+        else:
+            self.matcher = lazy
+        self._byte_matcher = None
+
+    @property
+    def nfa(self):
+        if self._nfa is None:
+            if self.budget_error is not None and self.budget_error.budget == "max_nfa_states":
+                raise self.budget_error
+            self._nfa = build_nfa(self.ast)
+        return self._nfa
+
+    @property
+    def alphabet(self):
+        return self.matcher.alphabet
+
+    @property
+    def is_lazy(self):
+        return self.min_dfa is None
+
+    @property
+    def state_count(self):
+        """States held by all stages together (the lazy cache counts at its maximum)"""
+        nfa_states = self._nfa.state_count if self._nfa is not None else 0
+        if self.is_lazy:
+            return nfa_states + self.lazy.max_states
+        return nfa_states + self.dfa.state_count + self.min_dfa.state_count
+
+    @property
+    def byte_matcher(self):
+        """Matcher over UTF-8 encoded input, built on first use"""
+        if self._byte_matcher is None:
+            symbol_map = self.matcher.symbol_map
+            if symbol_map is None and all(symbol < "\x80" for symbol in self.alphabet) or \
+                    symbol_map is not None and symbol_map.max_code < 0x80:
+                # ASCII symbols are their own UTF-8 encoding, and every byte of a
+                # multi-byte character falls outside the alphabet and rejects
+                self._byte_matcher = self.matcher
+            else:
+                self._byte_matcher = compile_ast(self.pattern, utf8_ast(self.ast), fallback=True,
+                                                 construction="followpos").matcher
+        return self._byte_matcher
+
+    def matches(self, input_string):
+        """True if the whole input_string belongs to the language of the pattern"""
+        matcher = self.matcher if isinstance(input_string, str) else self.byte_matcher
+        if not instrumentation.enabled:
+            return matcher.accepts(input_string)
+        with instrumentation.span("match"):
+            accepted, steps = matcher.accepts_counted(input_string)
+        instrumentation.count("match_calls")
+        instrumentation.count("transitions_taken", steps)
+        return accepted
+
+    def require_dfa(self):
+        """Raise CompileBudgetError if the DFA tables were not built"""
+        if self.is_lazy:
+            raise self.budget_error
+
+    def summary(self):
+        """State counts of each stage, for display and logging"""
+        return {
+            "pattern": self.pattern,
+            "alphabet": _display_alphabet(self.matcher),
+            "nfa_states": nfa_state_estimate(self.ast) if self._nfa is None else self._nfa.state_count,
+            "dfa_states": None if self.is_lazy else self.dfa.state_count,
+            "min_dfa_states": None if self.is_lazy else self.min_dfa.state_count,
+            "lazy": self.is_lazy
+        }
+
+
+CONSTRUCTIONS = ("thompson", "reduced", "followpos")
+
+
+def compile_regex(pattern, limits=None, fallback=False, construction="thompson", simplify=False):
+    """Run the whole pipeline for a pattern
+
+    simplify=True compiles simplify_ast() of the pattern: fewer states,
+    but the automata no longer mirror the pattern as written, so it is
+    for matchers whose automata are never displayed.
+    """
+    ast = parse_regex(pattern)
+    if simplify:
+        ast = simplify_ast(ast)
+    return compile_ast(pattern, ast, limits, fallback, construction)
+
+
+def compile_ast(pattern, ast, limits=None, fallback=False, construction="thompson"):
+    """Run the pipeline from an already parsed AST
+
+    limits defaults to DEFAULT_LIMITS. If the DFA stages go over budget,
+    CompileBudgetError is raised, or with fallback=True the pattern is
+    matched by a LazyDFA instead. Patterns with repetitions larger than
+    COUNTER_MIN_REPEAT fall back to a CountingMatcher, which also covers
+    an unrolled NFA over budget; otherwise an NFA over budget always raises.
+
+    construction="reduced" runs subset construction on reduce_nfa() of
+    the Thompson NFA. construction="followpos" builds the DFA straight
+    from the AST (followpos_dfa); the NFA is then only built for a lazy
+    fallback. The minimized DFA is the same whichever construction is used.
+    A lazy fallback always runs on the reduced NFA.
+    """
+    if construction not in CONSTRUCTIONS:
+        raise ValueError(f"construction must be one of {', '.join(CONSTRUCTIONS)}")
+    limits = limits or DEFAULT_LIMITS
+    deadline = limits.deadline()
+    nfa = None
+    try:
+        if construction != "followpos":
+            nfa = build_nfa(ast, limits)
+        if nfa is None:
+            dfa = followpos_dfa(ast, limits, deadline)
+        elif construction == "reduced":
+            dfa = subset_construction(reduce_nfa(nfa), limits, deadline)
+        else:
+            dfa = subset_construction(nfa, limits, deadline)
+        min_dfa = minimize_dfa(dfa, limits, deadline)
+    except CompileBudgetError as e:
+        if not fallback:
+            raise
+        if _has_counter(ast):
+            if limits.max_nfa_states is not None:
+                size = counting_size(ast)
+                if size > limits.max_nfa_states:
+                    raise CompileBudgetError("max_nfa_states", limits.max_nfa_states, size, "counting")
+            instrumentation.count("counting_fallbacks")
+            matcher = CountingMatcher(ast, limits.max_dfa_states or LAZY_CACHE_STATES)
+            return CompiledRegex(pattern, ast, nfa, None, None, matcher, budget_error=e)
+        if e.budget == "max_nfa_states":
+            raise
+        instrumentation.count("lazy_fallbacks")
+        nfa = nfa or build_nfa(ast, limits)
+        lazy = LazyDFA(reduce_nfa(nfa), limits.max_dfa_states or LAZY_CACHE_STATES)
+        return CompiledRegex(pattern, ast, nfa, None, None, lazy, budget_error=e)
+    return CompiledRegex(pattern, ast, nfa, dfa, min_dfa)
@@ -0,0 +1,328 @@
+# regex_search.py - Unanchored search: leftmost-longest, non-overlapping matches
+#
+# Match starts come from a reverse DFA and match ends from a forward DFA:
+#   1. The reverse DFA recognizes Σ* rev(r). Run backwards over the text it
+#      is in a final state at position i exactly when some match starts at i,
+#      so one backward pass marks every match start.
+#   2. From the leftmost marked start, the anchored forward DFA runs until
+#      it dies; the last position where it was final is the longest end.
+# The next match is searched from that end, so matches never overlap.
+# Offsets are character offsets for str and byte offsets for UTF-8 bytes.
+#
+# search() wants only the first match, so it does not mark every start:
+#   1. An unanchored forward DFA for Σ* r runs to the earliest match end e.
+#   2. The reverse DFA runs back from e; its leftmost final position s is
+#      the leftmost start among matches that end by e.
+#   3. A match starting before s must end after e. The anchored forward DFA
+#      runs from every start before s at once, as a set of states, until
+#      the set dies; if it reaches a final state instead, steps 2 and 3
+#      repeat from there.
+# The scan then stops about where the first match ends, not at the end of
+# the buffer.
+#
+# The reverse DFA can be exponentially larger than the pattern (Σ* rev(r)
+# for a counted repetition); when either DFA is over the compile budget the
+# search runs on the Pike VM instead. It finds the same matches without a
+# DFA; each match costs O(len(program)) per symbol from where the previous
+# one ended to where the VM could rule out a longer match.
+import functools
+
+from Modules.instrumentation import instrumentation
+from Modules.regex_compiler import (DEFAULT_LIMITS, CLASSIFY_CHUNK, ClassDFA, CompileBudgetError,
+                                    parse_regex, simplify_ast, followpos_dfa, minimize_dfa, utf8_ast,
+                                    reverse_ast, skip_run)
+from Modules.prefilter import Prefilter
+from Modules.pike_vm import PikeVM
+
+# Forward scan status of each table offset
+_RUNNING, _FINAL, _DEAD = 0, 1, 2
+
+
+class SearchAutomata:
+    """Anchored forward and unanchored reverse class tables for one AST
+
+    The unanchored forward table that search() uses is built on first use.
+    """
+
+    def __init__(self, ast, limits):
+        ast = simplify_ast(ast)
+        self.ast = ast
+        self.limits = limits
+        self._unanchored = None
+        deadline = limits.deadline()
+        forward = minimize_dfa(followpos_dfa(ast, limits, deadline), limits, deadline)
+        reverse = followpos_dfa(reverse_ast(ast), limits, deadline, unanchored=True)
+        reverse = minimize_dfa(reverse, limits, deadline)
+
+        self.forward = ClassDFA(forward)
+        # Unanchored: a symbol outside the alphabet only restarts the search
+        self.reverse = ClassDFA(reverse, outside=reverse.initial)
+        self.status = [_RUNNING] * len(self.forward.table)
+        for state in self.forward.final:
+            self.status[state] = _FINAL
+        for state in self.forward.dead:
+            self.status[state] = _DEAD
+
+    @property
+    def unanchored(self):
+        """ClassDFA for Σ* r, or None if it is over the limits"""
+        if self._unanchored is None:
+            try:
+                deadline = self.limits.deadline()
+                dfa = followpos_dfa(self.ast, self.limits, deadline, unanchored=True)
+                dfa = minimize_dfa(dfa, self.limits, deadline)
+                self._unanchored = ClassDFA(dfa, outside=dfa.initial)
+            except CompileBudgetError:
+                self._unanchored = False
+        return self._unanchored or None
+
+
+class RegexSearcher:
+    """Find matches of a pattern anywhere in a str or a UTF-8 bytes-like buffer
+
+    The automata for str and for bytes input are each built on first use;
+    when they go over the limits, matches come from a PikeVM. Raises
+    RegexSyntaxError for bad patterns and CompileBudgetError only when
+    the PikeVM program is over limits.max_nfa_states as well.
+    """
+
+    def __init__(self, pattern, limits=None):
+        self.pattern = pattern
+        self.ast = parse_regex(pattern)
+        self.limits = limits or DEFAULT_LIMITS
+        self._text_automata = None
+        self._byte_automata = None
+        self._pike_vm = None
+        self._text_prefilter = Prefilter(self.ast)
+        self._byte_prefilter = Prefilter(self.ast, binary=True)
+
+    def automata(self, data):
+        """SearchAutomata for str or bytes input, or None if they are over the limits"""
+        if isinstance(data, str):
+            if self._text_automata is None:
+                self._text_automata = self._build(self.ast)
+            return self._text_automata or None
+        if self._byte_automata is None:
+            self._byte_automata = self._build(utf8_ast(self.ast))
+        return self._byte_automata or None
+
+    def _build(self, ast):
+        """SearchAutomata, or False (built, but over budget) after switching to the PikeVM"""
+        try:
+            return SearchAutomata(ast, self.limits)
+        except CompileBudgetError:
+            if self._pike_vm is None:
+                self._pike_vm = PikeVM(self.pattern, self.limits)
+            instrumentation.count("search_pike_fallbacks")
+            return False
+
+    def match_starts(self, data, pos=0):
+        """bytearray of len(data) + 1 flags, 1 where a match starts at or after pos"""
+        reverse = self.automata(data).reverse
+        table = reverse.table
+        final = reverse.final
+        if not isinstance(data, (str, bytes, bytearray)):
+            data = memoryview(data).cast("B")
+
+        starts = bytearray(len(data) + 1)
+        state = reverse.initial
+        starts[len(data)] = state in final  # Empty match at the very end
+        end = len(data)
+        while end > pos:
+            begin = max(pos, end - CLASSIFY_CHUNK)
+            position = end
+            for symbol_class in reversed(reverse.classify(data[begin:end])):
+                state = table[state + symbol_class]
+                position -= 1
+                if state in final:
+                    starts[position] = 1
+            end = begin
+        return starts
+
+    def match_end(self, data, start):
+        """End of the longest match starting at start, or None"""
+        automata = self.automata(data)
+        table = automata.forward.table
+        status = automata.status
+        state = automata.forward.initial
+        end = start if status[state] == _FINAL else None
+        position = start
+        for classes in automata.forward.class_blocks(data, start):
+            for symbol_class in classes:
+                state = table[state + symbol_class]
+                position += 1
+                if status[state]:
+                    if status[state] == _DEAD:
+                        return end
+                    end = position
+        return end
+
+    def first_end(self, data, pos, unanchored):
+        """Earliest position at or after pos where some match ends, or None"""
+        table = unanchored.table
+        final = unanchored.final
+        loops = unanchored.loops
+        state = unanchored.initial
+        if state in final:
+            return pos
+        position = pos
+        for classes in unanchored.class_blocks(data, pos):
+            i, size = 0, len(classes)
+            while i < size:
+                looping = loops.get(state)
+                if looping is not None:
+                    # Symbols that cannot end a match yet, skipped at C speed
+                    i = skip_run(classes, i, looping, size)
+                    if i == size:
+                        break
+                state = table[state + classes[i]]
+                i += 1
+                if state in final:
+                    return position + i
+            position += size
+        return None
+
+    def leftmost_start_before(self, data, pos, end):
+        """Leftmost start in pos..end of a match that ends at or before end"""
+        reverse = self.automata(data).reverse
+        table = reverse.table
+        final = reverse.final
+        state = reverse.initial
+        leftmost = end if state in final else None
+        while end > pos:
+            begin = max(pos, end - CLASSIFY_CHUNK)
+            position = end
+            for symbol_class in reversed(reverse.classify(data[begin:end])):
+                state = table[state + symbol_class]
+                position -= 1
+                if state in final:
+                    leftmost = position
+            end = begin
+        return leftmost
+
+    def earlier_match_end(self, data, pos, limit):
+        """End of some match starting in pos..limit - 1, or None
+
+        The anchored forward DFA is run from every such start at once,
+        as the set of states the runs are in, until the set dies.
+        """
+        automata = self.automata(data)
+        table = automata.forward.table
+        status = automata.status
+        initial = automata.forward.initial
+        # Classes on which a run that starts here dies at once
+        idle = bytes(c for c in range(automata.forward.class_count)
+                     if status[table[initial + c]] == _DEAD)
+        alive = set()
+        position = pos
+        for classes in automata.forward.class_blocks(data, pos):
+            i, size = 0, len(classes)
+            while i < size:
+                if not alive:
+                    if position + i >= limit:
+                        return None
+                    if idle:
+                        i = skip_run(classes, i, idle, min(size, limit - position))
+                        if i == size or position + i >= limit:
+                            continue
+                if position + i < limit:
+                    alive.add(initial)
+                symbol_class = classes[i]
+                alive = {target for target in (table[state + symbol_class] for state in alive)
+                         if status[target] != _DEAD}
+                i += 1
+                for state in alive:
+                    if status[state] == _FINAL:
+                        return position + i
+            position += size
+        return None
+
+    def leftmost_start(self, data, pos, unanchored):
+        """Start of the leftmost match at or after pos, or None"""
+        end = self.first_end(data, pos, unanchored)
+        if end is None:
+            return None
+        start = self.leftmost_start_before(data, pos, end)
+        while start > pos:
+            end = self.earlier_match_end(data, pos, start)
+            if end is None:
+                break
+            start = self.leftmost_start_before(data, pos, end)
+        return start
+
+    def finditer(self, data, pos=0):
+        """Yield (start, end) of every non-overlapping leftmost-longest match"""
+        prefilter = self._text_prefilter if isinstance(data, str) else self._byte_prefilter
+        if not prefilter.may_contain(data, pos):
+            return
+        view = None if isinstance(data, str) else memoryview(data).cast("B")
+        if self.automata(data) is None:
+            yield from self._pike_finditer(data, pos, view)
+            return
+        starts = self.match_starts(data, pos)
+        while True:
+            start = starts.find(1, pos)
+            if start < 0:
+                return
+            end = self.match_end(data, start)
+            pos = end if end > start else end + 1  # Step past an empty match
+            # In bytes, an empty match inside a multi-byte character is not a match
+            if end == start and view is not None and start < len(view) and 0x80 <= view[start] < 0xC0:
+                continue
+            yield start, end
+
+    def _pike_finditer(self, data, pos, view):
+        if view is not None and not isinstance(data, (bytes, bytearray)):
+            data = view.tobytes()
+        for match in self._pike_vm.finditer(data, pos):
+            start, end = match.span()
+            if end == start and view is not None and start < len(view) and 0x80 <= view[start] < 0xC0:
+                continue
+            yield start, end
+
+    def findall(self, data, pos=0):
+        """List of (start, end) for every match"""
+        return list(self.finditer(data, pos))
+
+    def search(self, data, pos=0):
+        """(start, end) of the leftmost-longest match, or None
+
+        Stops soon after the match instead of marking every start first.
+        """
+        automata = self.automata(data)
+        unanchored = None if automata is None else automata.unanchored
+        if unanchored is None:
+            return next(self.finditer(data, pos), None)
+        prefilter = self._text_prefilter if isinstance(data, str) else self._byte_prefilter
+        if not prefilter.may_contain(data, pos):
+            return None
+        if not isinstance(data, (str, bytes, bytearray)):
+            data = memoryview(data).cast("B")
+        view = None if isinstance(data, str) else memoryview(data).cast("B")
+        while pos <= len(data):
+            start = self.leftmost_start(data, pos, unanchored)
+            if start is None:
+                return None
+            end = self.match_end(data, start)
+            # In bytes, an empty match inside a multi-byte character is not a match
+            if end == start and view is not None and start < len(view) and 0x80 <= view[start] < 0xC0:
+                pos = end + 1
+                continue
+            return start, end
+        return None
+
+
+@functools.lru_cache(maxsize=128)
+def get_searcher(pattern):
+    """Shared RegexSearcher for a pattern with the default limits"""
+    return RegexSearcher(pattern)
+
+
+def search(pattern, data, pos=0):
+    """Leftmost-longest match of pattern in data as (start, end), or None"""
+    return get_searcher(pattern).search(data, pos)
+
+
+def findall(pattern, data, pos=0):
+    """Every non-overlapping leftmost-longest match of pattern in data"""
+    return get_searcher(pattern).findall(data, pos)
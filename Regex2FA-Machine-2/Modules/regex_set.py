@@ -0,0 +1,128 @@
+# regex_set.py - Match one input against many patterns in a single pass
+#
+# Every pattern is built into one shared ε-NFA: a new start state has an
+# ε-transition to the start of each pattern, and the accept state of each
+# pattern remembers the pattern's index. Subsets of that NFA are turned into
+# DFA states lazily, as with LazyDFA, and each DFA state carries a bitmask
+# of the patterns whose accept state it contains. One scan of the input then
+# answers for every pattern at once, and stops early when no pattern can
+# match any more.
+import functools
+
+from Modules.instrumentation import instrumentation
+from Modules.regex_compiler import (DEFAULT_LIMITS, LAZY_CACHE_STATES, EPSILON, CompileBudgetError,
+                                    LazyDFA, ThompsonBuilder, parse_regex, simplify_ast, ast_alphabet,
+                                    nfa_state_estimate, class_symbol_map)
+
+
+class SetLazyDFA(LazyDFA):
+    """LazyDFA over the combined NFA that also tracks the pattern bitmask of every subset"""
+
+    def __init__(self, nfa, owners, max_states=LAZY_CACHE_STATES):
+        self.owners = owners  # NFA accept state -> pattern index
+        super().__init__(nfa, max_states)
+
+    def _reset(self):
+        self._masks = []
+        super()._reset()
+
+    def _add(self, subset):
+        mask = 0
+        for state in subset & self.nfa.final:
+            mask |= 1 << self.owners[state]
+        self._masks.append(mask)
+        return super()._add(subset)
+
+    def match_mask(self, input_string):
+        """Bitmask of the patterns that match the whole input"""
+        if not isinstance(input_string, str):
+            input_string = bytes(input_string).decode("utf-8", "surrogateescape")
+        if self.symbol_map is not None:
+            input_string = self.symbol_map.translate(input_string)
+        symbols = self._symbols
+        with self._lock:
+            state = self._ids[self._start]
+            for char in input_string:
+                if char not in symbols:
+                    return 0
+                target = self._transitions[state].get(char)
+                state = self._step(state, char) if target is None else target
+                if self._dead[state]:
+                    return 0
+            return self._masks[state]
+
+
+class RegexSet:
+    """A list of patterns matched against each input together
+
+    matches() returns the indexes of every pattern that matches the whole
+    input. Raises RegexSyntaxError for a bad pattern (the message names
+    it) and CompileBudgetError when the combined NFA is over the limits;
+    max_dfa_states bounds the cache of DFA states instead of failing.
+    """
+
+    def __init__(self, patterns, limits=None):
+        self.patterns = list(patterns)
+        limits = limits or DEFAULT_LIMITS
+        asts = []
+        for index, pattern in enumerate(self.patterns):
+            try:
+                asts.append(simplify_ast(parse_regex(pattern)))
+            except ValueError as e:
+                raise type(e)(f"Pattern {index} ({pattern!r}): {e}") from e
+        # One set of atoms for every pattern, so they share the combined alphabet
+        symbol_map = class_symbol_map(asts)
+        if symbol_map is not None:
+            asts = [symbol_map.rewrite(ast) for ast in asts]
+
+        if limits.max_nfa_states is not None:
+            estimate = 1 + sum(nfa_state_estimate(ast) for ast in asts)
+            if estimate > limits.max_nfa_states:
+                raise CompileBudgetError("max_nfa_states", limits.max_nfa_states, estimate, "thompson")
+
+        with instrumentation.span("compile.regex_set"):
+            alphabet = set()
+            for ast in asts:
+                alphabet |= ast_alphabet(ast)
+            builder = ThompsonBuilder(alphabet)
+            nfa = builder.nfa
+            nfa.initial = nfa.add_state()
+            owners = {}
+            for index, ast in enumerate(asts):
+                start, accept = builder.fragment(ast)
+                nfa.add_transition(nfa.initial, EPSILON, start)
+                owners[accept] = index
+            nfa.final = set(owners)
+            nfa.symbol_map = symbol_map
+        instrumentation.count("nfa_states_created", nfa.state_count)
+
+        self.nfa = nfa
+        self.dfa = SetLazyDFA(nfa, owners, limits.max_dfa_states or LAZY_CACHE_STATES)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match_mask(self, input_string):
+        """Bitmask with bit i set if pattern i matches; str or UTF-8 bytes"""
+        instrumentation.count("match_calls")
+        return self.dfa.match_mask(input_string)
+
+    def matches(self, input_string):
+        """Sorted indexes of the patterns that match input_string"""
+        mask = self.match_mask(input_string)
+        indexes = []
+        while mask:
+            lowest = mask & -mask
+            indexes.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return indexes
+
+    def is_match(self, input_string):
+        """True if any pattern matches"""
+        return self.match_mask(input_string) != 0
+
+
+@functools.lru_cache(maxsize=32)
+def get_regex_set(patterns):
+    """Shared RegexSet for a tuple of patterns with the default limits"""
+    return RegexSet(patterns)
@@ -0,0 +1,315 @@
+# benchmark.py - Compile, match and render benchmarks with baseline comparison
+#
+# Usage:
+#   python benchmark.py [--quick] [--output results.json] [--baseline old.json]
+#
+# Every benchmark records the best wall time over a few repeats and the peak
+# Python memory of one extra traced run. With --baseline, benchmarks that got
+# slower than --threshold times the baseline are reported and the exit status is 1.
+# --verify N first checks the DFA-based matcher against Python's re on N random strings.
+# Random patterns in every construction are checked by tests/test_differential.py.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Modules.regex_compiler import (COURSE_PATTERN, parse_regex, build_nfa, subset_construction,
+                                    reduce_nfa, followpos_dfa, minimize_dfa, compile_regex)
+from Modules.nfa import test_string_belongs_to_regex
+from Modules.dfa import DFASimulator
+from Modules.dfa_binary import MappedDFA, dumps
+from Modules.dfa_codegen import compile_dfa
+from Modules.capabilities import check_capabilities
+
+DEFAULT_SIZES = [1, 100, 10_000, 1_000_000, 100_000_000]
+QUICK_SIZES = [1, 100, 10_000, 100_000]
+
+# Interpreters that build per-step output are too slow or too large beyond these sizes
+SIZE_LIMITS = {
+    "simulate_dfa": 1_000_000,
+    "test_string_belongs_to_regex": 10_000_000,
+}
+
+
+def measure(func):
+    """Return (best seconds, peak traced bytes) of func()"""
+    # Calibrate: loop fast cases for timer resolution, run slow ones only a few times
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    number = max(1, min(1000, int(0.02 / first))) if first > 0 else 1000
+    repeat = 5 if first < 0.1 else 3 if first < 1.0 else 1
+
+    best = first
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def record(results, name, func, **extra):
+    seconds, peak = measure(func)
+    results[name] = dict(seconds=seconds, peak_bytes=peak, **extra)
+    print(f"  {name:<55} {seconds * 1e3:>12.4f} ms  {peak / 1024:>10.1f} KiB")
+    return results[name]
+
+
+# ================================================
+# COMPILE BENCHMARKS
+# ================================================
+
+def compile_patterns(quick):
+    """Families of patterns of growing size"""
+    rng = random.Random(42)
+    patterns = {"course": COURSE_PATTERN}
+    for n in ([1, 4, 16] if quick else [1, 4, 16, 64, 256]):
+        words = ["".join(rng.choice("abc") for _ in range(5)) for _ in range(n)]
+        patterns[f"union_{n}"] = " + ".join(words)
+    # (a+b)*a(a+b){k}: the DFA needs 2^(k+1) states
+    for k in ([2, 4, 6] if quick else [2, 4, 6, 8, 10]):
+        patterns[f"blowup_{k}"] = f"(a+b)*a(a+b){{{k}}}"
+    return patterns
+
+
+def bench_compile(results, quick):
+    print("Compile (regex -> NFA -> DFA -> minimized DFA)")
+    for name, pattern in compile_patterns(quick).items():
+        ast = parse_regex(pattern)
+        nfa = build_nfa(ast)
+        dfa = subset_construction(nfa)
+        min_dfa = minimize_dfa(dfa)
+        record(results, f"compile/{name}/parse", lambda: parse_regex(pattern))
+        record(results, f"compile/{name}/thompson", lambda: build_nfa(ast))
+        record(results, f"compile/{name}/subset", lambda: subset_construction(nfa))
+        record(results, f"compile/{name}/reduce", lambda: reduce_nfa(nfa))
+        record(results, f"compile/{name}/followpos", lambda: followpos_dfa(ast))
+        record(results, f"compile/{name}/minimize", lambda: minimize_dfa(dfa))
+        record(results, f"compile/{name}/total", lambda: compile_regex(pattern),
+               nfa_states=nfa.state_count, dfa_states=dfa.state_count,
+               min_dfa_states=min_dfa.state_count)
+        simplified = compile_regex(pattern, simplify=True)
+        record(results, f"compile/{name}/total_simplified",
+               lambda: compile_regex(pattern, simplify=True),
+               nfa_states=simplified.nfa.state_count, min_dfa_states=simplified.min_dfa.state_count)
+        record(results, f"compile/{name}/total_reduced",
+               lambda: compile_regex(pattern, construction="reduced"))
+        record(results, f"compile/{name}/total_followpos",
+               lambda: compile_regex(pattern, construction="followpos"))
+
+
+# ================================================
+# MATCH BENCHMARKS
+# ================================================
+
+def bench_match(results, sizes):
+    print("Match throughput (input 'c' + 'a' * (n - 1), accepted by the course pattern)")
+    simulator = DFASimulator()
+    compiled = compile_regex(COURSE_PATTERN)
+    mapped = MappedDFA(dumps(compiled.min_dfa, COURSE_PATTERN))
+    generated = compile_dfa(compiled.min_dfa)
+
+    for size in sizes:
+        text = "c" + "a" * (size - 1)
+        data = text.encode("ascii")
+        matchers = {
+            "simulate_dfa": lambda: simulator.simulate_dfa("c_kleene_star", text),
+            "test_string_belongs_to_regex": lambda: test_string_belongs_to_regex(text),
+            "compiled": lambda: compiled.matches(text),
+            "compiled_bytes": lambda: compiled.matches(data),
+            "mapped_str": lambda: mapped.matches(text),
+            "mapped_bytes": lambda: mapped.matches(data),
+            "generated": lambda: generated(text),
+        }
+        for method, func in matchers.items():
+            name = f"match/{method}/{size}"
+            if size > SIZE_LIMITS.get(method, size):
+                results[name] = {"skipped": f"larger than {SIZE_LIMITS[method]} bytes"}
+                continue
+            entry = record(results, name, func, bytes=size)
+            entry["mb_per_s"] = size / entry["seconds"] / 1e6 if entry["seconds"] else None
+        del text, data
+
+
+# ================================================
+# RENDER BENCHMARKS
+# ================================================
+
+def bench_render(results):
+    print("Render latency (AutomataImageGenerator)")
+    caps = check_capabilities()
+    if not caps["table_images"]:
+        results["render"] = {"skipped": "Pillow not installed"}
+        print("  skipped: Pillow not installed")
+        return
+
+    from Modules.image_generator import AutomataImageGenerator
+    simulator = DFASimulator()
+    with tempfile.TemporaryDirectory() as output_dir:
+        generator = AutomataImageGenerator(output_dir)
+        methods = {
+            "generate_nfa_table_image": lambda p, d: generator.generate_nfa_table_image(p),
+            "generate_dfa_table_image": lambda p, d: generator.generate_dfa_table_image(p, d),
+            "generate_min_dfa_table_image": lambda p, d: generator.generate_min_dfa_table_image(p),
+            "generate_nfa_diagram": lambda p, d: generator.generate_nfa_diagram(p, p),
+            "generate_dfa_diagram": lambda p, d: generator.generate_dfa_diagram(p, d),
+            "generate_minimized_dfa_diagram": lambda p, d: generator.generate_minimized_dfa_diagram(p),
+            "generate_all_images": lambda p, d: generator.generate_all_images(p, d, caps["diagrams"]),
+        }
+        for method, func in methods.items():
+            if "diagram" in method and not caps["diagrams"]:
+                results[f"render/{method}"] = {"skipped": "Graphviz not installed"}
+                continue
+            for pattern, dfa_data in simulator.dfa_tables.items():
+                # The generators print every saved file; keep the report readable
+                def run(func=func, pattern=pattern, dfa_data=dfa_data):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        func(pattern, dfa_data)
+                record(results, f"render/{method}/{pattern}", run)
+
+
+# ================================================
+# DIFFERENTIAL CHECK
+# ================================================
+
+# The course language and its labels as written with Python's re
+REFERENCE_PATTERN = re.compile(r"aba|bb|c(a{1,3})*")
+REFERENCE_LABELS = {"aba": "aba", "bb": "bb", "c": "c_only", "ca": "ca", "caa": "caa", "caaa": "caaa"}
+
+
+def reference_label(text):
+    if not REFERENCE_PATTERN.fullmatch(text):
+        return None
+    return REFERENCE_LABELS.get(text, "c_kleene_star")
+
+
+def verify(samples, seed=0):
+    """Compare test_string_belongs_to_regex with re on random strings; return the mismatch count"""
+    print(f"Differential check against re ({samples} random strings)")
+    rng = random.Random(seed)
+    # Mostly near-misses of the language, plus fully random strings
+    edge_cases = ["", "aba", "bb", "c", "ca", "caa", "caaa", "caaaa", "ab", "abab", "cb", "aba\n"]
+    mismatches = 0
+    for i in range(samples):
+        if i < len(edge_cases):
+            text = edge_cases[i]
+        elif rng.random() < 0.5:
+            # Kept short: re backtracks exponentially on a long run of a's that then fails
+            text = "c" + "a" * rng.randint(0, 16) + rng.choice(["", "", "", "a", "b", "c"])
+        else:
+            text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 12)))
+        expected = reference_label(text)
+        actual = test_string_belongs_to_regex(text)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"  MISMATCH {text!r}: expected {expected}, got {actual}")
+    print(f"  {mismatches} mismatches")
+    return mismatches
+
+
+# ================================================
+# BASELINE COMPARISON
+# ================================================
+
+def compare(results, baseline, threshold):
+    """Print benchmarks slower than threshold x baseline; return how many regressed"""
+    regressions = 0
+    print(f"\nComparison against baseline (regression if > {threshold:.2f}x)")
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if not old or "seconds" not in old or "seconds" not in entry or not old["seconds"]:
+            continue
+        ratio = entry["seconds"] / old["seconds"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"  REGRESSION {name:<50} {ratio:6.2f}x slower")
+        elif ratio < 1 / threshold:
+            print(f"  improved   {name:<50} {1 / ratio:6.2f}x faster")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def max_rss_kib():
+    """Peak resident memory of the whole run, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS reports bytes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark compile, match and render throughput")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression (default 1.25)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    parser.add_argument("--sizes", help="comma separated match input sizes in bytes")
+    parser.add_argument("--only", choices=["compile", "match", "render"], action="append",
+                        help="run only these groups (repeatable)")
+    parser.add_argument("--verify", type=int, metavar="N", default=0,
+                        help="first compare the string matcher with Python's re on N random strings")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    groups = args.only or ["compile", "match", "render"]
+    sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else (
+        QUICK_SIZES if args.quick else DEFAULT_SIZES)
+
+    if args.verify and verify(args.verify):
+        return 1
+
+    results = {}
+    if "compile" in groups:
+        bench_compile(results, args.quick)
+    if "match" in groups:
+        bench_match(results, sizes)
+    if "render" in groups:
+        bench_render(results)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "max_rss_kib": max_rss_kib(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,75 @@
 # main.py
-import subprocess
+import argparse
+import atexit
 import sys
 
-def check_requirements():
-    """Check if required packages are installed"""
-    required_packages = ['graphviz', 'PIL']
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            if package == 'PIL':
-                import PIL
-            else:
-                __import__(package)
-        except ImportError:
-            missing_packages.append(package)
-    
-    return missing_packages
+from Modules.capabilities import check_capabilities, missing_features
+from Modules.instrumentation import instrumentation
 
-def install_packages(packages):
-    """Install missing packages"""
-    print("Installing missing packages...")
-    for package in packages:
-        if package == 'PIL':
-            package_name = 'Pillow'
-        else:
-            package_name = package
-        
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-            print(f"✓ Successfully installed {package_name}")
-        except subprocess.CalledProcessError:
-            print(f"✗ Failed to install {package_name}")
-            return False
-    return True
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description="Regex to Automata Converter")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the headless HTTP/JSON matching service instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="service address (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="service port (default 8080)")
+    parser.add_argument("--workers", type=int, default=8, help="service worker threads (default 8)")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="never wait for keyboard input (implied when stdin is not a terminal)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record stage timings and counters, written to FILE on exit "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    interactive = not args.non_interactive and sys.stdin.isatty()
+
+    if args.metrics:
+        instrumentation.enable()
+        atexit.register(instrumentation.write, args.metrics)
+
+    # The service needs neither Tk nor the rendering packages to match strings
+    if args.serve:
+        from Modules.http_service import run_server
+        run_server(args.host, args.port, args.workers)
+        return
+
     print("=" * 60)
     print("Regex to Automata Converter with Image Generation")
     print("=" * 60)
     print()
-    
-    # Check for Graphviz installation (system level)
-    try:
-        subprocess.run(['dot', '-V'], capture_output=True, check=True)
-        print("✓ Graphviz is installed on system")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("⚠️  Graphviz not found. Please install Graphviz:")
-        print("   Windows: Download from https://graphviz.org/download/")
-        print("   macOS: brew install graphviz")
-        print("   Linux: sudo apt-get install graphviz")
+
+    # Check optional dependencies once; missing ones only disable features
+    capabilities = check_capabilities()
+    notes = missing_features(capabilities)
+    if notes:
+        for note in notes:
+            print(f"⚠️  {note}")
         print()
-        print("After installing Graphviz, restart the application.")
-        input("Press Enter to continue anyway...")
-    
-    # Check Python packages
-    missing = check_requirements()
-    
-    if missing:
-        print(f"Missing packages: {', '.join(missing)}")
-        choice = input("Do you want to install them? (y/n): ")
-        if choice.lower() == 'y':
-            if not install_packages(missing):
-                print("Failed to install required packages.")
-                return
-        else:
-            print("Cannot run without required packages.")
-            return
-    
+        print("Text tables and string matching remain fully functional.")
+        if interactive and capabilities["tkinter"]:
+            input("Press Enter to continue...")
+    else:
+        print("✓ Graphviz and Pillow are available")
+
+    if not capabilities["tkinter"]:
+        print("Cannot start the GUI without tkinter.")
+        sys.exit(1)
+
     print()
     print("Starting GUI application...")
     print()
-    
+
     # Import and run GUI
     try:
         from Modules.gui import run_gui
         run_gui()
     except Exception as e:
         print(f"Error starting application: {e}")
-        input("Press Enter to exit...")
+        if interactive:
+            input("Press Enter to exit...")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,238 @@
+# regex2fa_grep.py - grep-like command line tool built on the compiled DFA
+#
+# Usage:
+#   python regex2fa_grep.py [-c] [-v] [-o] [-j N] [--stats] PATTERN [FILE ...]
+#
+# The pattern uses the course notation ('+' is union), e.g. "aba + bb + c(a)*",
+# and must match a whole line; spaces in it are layout, a literal one is '\ ' or '[ ]'.
+# With -o it is searched for anywhere in a line and every match is printed on
+# its own line. With no FILE, or FILE '-', standard input is read. Lines
+# without any literal the pattern requires (see Modules/prefilter.py) are
+# rejected before the DFA runs.
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Modules.regex_compiler import compile_regex, RegexSyntaxError, CompileBudgetError
+from Modules.regex_search import RegexSearcher
+from Modules.prefilter import Prefilter
+
+CHUNK_SIZE = 1 << 20  # 1 MiB reads
+ENCODING = "utf-8"
+ERRORS = "surrogateescape"  # For file name prefixes; lines themselves are never decoded
+
+
+def iter_line_batches(stream, chunk_size=CHUNK_SIZE):
+    """Yield (lines, byte_count) for a binary stream, reading chunk_size bytes at a time
+
+    Lines are bytes: the compiled pattern matches UTF-8 input directly.
+    Chunks are cut at the last newline, so a line is never split between
+    two batches.
+    """
+    remainder = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        data = remainder + chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            remainder = data
+            continue
+        remainder = data[cut + 1:]
+        yield data[:cut].split(b"\n"), cut + 1
+    if remainder:
+        yield [remainder], len(remainder)
+
+
+def line_matcher(compiled):
+    """Whole-line match function for bytes lines, with the pattern's prefilter in front"""
+    prefilter = Prefilter(compiled.ast, binary=True)
+    if prefilter.exact is not None:
+        return prefilter.exact.__contains__  # Finite language: a set lookup decides
+    if not prefilter.active:
+        return compiled.matches
+    may_match = prefilter.may_match
+    matches = compiled.matches
+    return lambda line: may_match(line) and matches(line)
+
+
+def grep_stream(stream, compiled, out, invert=False, count_only=False, prefix=""):
+    """Write selected lines of stream to out; return (selected_count, bytes_read)"""
+    matches = line_matcher(compiled)
+    prefix = prefix.encode(ENCODING, ERRORS)
+    selected_count = 0
+    bytes_read = 0
+
+    for lines, size in iter_line_batches(stream):
+        bytes_read += size
+        if invert:
+            selected = [line for line in lines if not matches(line)]
+        else:
+            selected = [line for line in lines if matches(line)]
+        selected_count += len(selected)
+        if selected and not count_only:
+            if prefix:
+                selected = [prefix + line for line in selected]
+            out.write(b"\n".join(selected) + b"\n")
+
+    if count_only:
+        out.write(prefix + f"{selected_count}\n".encode(ENCODING))
+    return selected_count, bytes_read
+
+
+def search_stream(stream, searcher, out, count_only=False, prefix=""):
+    """Write every non-empty match in stream on its own line; return (matching_lines, bytes_read)"""
+    findall = searcher.findall
+    prefix = prefix.encode(ENCODING, ERRORS)
+    matching_lines = 0
+    bytes_read = 0
+
+    for lines, size in iter_line_batches(stream):
+        bytes_read += size
+        parts = []
+        for line in lines:
+            found = [line[start:end] for start, end in findall(line) if end > start]
+            if found:
+                matching_lines += 1
+                parts.extend(found)
+        if parts and not count_only:
+            out.write(b"\n".join(prefix + part for part in parts) + b"\n")
+
+    if count_only:
+        out.write(prefix + f"{matching_lines}\n".encode(ENCODING))
+    return matching_lines, bytes_read
+
+
+def load_matcher(pattern, only_matching=False):
+    """CompiledRegex for whole-line matching, RegexSearcher for -o"""
+    if only_matching:
+        searcher = RegexSearcher(pattern)
+        searcher.automata(b"")  # Build now so budget errors surface before any output
+        return searcher
+    return compile_regex(pattern, fallback=True, construction="followpos", simplify=True)
+
+
+def scan_stream(stream, matcher, out, invert=False, count_only=False, prefix=""):
+    if isinstance(matcher, RegexSearcher):
+        return search_stream(stream, matcher, out, count_only, prefix)
+    return grep_stream(stream, matcher, out, invert, count_only, prefix)
+
+
+# Each worker process compiles the pattern once
+_worker_matcher = None
+
+
+def _init_worker(pattern, only_matching):
+    global _worker_matcher
+    _worker_matcher = load_matcher(pattern, only_matching)
+
+
+def _grep_file_worker(path, invert, count_only, prefix):
+    """Grep one file in a worker; output is buffered and printed in file order by the parent"""
+    out = io.BytesIO()
+    try:
+        with open(path, "rb") as f:
+            count, size = scan_stream(f, _worker_matcher, out, invert, count_only, prefix)
+        return count, size, out.getvalue(), None
+    except OSError as e:
+        return 0, 0, b"", str(e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="regex2fa-grep",
+        description="Print lines that match a regular expression, using the compiled minimized DFA")
+    parser.add_argument("pattern", help="regular expression in course notation, matched against whole lines")
+    parser.add_argument("files", nargs="*", default=["-"], help="input files ('-' for stdin)")
+    parser.add_argument("-c", "--count", action="store_true", help="print only a count of selected lines")
+    parser.add_argument("-v", "--invert-match", action="store_true", help="select non-matching lines")
+    parser.add_argument("-o", "--only-matching", action="store_true",
+                        help="search anywhere in each line and print only the matched parts")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="files processed in parallel (default: CPU count)")
+    parser.add_argument("--stats", action="store_true", help="report bytes read and throughput on stderr")
+    args = parser.parse_args(argv)
+    if args.only_matching and args.invert_match:
+        parser.error("-o cannot be combined with -v")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        matcher = load_matcher(args.pattern, args.only_matching)
+    except RegexSyntaxError as e:
+        print(f"regex2fa-grep: invalid pattern: {e}", file=sys.stderr)
+        return 2
+    except CompileBudgetError as e:
+        print(f"regex2fa-grep: pattern too complex: {e}", file=sys.stderr)
+        return 2
+
+    out = sys.stdout.buffer
+    show_names = len(args.files) > 1
+    total_selected = 0
+    total_bytes = 0
+    had_error = False
+    start = time.perf_counter()
+
+    def prefix_for(path):
+        return f"{'(standard input)' if path == '-' else path}:" if show_names else ""
+
+    disk_files = [path for path in args.files if path != "-"]
+    if args.jobs > 1 and len(disk_files) > 1:
+        # Parallel: matching is CPU bound, so use processes rather than threads
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(disk_files)),
+                                 initializer=_init_worker,
+                                 initargs=(args.pattern, args.only_matching)) as pool:
+            futures = {path: pool.submit(_grep_file_worker, path, args.invert_match,
+                                         args.count, prefix_for(path))
+                       for path in disk_files}
+            for path in args.files:
+                if path == "-":
+                    count, size = scan_stream(sys.stdin.buffer, matcher, out,
+                                              args.invert_match, args.count, prefix_for(path))
+                else:
+                    count, size, data, error = futures[path].result()
+                    if error:
+                        print(f"regex2fa-grep: {error}", file=sys.stderr)
+                        had_error = True
+                        continue
+                    out.write(data)
+                total_selected += count
+                total_bytes += size
+    else:
+        for path in args.files:
+            try:
+                if path == "-":
+                    count, size = scan_stream(sys.stdin.buffer, matcher, out,
+                                              args.invert_match, args.count, prefix_for(path))
+                else:
+                    with open(path, "rb") as f:
+                        count, size = scan_stream(f, matcher, out, args.invert_match,
+                                                  args.count, prefix_for(path))
+            except OSError as e:
+                print(f"regex2fa-grep: {e}", file=sys.stderr)
+                had_error = True
+                continue
+            total_selected += count
+            total_bytes += size
+
+    out.flush()
+    if args.stats:
+        elapsed = time.perf_counter() - start
+        rate = total_bytes / elapsed / 1e6 if elapsed > 0 else 0.0
+        print(f"regex2fa-grep: {total_bytes} bytes in {elapsed:.3f}s ({rate:.2f} MB/s), "
+              f"{total_selected} lines selected", file=sys.stderr)
+
+    # Same exit status convention as grep
+    if had_error:
+        return 2
+    return 0 if total_selected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import random
+import re
+import unittest
+
+from Modules.regex_compiler import (COUNTER_MIN_REPEAT, CompileLimits, CountingMatcher, compile_regex,
+                                    parse_regex)
+from tests.test_differential import to_re
+
+SEED = 20251124
+# Repetitions on both sides of COUNTER_MIN_REPEAT (16): only the larger ones get counters
+PATTERNS = [
+    "a{15,17}", "a{16}", "a{17}", "a{16,}", "a{17,}", "(ab){15,17}", "[ab]{17}", "(a + b)*a(a + b){16}",
+    "(a + b)*a(a + b){17}", "c(a){1,20}b", "(a{2} + b){17}", "[^b]{3,18}", "(a){0,17}",
+]
+
+
+class CountingMatcherTest(unittest.TestCase):
+    def test_agrees_with_re(self):
+        rng = random.Random(SEED)
+        for pattern in PATTERNS:
+            reference = re.compile(to_re(pattern))
+            matcher = CountingMatcher(parse_regex(pattern))
+            small_cache = CountingMatcher(parse_regex(pattern), max_states=4)  # Flushed all the time
+            compiled = compile_regex(pattern, CompileLimits(max_dfa_states=50), fallback=True)
+            strings = ["a" * n for n in range(0, 40)] + ["ab" * n for n in range(0, 20)]
+            strings += ["".join(rng.choice("abc") for _ in range(rng.randint(0, 40))) for _ in range(200)]
+            strings += ["".join(rng.choice("ab") for _ in range(rng.randint(14, 40))) for _ in range(200)]
+            for text in strings:
+                expected = reference.fullmatch(text) is not None
+                self.assertEqual(matcher.accepts(text), expected, (pattern, text))
+                self.assertEqual(small_cache.accepts(text), expected, (pattern, text))
+                self.assertEqual(compiled.matches(text), expected, (pattern, text))
+                self.assertEqual(compiled.matches(text.encode()), expected, (pattern, text))
+
+    def test_threshold(self):
+        # Over the DFA budget, only repetitions larger than COUNTER_MIN_REPEAT get a counting matcher
+        limits = CompileLimits(max_dfa_states=50)
+        unrolled = compile_regex(f"(a + b)*a(a + b){{{COUNTER_MIN_REPEAT}}}", limits, fallback=True)
+        counted = compile_regex(f"(a + b)*a(a + b){{{COUNTER_MIN_REPEAT + 1}}}", limits, fallback=True)
+        self.assertNotIsInstance(unrolled.lazy, CountingMatcher)
+        self.assertIsInstance(counted.lazy, CountingMatcher)
+        self.assertTrue(counted.matches("b" + "a" * (COUNTER_MIN_REPEAT + 2)))
+        self.assertFalse(counted.matches("a" + "b" * COUNTER_MIN_REPEAT))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from Modules.dfa_binary import MappedDFA, dumps, load_dfa, save_dfa
+from Modules.regex_compiler import compile_regex
+
+
+class DFABinaryTest(unittest.TestCase):
+    def assert_round_trip(self, pattern, strings):
+        compiled = compile_regex(pattern)
+        with MappedDFA(dumps(compiled.min_dfa, pattern)) as mapped:
+            self.assertEqual(mapped.pattern, pattern)
+            for text in strings:
+                self.assertEqual(mapped.matches(text), compiled.matches(text), (pattern, text))
+
+    def test_literal_pattern(self):
+        self.assert_round_trip("aba + bb + c(a)*", ["", "aba", "bb", "caaa", "cab", "é"])
+
+    def test_dot_and_negated_class(self):
+        strings = ["", "a", "ab", "xyz", "é", "中", "a中b", "\U0001F600", "\n", "c", "[", "ab中"]
+        self.assert_round_trip(".(.)*", strings)
+        self.assert_round_trip("[^c](a)*", strings)
+        self.assert_round_trip("a[^a-c中]b", ["axb", "a中b", "aéb", "abb", "a\U0001F600b"])
+
+    def test_wide_atoms_from_file(self):
+        pattern = "[α-ω]+ + [一-龥]"
+        compiled = compile_regex(pattern)
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_dfa(compiled.min_dfa, os.path.join(directory, "dfa.bin"), pattern)
+            with load_dfa(path) as mapped:
+                self.assertEqual(mapped.symbol_map.atoms(), compiled.min_dfa.symbol_map.atoms())
+                for text in ["β", "ω", "一", "中", "龥", "a", "ж", "中中"]:
+                    self.assertEqual(mapped.matches(text), compiled.matches(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
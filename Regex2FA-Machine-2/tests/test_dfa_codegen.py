@@ -0,0 +1,55 @@
+import os
+import random
+import tempfile
+import unittest
+
+from Modules import dfa_codegen
+from Modules.regex_compiler import compile_regex
+from tests.test_differential import CHARS, random_pattern
+
+SEED = 20251120
+
+
+class DFACodegenTest(unittest.TestCase):
+    def assert_same(self, dfa, function, text, pattern):
+        self.assertEqual(function(text), dfa.accepts(text), (pattern, text))
+
+    def test_agrees_with_accepts(self):
+        rng = random.Random(SEED)
+        for _ in range(200):
+            pattern = random_pattern(rng, 3)
+            dfa = compile_regex(pattern).min_dfa
+            function = dfa_codegen.compile_dfa(dfa, use_disk=False)
+            for _ in range(20):
+                text = "".join(rng.choice(CHARS) for _ in range(rng.randint(0, 6)))
+                self.assert_same(dfa, function, text, pattern)
+            # Long runs take the self-loop skipping path
+            for symbol in "abc":
+                self.assert_same(dfa, function, symbol * 40, pattern)
+                self.assert_same(dfa, function, "c" + symbol * 40 + "b", pattern)
+
+    def test_course_pattern_runs(self):
+        pattern = "aba + bb + c(aaa + aa + a)*"
+        dfa = compile_regex(pattern).min_dfa
+        function = dfa_codegen.compile_dfa(dfa, use_disk=False)
+        for text in ["c" + "a" * n for n in range(0, 30)] + ["c" + "a" * 20 + "b", "aba", "abab", ""]:
+            self.assert_same(dfa, function, text, pattern)
+
+    def test_disk_cache(self):
+        dfa = compile_regex("[a-c](b)*").min_dfa
+        digest = dfa_codegen.dfa_hash(dfa)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = dfa_codegen._cache_path(cache_dir, digest)
+            dfa_codegen._loaded.pop(digest, None)
+            function = dfa_codegen.compile_dfa(dfa, cache_dir=cache_dir)
+            self.assertTrue(function("abbb"))
+            self.assertIsNotNone(dfa_codegen._read_cached(path, digest))
+            # Header of another DFA, and a file others can write to, are both ignored
+            self.assertIsNone(dfa_codegen._read_cached(path, "0" * 64))
+            if hasattr(os, "getuid"):
+                os.chmod(path, 0o666)
+                self.assertIsNone(dfa_codegen._read_cached(path, digest))
+
+
+if __name__ == "__main__":
+    unittest.main()
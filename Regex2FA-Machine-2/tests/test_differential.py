@@ -0,0 +1,86 @@
+"""Random patterns and strings checked against Python's re in every construction"""
+import random
+import re
+import unittest
+
+from Modules import nfa  # Not imported by name: pytest would collect test_string_belongs_to_regex
+from Modules.regex_compiler import CONSTRUCTIONS, compile_regex
+
+SEED = 20251117
+PATTERNS = 300
+STRINGS = 30
+CHARS = "abcé中\n"
+ATOMS = ["a", "b", "c", "ε", "[a-c]", "[^a]", ".", "[b-é]", "[ab中]"]
+BOUNDS = ["?", "*", "{0}", "{2}", "{0,2}", "{1,3}", "{1,}", "{2,}"]
+COURSE_RE = re.compile(r"aba|bb|c(a{1,3})*")
+
+
+def random_pattern(rng, depth):
+    """Course notation for a random regex; every sub-expression is parenthesized so it reads the same in re"""
+    roll = rng.random()
+    if depth == 0 or roll < 0.3:
+        return rng.choice(ATOMS)
+    if roll < 0.5:
+        return random_pattern(rng, depth - 1) + random_pattern(rng, depth - 1)
+    if roll < 0.7:
+        return f"({random_pattern(rng, depth - 1)} + {random_pattern(rng, depth - 1)})"
+    return f"({random_pattern(rng, depth - 1)}){rng.choice(BOUNDS)}"
+
+
+def to_re(pattern):
+    """The same regex in Python's syntax: '+' outside classes is '|', ε is empty"""
+    out = []
+    in_class = False
+    for ch in pattern:
+        if in_class:
+            in_class = ch != "]"
+            out.append(ch)
+        elif ch == "[":
+            in_class = True
+            out.append(ch)
+        elif ch == "+":
+            out.append("|")
+        elif ch == "ε":
+            out.append("(?:)")
+        elif not ch.isspace():
+            out.append(ch)
+    return "".join(out)
+
+
+class DifferentialTest(unittest.TestCase):
+    def test_constructions_agree_with_re(self):
+        rng = random.Random(SEED)
+        for _ in range(PATTERNS):
+            pattern = random_pattern(rng, 3)
+            reference = re.compile(to_re(pattern))
+            compiled = [(construction, simplify, compile_regex(pattern, construction=construction,
+                                                              simplify=simplify))
+                        for construction in CONSTRUCTIONS for simplify in (False, True)]
+            for _ in range(STRINGS):
+                text = "".join(rng.choice(CHARS) for _ in range(rng.randint(0, 6)))
+                expected = reference.fullmatch(text) is not None
+                for construction, simplify, regex in compiled:
+                    for data in (text, text.encode("utf-8")):
+                        if regex.matches(data) != expected:
+                            self.fail(f"{pattern!r} ({construction}, simplify={simplify}) "
+                                      f"on {data!r}: expected {expected}")
+
+
+    def test_course_labels_agree_with_re(self):
+        rng = random.Random(SEED)
+        for _ in range(2000):
+            text = "".join(rng.choice("abc" if rng.random() < 0.95 else "abcx")
+                           for _ in range(rng.randint(0, 8)))
+            if rng.random() < 0.3:
+                text = "c" + "a" * rng.randint(0, 8)  # Mostly accepted; random strings rarely are
+            if COURSE_RE.fullmatch(text) is None:
+                expected = None
+            elif text.startswith("c"):
+                expected = "c_only" if text == "c" else text if len(text) <= 4 else "c_kleene_star"
+            else:
+                expected = text
+            self.assertEqual(nfa.test_string_belongs_to_regex(text), expected, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
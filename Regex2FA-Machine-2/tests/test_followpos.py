@@ -0,0 +1,45 @@
+import random
+import unittest
+
+from Modules.regex_compiler import (compile_regex, followpos_dfa, minimize_dfa, parse_regex, simplify_ast,
+                                    subset_construction)
+from tests.test_differential import random_pattern
+
+SEED = 20251122
+
+
+def dfa_key(dfa):
+    """Everything that identifies a DFA; minimize_dfa numbers states canonically"""
+    return dfa.alphabet, dfa.initial, sorted(dfa.final), dfa.transitions
+
+
+class FollowposTest(unittest.TestCase):
+    def test_same_minimal_dfa_as_thompson(self):
+        rng = random.Random(SEED)
+        for _ in range(300):
+            pattern = random_pattern(rng, 3)
+            simplify = rng.random() < 0.5
+            thompson = compile_regex(pattern, simplify=simplify)
+            followpos = compile_regex(pattern, construction="followpos", simplify=simplify)
+            self.assertEqual(dfa_key(followpos.min_dfa), dfa_key(thompson.min_dfa), pattern)
+
+    def test_dfa_is_complete(self):
+        rng = random.Random(SEED)
+        for _ in range(100):
+            pattern = random_pattern(rng, 3)
+            dfa = followpos_dfa(simplify_ast(parse_regex(pattern)))
+            for trans in dfa.transitions:
+                self.assertEqual(sorted(trans), dfa.alphabet, pattern)
+
+    def test_unanchored(self):
+        rng = random.Random(SEED)
+        for _ in range(100):
+            pattern = random_pattern(rng, 3)
+            nfa = compile_regex(pattern).nfa
+            expected = minimize_dfa(subset_construction(nfa, unanchored=True))
+            dfa = minimize_dfa(followpos_dfa(parse_regex(pattern), unanchored=True))
+            self.assertEqual(dfa_key(dfa), dfa_key(expected), pattern)
+
+
+if __name__ == "__main__":
+    unittest.main()
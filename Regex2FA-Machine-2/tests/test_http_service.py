@@ -0,0 +1,90 @@
+import http.client
+import json
+import socket
+import unittest
+from urllib.parse import urlencode
+
+from Modules.http_service import start_server
+
+
+class HTTPServiceTest(unittest.TestCase):
+    def setUp(self):
+        # One worker: a connection that held it would block every other test request
+        self.server = start_server(port=0, workers=1)
+        self.addCleanup(self.stop_server)
+
+    def stop_server(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def connect(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+        self.addCleanup(connection.close)
+        return connection
+
+    def post(self, path, body, connection=None):
+        connection = connection or self.connect()
+        connection.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_match(self):
+        status, body = self.post("/match", {"pattern": "aba + bb + c(a)*", "string": "caaa"})
+        self.assertEqual(status, 200)
+        self.assertTrue(body["matched"])
+        self.assertFalse(self.post("/match", {"pattern": "aba + bb + c(a)*", "string": "cab"})[1]["matched"])
+
+    def test_search(self):
+        status, body = self.post("/search", {"pattern": "bb + c(a)*", "string": "xcaa bb c"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["matches"], [[1, 4], [5, 7], [8, 9]])
+
+    def test_captures(self):
+        status, body = self.post("/captures", {"pattern": "c(aa + a)*", "string": "caaa"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["span"], [0, 4])
+        self.assertEqual(body["groups"], [[3, 4]])
+        body = self.post("/captures", {"pattern": "c(a)*", "string": "xxca", "search": True})[1]
+        self.assertEqual((body["span"], body["groups"]), ([2, 4], [[3, 4]]))
+
+    def test_match_set(self):
+        status, body = self.post("/match_set", {"patterns": ["aba", "c(a)*", "[a-c]([a-c])*"], "string": "caa"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["matched"], [1, 2])
+
+    def test_keep_alive(self):
+        connection = self.connect()
+        first = self.post("/match", {"pattern": "bb", "string": "bb"}, connection)
+        second = self.post("/match", {"pattern": "bb", "string": "b"}, connection)
+        self.assertEqual((first[1]["matched"], second[1]["matched"]), (True, False))
+
+    def test_idle_connection_does_not_take_a_worker(self):
+        idle = socket.create_connection(("127.0.0.1", self.server.server_port), timeout=5)
+        self.addCleanup(idle.close)
+        kept_alive = self.connect()
+        self.post("/match", {"pattern": "bb", "string": "bb"}, kept_alive)
+        # Both connections are open and silent; the only worker must still be free
+        status, body = self.post("/match", {"pattern": "aba", "string": "aba"})
+        self.assertEqual((status, body["matched"]), (200, True))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post("/match", {"pattern": "(a", "string": ""})[0], 400)
+        self.assertEqual(self.post("/match", {"pattern": "a", "string": 3})[0], 400)
+        self.assertEqual(self.post("/match_set", {"patterns": "a", "string": ""})[0], 400)
+        self.assertEqual(self.post("/nope", {})[0], 404)
+        connection = self.connect()
+        connection.request("POST", "/match", "not json")
+        self.assertEqual(connection.getresponse().status, 400)
+
+    def test_over_budget_pattern(self):
+        # Matching falls back to a lazy DFA, but the full DFA table is refused
+        query = urlencode({"pattern": "(a + b)*a(a + b){20}", "kind": "dfa"})
+        connection = self.connect()
+        connection.request("GET", f"/artifacts?{query}")
+        response = connection.getresponse()
+        body = json.loads(response.read())
+        self.assertEqual(response.status, 422)
+        self.assertEqual(body["budget"], "max_dfa_states")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from Modules.regex_compiler import RegexSyntaxError, compile_regex, parse_regex
+
+
+class WhitespaceTest(unittest.TestCase):
+    def test_unescaped_whitespace_is_layout(self):
+        self.assertEqual(parse_regex("aba + bb"), parse_regex("aba+bb"))
+        self.assertTrue(compile_regex("foo bar").matches("foobar"))
+
+    def test_escaped_space_is_literal(self):
+        regex = compile_regex("foo\\ bar")
+        self.assertTrue(regex.matches("foo bar"))
+        self.assertFalse(regex.matches("foobar"))
+
+    def test_space_inside_class_is_a_member(self):
+        self.assertTrue(compile_regex("foo[ ]bar").matches("foo bar"))
+        self.assertTrue(compile_regex("[a-z ]*").matches("ab c"))
+        self.assertFalse(compile_regex("[^ ]*").matches("ab c"))
+        self.assertTrue(compile_regex("[^ ]*").matches("abc"))
+
+    def test_unclosed_class(self):
+        with self.assertRaises(RegexSyntaxError):
+            parse_regex("[ a")
+
+
+if __name__ == "__main__":
+    unittest.main()
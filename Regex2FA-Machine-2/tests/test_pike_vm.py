@@ -0,0 +1,47 @@
+import re
+import time
+import unittest
+
+from Modules.pike_vm import PikeVM
+
+
+def best_time(function, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class PikeVMTest(unittest.TestCase):
+    def test_captures(self):
+        match = PikeVM("c(aaa + aa + a)*").fullmatch("caaaa")
+        self.assertEqual(match.span(), (0, 5))
+        self.assertEqual(match.spans(), [(4, 5)])
+        self.assertIsNone(PikeVM("c(a)*").fullmatch("cab"))
+
+    def test_finditer_matches_re(self):
+        text = "xx caaa bb aba c cab" * 3
+        vm = PikeVM("aba + bb + c(a)*")
+        expected = [m.span() for m in re.finditer("aba|bb|ca*", text)]
+        self.assertEqual([m.span() for m in vm.finditer(text)], expected)
+        self.assertEqual([m.span() for m in vm.finditer(text.encode())], expected)
+
+    def test_finditer_offsets_in_bytes(self):
+        text = "é ab 中ab"
+        spans = [m.span() for m in PikeVM("ab").finditer(text.encode())]
+        self.assertEqual([text.encode()[a:b] for a, b in spans], [b"ab", b"ab"])
+
+    def test_finditer_is_linear_in_matches(self):
+        vm = PikeVM("[a-c]b")  # A class: the input is translated to atom symbols first
+        small, large = "ab " * 1000, "ab " * 8000
+        self.assertEqual(sum(1 for _ in vm.finditer(large)), 8000)
+        scan = lambda text: (list(vm.finditer(text)), list(vm.finditer(text.encode())))
+        ratio = best_time(lambda: scan(large)) / best_time(lambda: scan(small))
+        # 8x the input: about 8x the time when linear, 64x when every match rescans the input
+        self.assertLess(ratio, 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import random
+import re
+import unittest
+
+from Modules.prefilter import Prefilter
+from Modules.regex_compiler import parse_regex, simplify_ast
+from tests.test_differential import CHARS, random_pattern, to_re
+
+SEED = 20251119
+
+
+class PrefilterTest(unittest.TestCase):
+    def test_course_pattern(self):
+        prefilter = Prefilter(simplify_ast(parse_regex("aba + bb + c(a)*")))
+        self.assertEqual(set(prefilter.literals), {"aba", "bb", "c"})
+        self.assertFalse(prefilter.may_contain("xyz ab a"))
+        self.assertFalse(prefilter.may_match("xcaa"))
+        self.assertTrue(prefilter.may_contain("xcaa"))
+
+    def test_never_rejects_a_match(self):
+        rng = random.Random(SEED)
+        for _ in range(300):
+            pattern = random_pattern(rng, 3)
+            reference = re.compile(to_re(pattern))
+            parsed = parse_regex(pattern)
+            ast = parsed if rng.random() < 0.5 else simplify_ast(parsed)  # Searchers skip simplify_ast
+            text_filter, byte_filter = Prefilter(ast), Prefilter(ast, binary=True)
+            if text_filter.exact is not None:
+                for string in text_filter.exact:
+                    self.assertTrue(reference.fullmatch(string), (pattern, string))
+            for _ in range(30):
+                text = "".join(rng.choice(CHARS) for _ in range(rng.randint(0, 8)))
+                data = text.encode("utf-8")
+                start = rng.randint(0, len(text))
+                if reference.fullmatch(text):
+                    self.assertTrue(text_filter.may_match(text), (pattern, text))
+                    self.assertTrue(byte_filter.may_match(data), (pattern, text))
+                    if text_filter.exact is not None:
+                        self.assertIn(text, text_filter.exact, pattern)
+                if reference.search(text, start):
+                    byte_start = len(text[:start].encode("utf-8"))
+                    self.assertTrue(text_filter.may_contain(text, start), (pattern, text, start))
+                    self.assertTrue(byte_filter.may_contain(data, byte_start), (pattern, text, start))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import random
+import unittest
+
+from Modules.regex_compiler import EPSILON, compile_regex, minimize_dfa, reduce_nfa, subset_construction
+from tests.test_differential import random_pattern
+
+SEED = 20251123
+
+
+def dfa_key(dfa):
+    """Everything that identifies a DFA; minimize_dfa numbers states canonically"""
+    return dfa.alphabet, dfa.initial, sorted(dfa.final), dfa.transitions
+
+
+class ReduceNFATest(unittest.TestCase):
+    def test_same_language_without_epsilons(self):
+        rng = random.Random(SEED)
+        for _ in range(300):
+            pattern = random_pattern(rng, 3)
+            compiled = compile_regex(pattern)
+            reduced = reduce_nfa(compiled.nfa)
+            self.assertLessEqual(reduced.state_count, compiled.nfa.state_count, pattern)
+            self.assertFalse(any(EPSILON in trans for trans in reduced.transitions), pattern)
+            self.assertIs(reduced.symbol_map, compiled.nfa.symbol_map)
+            self.assertEqual(dfa_key(minimize_dfa(subset_construction(reduced))), dfa_key(compiled.min_dfa),
+                             pattern)
+
+    def test_course_pattern_shrinks(self):
+        nfa = compile_regex("aba + bb + c(aaa + aa + a)*").nfa
+        reduced = reduce_nfa(nfa)
+        self.assertLess(reduced.state_count, nfa.state_count // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import re
+import time
+import unittest
+
+from Modules.regex_search import RegexSearcher
+
+
+class RegexSearcherTest(unittest.TestCase):
+    def test_search_is_leftmost_longest(self):
+        searcher = RegexSearcher("abcd + c")
+        # "c" ends first, but the match starting at "a" is leftmost
+        self.assertEqual(searcher.search("xabcd"), (1, 5))
+        self.assertEqual(searcher.search(b"xxabcd"), (2, 6))
+        self.assertIsNone(searcher.search("xyz"))
+
+    def test_search_agrees_with_finditer_and_re(self):
+        searcher = RegexSearcher("aba + bb + c(a)*")
+        for text in ["", "xx", "zzcaaab", "bab", "xabax", "ab" * 5 + "bb", "é caa"]:
+            found = next(re.finditer("aba|bb|ca*", text), None)
+            expected = found.span() if found else None
+            self.assertEqual(searcher.search(text), expected, text)
+            self.assertEqual(searcher.search(text), next(searcher.finditer(text), None), text)
+
+    def test_search_stops_at_the_first_match(self):
+        searcher = RegexSearcher("c(a)* + bb")
+        text = "xx ca " + "z" * 2_000_000
+        searcher.search("ca")  # Build the automata outside the timing
+        start = time.perf_counter()
+        self.assertEqual(searcher.search(text), (3, 5))
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from Modules.regex_compiler import CompileLimits, RegexSyntaxError, compile_regex
+from Modules.regex_set import RegexSet
+from tests.test_differential import CHARS, random_pattern
+
+SEED = 20251118
+
+
+class RegexSetTest(unittest.TestCase):
+    def test_matches_agree_with_each_pattern(self):
+        rng = random.Random(SEED)
+        for _ in range(60):
+            patterns = [random_pattern(rng, 3) for _ in range(rng.randint(1, 6))]
+            regex_set = RegexSet(patterns)
+            compiled = [compile_regex(pattern) for pattern in patterns]
+            for _ in range(20):
+                text = "".join(rng.choice(CHARS) for _ in range(rng.randint(0, 6)))
+                expected = [i for i, regex in enumerate(compiled) if regex.matches(text)]
+                self.assertEqual(regex_set.matches(text), expected, (patterns, text))
+                self.assertEqual(regex_set.matches(text.encode("utf-8")), expected, (patterns, text))
+                self.assertEqual(regex_set.is_match(text), bool(expected))
+
+    def test_small_state_cache(self):
+        # Every pattern still answers correctly while the cache keeps being flushed
+        patterns = ["(a + b)*a(a + b){6}", "(a + b)*b(a + b){5}", "[ab]{3,}"]
+        regex_set = RegexSet(patterns, CompileLimits(max_dfa_states=8))
+        compiled = [compile_regex(pattern) for pattern in patterns]
+        rng = random.Random(SEED)
+        for _ in range(200):
+            text = "".join(rng.choice("ab") for _ in range(rng.randint(0, 12)))
+            expected = [i for i, regex in enumerate(compiled) if regex.matches(text)]
+            self.assertEqual(regex_set.matches(text), expected, text)
+
+    def test_bad_pattern_is_named(self):
+        with self.assertRaisesRegex(RegexSyntaxError, "Pattern 1"):
+            RegexSet(["ab", "(a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
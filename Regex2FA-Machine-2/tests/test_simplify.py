@@ -0,0 +1,30 @@
+import unittest
+
+from Modules.regex_compiler import EPS, compile_regex, parse_regex, simplify_ast
+
+
+class SimplifyTest(unittest.TestCase):
+    def test_zero_repeat_of_unbounded_repeat_is_empty(self):
+        self.assertEqual(simplify_ast(parse_regex("(a{1,}){0}")), EPS)
+        self.assertEqual(simplify_ast(parse_regex("(a{2,}){0,0}")), EPS)
+
+    def test_zero_repeat_keeps_language(self):
+        cases = {
+            "(a{1,}){0}": ["", "a", "aa"],
+            "(([^a]){1,}){0,0}([ab]){2,}": ["", "a", "ab", "bba", "x", "xab"],
+        }
+        for pattern, strings in cases.items():
+            for construction in ("thompson", "reduced", "followpos"):
+                plain = compile_regex(pattern, construction=construction)
+                simplified = compile_regex(pattern, construction=construction, simplify=True)
+                for string in strings:
+                    with self.subTest(pattern=pattern, construction=construction, string=string):
+                        self.assertEqual(simplified.matches(string), plain.matches(string))
+
+    def test_nested_repeats_fold(self):
+        self.assertEqual(simplify_ast(parse_regex("(a{1,3}){2}")), ("repeat", ("lit", "a"), 2, 6))
+        self.assertEqual(simplify_ast(parse_regex("(a?){3}")), ("repeat", ("lit", "a"), 0, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from Modules.regex_compiler import CLASSIFY_CHUNK, ClassDFA, compile_regex, skip_run
+
+SEED = 20251121
+# Around the first slice sizes, where skip_run doubles from 64
+LENGTHS = [0, 1, 2, 63, 64, 65, 127, 128, 129, 191, 192, 193, 1000, 4095, 4096, 4097, 10000]
+
+
+def naive_skip_run(data, i, symbols, n):
+    while i < n and data[i:i + 1] in symbols and data[i:i + 1]:
+        i += 1
+    return i
+
+
+class SkipRunTest(unittest.TestCase):
+    def check(self, data, i, symbols, n):
+        self.assertEqual(skip_run(data, i, symbols, n), naive_skip_run(data, i, symbols, n),
+                         (len(data), i, symbols, n))
+
+    def test_run_lengths(self):
+        for symbols in ("a", "ab"):
+            for length in LENGTHS:
+                for prefix in ("", "x", "xyz"):
+                    text = prefix + "ab"[:len(symbols)] * (length // len(symbols)) + "a" * (length % len(symbols))
+                    for tail in ("", "b", "c", "ca"):
+                        data = text + tail
+                        for convert in (str, str.encode):
+                            converted = convert(data)
+                            wanted = convert(symbols)
+                            self.check(converted, len(prefix), wanted, len(converted))
+                            # The end bound cuts the run short
+                            self.check(converted, len(prefix), wanted, len(prefix) + length // 2)
+
+    def test_start_at_or_past_the_end(self):
+        self.assertEqual(skip_run("aaa", 3, "a", 3), 3)
+        self.assertEqual(skip_run(b"aaa", 0, b"a", 0), 0)
+        self.assertEqual(skip_run("", 0, "a", 0), 0)
+
+    def test_random(self):
+        rng = random.Random(SEED)
+        for _ in range(500):
+            data = "".join(rng.choice("aab") * rng.randint(1, 300) for _ in range(rng.randint(1, 4)))
+            i = rng.randint(0, len(data))
+            n = rng.randint(i, len(data))
+            for symbols in ("a", "b", "ab"):
+                self.check(data, i, symbols, n)
+                self.check(data.encode(), i, symbols.encode(), n)
+
+
+class ClassDFARunTest(unittest.TestCase):
+    def test_runs_agree_with_the_dfa(self):
+        for pattern in ("aba + bb + c(aaa + aa + a)*", "c(a + b)*c", "[a-c](b)*a", "(ab)*"):
+            dfa = compile_regex(pattern).min_dfa
+            table = ClassDFA(dfa)
+            for length in LENGTHS:
+                for text in ("c" + "a" * length, "c" + "a" * length + "b", "c" + "ab" * length + "c",
+                             "a" + "b" * length + "a", "ab" * length):
+                    self.assertEqual(table.accepts(text), dfa.accepts(text), (pattern, len(text)))
+                    self.assertEqual(table.accepts(text.encode()), dfa.accepts(text), (pattern, len(text)))
+
+    def test_runs_longer_than_a_chunk(self):
+        table = ClassDFA(compile_regex("aba + bb + c(aaa + aa + a)*").min_dfa)
+        for length in (CLASSIFY_CHUNK - 1, CLASSIFY_CHUNK, 2 * CLASSIFY_CHUNK + 5):
+            text = "c" + "a" * length
+            self.assertTrue(table.accepts(text))
+            self.assertTrue(table.accepts(text.encode()))
+            self.assertFalse(table.accepts(text + "b"))
+            self.assertFalse(table.accepts(text[:length // 2] + "b" + text[length // 2:]))
+            self.assertEqual(skip_run(text, 1, "a", len(text)), len(text))
+            self.assertEqual(skip_run(text + "b", 1, "ab", len(text) + 1), len(text) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()